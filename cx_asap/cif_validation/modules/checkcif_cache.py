@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+
+###################################################################################################
+# -------------------------------------CX-ASAP: checkCIF cache-------------------------------------#
+# ---Authors: Amy J. Thompson, Kate M. Smith, Daniel J. Eriksson, Jack K. Clegg & Jason R. Price---#
+# -----------------------------------Python Implementation by AJT----------------------------------#
+# -----------------------------------Project Design by JRP and JKC---------------------------------#
+# --------------------------------Valuable Coding Support by KMS & DJE-----------------------------#
+###################################################################################################
+
+# ----------Required Modules----------#
+
+from system_files.utils import Config, YAML_Loader
+import hashlib
+import pathlib
+import shutil
+import yaml
+import os
+import time
+import logging
+
+# ----------Class Definition----------#
+
+
+class CheckCIF_Cache:
+    def __init__(
+        self, cache_location: str = None, irrelevant_entries: list = None
+    ) -> None:
+        """Initialises the class
+
+        Sets up the folder where previous checkCIF reports are stored
+
+        Reports are stored by a hash of the merged CIF (and the platon program),
+
+        so if a CIF has not changed since the last time it was validated,
+
+        platon does not need to be run again
+
+        Args:
+            cache_location (str): full path to the folder for cached reports
+                                if not given, it goes in the user's cache folder
+
+                                (see default_location)
+            irrelevant_entries (list): CIF parameters that do not change the
+                                        result of checkCIF, so are ignored in the hash
+        """
+
+        if cache_location:
+            self.cache_path = pathlib.Path(cache_location)
+        else:
+            self.cache_path = self.default_location()
+
+        self.index_path = self.cache_path / "cache_index.yaml"
+
+        # These are the entries where only whether they are filled in matters to checkCIF, not what they say
+
+        # Changing the colour of a crystal should not mean re-running platon!
+
+        if irrelevant_entries is None:
+            self.irrelevant_entries = [
+                "_exptl_crystal_colour",
+                "_exptl_crystal_description",
+                "_computing_structure_solution",
+                "_computing_molecular_graphics",
+                "_computing_publication_material",
+                "_refine_special_details",
+                "_audit_creation_date",
+                "_audit_creation_method",
+            ]
+        else:
+            self.irrelevant_entries = irrelevant_entries
+
+        self.irrelevant_entries = [item.lower() for item in self.irrelevant_entries]
+
+        # Change this if the format of the cache changes so old reports are not reused
+
+        self.cache_version = "1"
+
+        # A new version of platon may give different alerts, so is part of the key
+
+        self.platon_version = self.find_platon_version()
+
+    def default_location(self) -> pathlib.Path:
+        """Finds the folder for cached reports if none is given
+
+        This is in the user's cache folder ($XDG_CACHE_HOME or ~/.cache,
+
+        or %LOCALAPPDATA% on windows) rather than in the installed package
+
+        Returns:
+            cache_path (pathlib.Path): full path to the folder for cached reports
+        """
+
+        if os.environ.get("XDG_CACHE_HOME"):
+            base = pathlib.Path(os.environ["XDG_CACHE_HOME"])
+        elif os.environ.get("LOCALAPPDATA"):
+            base = pathlib.Path(os.environ["LOCALAPPDATA"])
+        else:
+            base = pathlib.Path.home() / ".cache"
+
+        return base / "cx_asap" / "checkcif_cache"
+
+    def find_platon_version(self, program: str = "platon") -> str:
+        """Identifies the installed platon, so reports from other versions are not reused
+
+        platon does not print its version without running interactively, so
+
+        the size and modification time of the program are used instead
+
+        Args:
+            program (str): name or full path of the platon program
+
+        Returns:
+            version (str): the size and modification time of the program,
+
+                            or "not found" if it is not in your path
+        """
+
+        path = shutil.which(program)
+
+        if path is None:
+            return "not found"
+
+        details = os.stat(path)
+
+        return str(details.st_size) + "_" + str(details.st_mtime_ns)
+
+    def normalise(self, lines: list) -> list:
+        """Removes the values of the irrelevant entries from a CIF
+
+        The entry itself is kept, but the value is replaced with either
+
+        '?' (if it was not filled in) or 'set' (if it was)
+
+        This is because checkCIF will still complain about missing values
+
+        Text fields (ie the embedded .res and .hkl) are kept as they are
+
+        Args:
+            lines (list): lines of the CIF file
+
+        Returns:
+            normalised (list): lines of the CIF with irrelevant values removed
+        """
+
+        normalised = []
+        in_text = False
+        skip_text = False
+        loop_header = False
+        waiting_for_value = None
+
+        for line in lines:
+            # Inside a text field (between two lines starting with ;)
+
+            if in_text:
+                if line.startswith(";"):
+                    in_text = False
+                    if skip_text:
+                        skip_text = False
+                        continue
+                if skip_text == False:
+                    normalised.append(line)
+                continue
+
+            stripped = line.strip()
+
+            # The value of an irrelevant entry is on the line after the entry
+
+            if waiting_for_value is not None and stripped != "":
+                if line.startswith(";"):
+                    in_text = True
+                    skip_text = True
+                    normalised.append(waiting_for_value + " set\n")
+                elif stripped in ["?", "."]:
+                    normalised.append(waiting_for_value + " ?\n")
+                else:
+                    normalised.append(waiting_for_value + " set\n")
+                waiting_for_value = None
+                continue
+
+            if line.startswith(";"):
+                in_text = True
+                normalised.append(line)
+                continue
+
+            if stripped.lower() == "loop_":
+                loop_header = True
+                normalised.append(line)
+                continue
+
+            # Items in a loop header have their values in the loop, so are always kept
+
+            if loop_header and stripped.startswith("_"):
+                normalised.append(line)
+                continue
+
+            loop_header = False
+
+            split_line = stripped.split(None, 1)
+
+            if len(split_line) != 0 and split_line[0].lower() in self.irrelevant_entries:
+                if len(split_line) == 1:
+                    waiting_for_value = split_line[0].lower()
+                elif split_line[1].strip() in ["?", "."]:
+                    normalised.append(split_line[0].lower() + " ?\n")
+                else:
+                    normalised.append(split_line[0].lower() + " set\n")
+                continue
+
+            normalised.append(line)
+
+        return normalised
+
+    def cif_key(self, file_name: str) -> str:
+        """Calculates the hash of a CIF file used to look up its checkCIF report
+
+        Args:
+            file_name (str): full path to the CIF file
+
+        Returns:
+            key (str): hash of the CIF with irrelevant entries removed,
+
+                        and of the platon version
+        """
+
+        with open(file_name, "rt") as f:
+            lines = f.readlines()
+
+        cif_hash = hashlib.sha256()
+        cif_hash.update(
+            (
+                "cxasap_checkcif_cache_"
+                + self.cache_version
+                + "_platon_"
+                + self.platon_version
+            ).encode()
+        )
+
+        for line in self.normalise(lines):
+            cif_hash.update(line.encode("utf8", errors="replace"))
+
+        return cif_hash.hexdigest()
+
+    def lookup(self, key: str) -> list:
+        """Finds a previously stored checkCIF report
+
+        Args:
+            key (str): hash of the CIF from the cif_key function
+
+        Returns:
+            report (list): lines of the checkCIF report, or None if not cached
+        """
+
+        report_path = self.cache_path / (key + ".chk")
+
+        try:
+            with open(report_path, "rt") as f:
+                report = f.readlines()
+        except FileNotFoundError:
+            return None
+
+        logging.info(__name__ + " : Using cached checkCIF report " + key)
+
+        return report
+
+    def store(self, key: str, file_name: str, report: list) -> None:
+        """Saves a checkCIF report into the cache
+
+        Args:
+            key (str): hash of the CIF from the cif_key function
+            file_name (str): name of the CIF that was validated
+            report (list): lines of the checkCIF report
+        """
+
+        if not os.path.exists(self.cache_path):
+            os.makedirs(self.cache_path)
+
+        with open(self.cache_path / (key + ".chk"), "w") as f:
+            for line in report:
+                f.write(line)
+
+        index = self.read_index()
+
+        index[key] = {
+            "cif": pathlib.Path(file_name).name,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+        self.write_index(index)
+
+    def read_index(self) -> dict:
+        """Reads in the list of cached reports
+
+        Returns:
+            index (dict): details of each cached report, with the hash as the key
+        """
+
+        try:
+            with open(self.index_path, "r") as f:
+                index = yaml.load(f, YAML_Loader)
+        except FileNotFoundError:
+            index = {}
+
+        if index is None:
+            index = {}
+
+        return index
+
+    def write_index(self, index: dict) -> None:
+        """Writes out the list of cached reports
+
+        Args:
+            index (dict): details of each cached report, with the hash as the key
+        """
+
+        with open(self.index_path, "w") as f:
+            Config.dump(index, f)
+
+    def list_entries(self) -> list:
+        """Lists all of the reports currently in the cache
+
+        Returns:
+            entries (list): list of dictionaries with the hash, CIF name and date
+        """
+
+        entries = []
+
+        index = self.read_index()
+
+        for key in index:
+            if os.path.exists(self.cache_path / (key + ".chk")):
+                entries.append(
+                    {
+                        "key": key,
+                        "cif": index[key]["cif"],
+                        "created": index[key]["created"],
+                    }
+                )
+
+        return entries
+
+    def purge(self) -> int:
+        """Deletes every report in the cache
+
+        Returns:
+            removed (int): number of reports deleted
+        """
+
+        removed = 0
+
+        if os.path.exists(self.cache_path):
+            for item in os.listdir(self.cache_path):
+                if item.endswith(".chk"):
+                    os.remove(self.cache_path / item)
+                    removed += 1
+
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
+
+        logging.info(__name__ + " : Removed " + str(removed) + " cached reports")
+
+        return removed
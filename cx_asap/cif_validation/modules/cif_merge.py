@@ -17,12 +17,16 @@ import os
 import logging
 import shutil
 from system_files.utils import Nice_YAML_Dumper, Config, Directory_Browse
+from cif_validation.modules.checkcif_cache import CheckCIF_Cache
+from cif_validation.modules.cif_precheck import CIF_Precheck
+from cif_validation.modules.combined_writer import Combined_CIF_Writer
+from cif_validation.modules.cif_template import CIF_Template
 
 # ----------Class Definition----------#
 
 
 class Cif_Merge:
-    def __init__(self, test_mode: bool = False) -> None:
+    def __init__(self, test_mode: bool = False, use_cache: bool = True) -> None:
         """Initialises the class
 
         Sets up the yaml parameters input by the user
@@ -37,6 +41,9 @@ class Cif_Merge:
             test_mode (bool): Automatically false, if true it will
 
                             make the functions compatible with the testing script
+            use_cache (bool): Automatically true, if false platon will be run
+
+                            on every CIF even if it has been validated before
         """
 
         # Set up yaml files and logger
@@ -80,6 +87,19 @@ class Cif_Merge:
         self.flag1 = False
         self.flag2 = False
 
+        # Previous checkCIF reports are reused if the CIF has not changed
+
+        self.use_cache = use_cache
+        self.cache = CheckCIF_Cache()
+
+        # Quick check for things that will definitely fail checkCIF
+
+        self.precheck = CIF_Precheck()
+        self.precheck_alerts = []
+
+        self.cif_text = None
+        self.template_values = None
+
     def import_CIFs(self, instrument: str, new: str) -> None:
         """This function imports both a defined instrument cif and a structure cif
 
@@ -97,6 +117,9 @@ class Cif_Merge:
 
         self.flag1 = False
         self.flag2 = False
+        self.precheck_alerts = []
+        self.cif_text = None
+        self.template_values = None
 
         os.chdir(instrument.parent)
 
@@ -259,6 +282,41 @@ class Cif_Merge:
 
             self.data_block2["_refine_special_details"] = "CX-ASAP (Thompson, 2023)"
 
+    def user_parameters(
+        self,
+        solution: str,
+        formula: str,
+        habit: str,
+        colour: str,
+        cryst_max: str,
+        cryst_mid: str,
+        cryst_min: str,
+    ) -> dict:
+        """This function matches the user-defined parameters to their CIF parameters
+
+        Args:
+            solution(str): the structure solution program used
+            formula(str): the chemical formula
+            habit(str): the crystal habit
+            colour(str): the colour of the crystal
+            cryst_max(str): the largest dimension of the crystal
+            cryst_mid(str): the middle dimension of the crystal
+            cryst_min(str): the smallest dimension of the crystal
+
+        Returns:
+            parameters(dict): the value of each CIF parameter
+        """
+
+        return {
+            "_computing_structure_solution": solution,
+            "_chemical_formula_moiety": formula,
+            "_exptl_crystal_colour": colour,
+            "_exptl_crystal_description": habit,
+            "_exptl_crystal_size_max": cryst_max,
+            "_exptl_crystal_size_mid": cryst_mid,
+            "_exptl_crystal_size_min": cryst_min,
+        }
+
     def user_edits(
         self,
         solution: str,
@@ -284,27 +342,154 @@ class Cif_Merge:
         """
 
         if self.flag2 == False and self.flag1 == False:
-            self.data_block2["_computing_structure_solution"] = solution
-            self.data_block2["_chemical_formula_moiety"] = formula
-            self.data_block2["_exptl_crystal_colour"] = colour
-            self.data_block2["_exptl_crystal_description"] = habit
-            self.data_block2["_exptl_crystal_size_max"] = cryst_max
-            self.data_block2["_exptl_crystal_size_mid"] = cryst_mid
-            self.data_block2["_exptl_crystal_size_min"] = cryst_min
+            parameters = self.user_parameters(
+                solution, formula, habit, colour, cryst_max, cryst_mid, cryst_min
+            )
+            for item in parameters:
+                self.data_block2[item] = parameters[item]
+
+    def template_merge(
+        self, instrument: str, new: str, user_parameters: dict = None
+    ) -> None:
+        """This function does the same as import_CIFs, merge_CIFs and user_edits,
+
+        but without PyCifRW
+
+        The instrument cif is only read once (see CIF_Template) and the structure
+
+        cif is only changed where parameters are added or replaced, so the
+
+        embedded .res and .hkl are not re-written
+
+        The merged CIF is saved to the class as self.cif_text
+
+        Args:
+            instrument (str): Full path to the instrument cif file
+            new (str): Full path to the file that the instrument details get merged into
+            user_parameters (dict): user-defined parameters (see user_parameters)
+        """
+
+        instrument = pathlib.Path(instrument).absolute()
+        new = pathlib.Path(new)
+
+        self.flag1 = False
+        self.flag2 = False
+        self.precheck_alerts = []
+        self.cif_text = None
+        self.template_values = None
+
+        os.chdir(new.parent)
+
+        try:
+            structure = CIF_Template().read_structure(new.name)
+        except OSError:
+            self.flag2 = True
+            logging.info(__name__ + " : Could not read structure cif")
+            return
+
+        try:
+            template = CIF_Template(instrument, self.ignored_entries)
+        except OSError:
+            self.flag1 = True
+            template = CIF_Template()
+            logging.info(__name__ + " : Could not read instrument cif")
+
+        values = template.merged_values(structure)
+        edits = {}
+
+        if self.flag1 == False:
+            if values.get("_cell_measurement_reflns_used") == "?":
+                edits["_cell_measurement_reflns_used"] = values.get(
+                    "_diffrn_reflns_number", "?"
+                )
+                edits["_cell_measurement_theta_min"] = values.get(
+                    "_diffrn_reflns_theta_min", "?"
+                )
+                edits["_cell_measurement_theta_max"] = values.get(
+                    "_diffrn_reflns_theta_max", "?"
+                )
+            if "_diffrn_ambient_temperature" in values:
+                edits["_cell_measurement_temperature"] = values[
+                    "_diffrn_ambient_temperature"
+                ]
+
+            edits["_refine_special_details"] = template.format_value(
+                "CX-ASAP (Thompson, 2023)"
+            )
+
+            if user_parameters is not None:
+                for item in user_parameters:
+                    edits[item] = template.format_value(user_parameters[item])
+
+        self.cif_text = template.merge(structure, edits)
+
+        values.update(edits)
+
+        self.template_values = {
+            item: template.plain_value(values[item]) for item in values
+        }
+
+        tree = Directory_Browse(os.getcwd(), self.test_mode)
+        tree.check_file_contents(new)
+
+    def precheck_CIFs(self, cif_name: str) -> list:
+        """Runs the quick completeness and consistency check on the merged CIF
+
+        This should be run after all of the edits have been made
+
+        The alerts are saved to the class as self.precheck_alerts
+
+        Args:
+            cif_name(str): the name of the structure cif, used in the alerts
+
+        Returns:
+            alerts(list): list of dictionaries with the CIF, item, level and message
+        """
+
+        if self.flag2 == False:
+            # template_merge does not make a PyCifRW block
+
+            if self.template_values is not None:
+                block = self.template_values
+            else:
+                block = getattr(self, "data_block2", None)
+
+            if block is not None:
+                self.precheck_alerts = self.precheck.check_block(
+                    block, pathlib.Path(cif_name).name
+                )
+            else:
+                self.precheck_alerts = []
+        else:
+            self.precheck_alerts = []
+
+        return self.precheck_alerts
 
     def single_write_out(self, file_name: str) -> None:
         """This function will write out the edited cif stored in the class
 
+        The text is also saved to the class as self.cif_text, so write_out
+
+        does not need to convert the whole CIF to text again
+
         Args:
             file_name(str): the name of the output file (or full path to)
         """
 
         if self.flag2 == False:
+            if self.cif_text is None:
+                self.cif_text = self.cif2.WriteOut()
             with open(file_name, "w") as f:
-                f.write(self.cif2.WriteOut())
+                f.write(self.cif_text)
 
     def write_out(
-        self, location: str, cif_name: str, validation_name: str, single_cif_name: str
+        self,
+        location: str,
+        cif_name: str,
+        validation_name: str,
+        single_cif_name: str,
+        writer: Combined_CIF_Writer = None,
+        position: int = None,
     ) -> None:
         """This function writes out the edited cif stored in the class
 
@@ -324,11 +509,17 @@ class Cif_Merge:
 
         the results files go
 
+        If a Combined_CIF_Writer is given, the CIF and checkCIF report are
+
+        passed to it instead of being appended to the files straight away
+
         Args:
             location(str): where the files are written out to
             cif_name(str): name of the output cif
             validation_name(str): name of the output check_CIF
             single_cif_name(str): the name of the original file
+            writer(Combined_CIF_Writer): open writer for the combined files
+            position(int): position of this CIF in the combined files (for the writer)
         """
 
         if self.flag2 == False:
@@ -351,27 +542,45 @@ class Cif_Merge:
                     + str(single_cif_name)
                 )
 
-                with open(cif_name, "a") as f:
-                    f.write(self.cif2.WriteOut())
+                # Reuse the text from single_write_out if it has already been made
+
+                if self.cif_text is None:
+                    self.cif_text = self.cif2.WriteOut()
 
                 try:
-                    test = self.validation
-                except:
-                    pass
+                    validation = self.validation
+                except AttributeError:
+                    validation = None
+
+                if writer is not None:
+                    writer.write_block(self.cif_text, validation, position)
                 else:
-                    with open(validation_name, "a") as f:
-                        for line in self.validation:
-                            f.write(line)
+                    with open(cif_name, "a") as f:
+                        f.write(self.cif_text)
+
+                    if validation is not None:
+                        with open(validation_name, "a") as f:
+                            for line in validation:
+                                f.write(line)
 
             os.chdir(current_folder)
 
-    def validate_CIFs(self, file_name: str) -> None:
+    def validate_CIFs(self, file_name: str, skip_failed_precheck: bool = False) -> None:
         """Run checkCIF on a specified file
 
         then saves the data to the class as self.validation
 
+        If the same CIF (ignoring irrelevant entries like the crystal colour)
+
+        has been validated before, the cached report is used instead
+
         Args:
             location(str): the name of the cif file for platon checkCIF
+            skip_failed_precheck(bool): if true, platon is not run on CIFs
+
+                            with level A alerts from precheck_CIFs, and the
+
+                            pre-check alerts are used as the report instead
         """
 
         # This function runs each cif through platon for validation, and adds the report to a combined check cif file
@@ -379,6 +588,34 @@ class Cif_Merge:
         # windows_wait = 15
 
         if self.flag2 == False:
+            if skip_failed_precheck == True and self.precheck.failed(
+                self.precheck_alerts
+            ):
+                logging.info(
+                    __name__
+                    + " : Skipping platon as "
+                    + str(file_name)
+                    + " failed the pre-check"
+                )
+                self.validation = self.precheck.report(self.precheck_alerts)
+                with open("check_CIF.chk", "w") as f:
+                    for line in self.validation:
+                        f.write(line)
+                return
+
+            if self.use_cache == True:
+                cache_key = self.cache.cif_key(file_name)
+                cached_report = self.cache.lookup(cache_key)
+
+                if cached_report is not None:
+                    with open("check_CIF.chk", "w") as f:
+                        for line in cached_report:
+                            f.write(line)
+                    self.validation = cached_report
+                    return
+
+            timed_out = False
+
             checkCIF = subprocess.Popen(
                 ["platon", "-u", file_name], stdin=subprocess.PIPE, encoding="utf8"
             )
@@ -386,6 +623,7 @@ class Cif_Merge:
                 checkCIF.wait(45)
             except subprocess.TimeoutExpired:
                 checkCIF.kill()
+                timed_out = True
 
             try:
                 shutil.move(pathlib.Path(file_name).stem + ".chk", "check_CIF.chk")
@@ -396,3 +634,8 @@ class Cif_Merge:
                     if item.endswith(".chk"):
                         with open(item, "rt") as f:
                             self.validation = f.readlines()
+
+                # Only complete reports are saved for next time
+
+                if self.use_cache == True and timed_out == False:
+                    self.cache.store(cache_key, file_name, self.validation)
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+
+###################################################################################################
+# --------------------------------------CX-ASAP: CIF pre-check-------------------------------------#
+# ---Authors: Amy J. Thompson, Kate M. Smith, Daniel J. Eriksson, Jack K. Clegg & Jason R. Price---#
+# -----------------------------------Python Implementation by AJT----------------------------------#
+# -----------------------------------Project Design by JRP and JKC---------------------------------#
+# --------------------------------Valuable Coding Support by KMS & DJE-----------------------------#
+###################################################################################################
+
+# ----------Required Modules----------#
+
+import logging
+import math
+
+# ----------Class Definition----------#
+
+
+class CIF_Precheck:
+    def __init__(
+        self, required_entries: list = None, recommended_entries: list = None
+    ) -> None:
+        """Initialises the class
+
+        This is a quick check of a merged CIF for things that will definitely
+
+        fail checkCIF (missing entries, '?' placeholders, impossible values)
+
+        It does not replace platon, but it takes milliseconds instead of
+
+        up to 45 seconds, so bad CIFs are found straight away
+
+        Alerts follow the checkCIF levels - level A alerts mean the CIF
+
+        will fail checkCIF, so there is the option to not run platon on it
+
+        Args:
+            required_entries (list): CIF parameters that must be filled in
+            recommended_entries (list): CIF parameters that should be filled in
+        """
+
+        if required_entries is None:
+            self.required_entries = [
+                "_cell_length_a",
+                "_cell_length_b",
+                "_cell_length_c",
+                "_cell_angle_alpha",
+                "_cell_angle_beta",
+                "_cell_angle_gamma",
+                "_cell_volume",
+                "_cell_formula_units_z",
+                "_chemical_formula_sum",
+                "_diffrn_ambient_temperature",
+                "_diffrn_radiation_wavelength",
+                "_exptl_crystal_size_max",
+                "_exptl_crystal_size_mid",
+                "_exptl_crystal_size_min",
+            ]
+        else:
+            self.required_entries = required_entries
+
+        if recommended_entries is None:
+            self.recommended_entries = [
+                "_chemical_formula_moiety",
+                "_exptl_crystal_colour",
+                "_exptl_crystal_description",
+                "_computing_structure_solution",
+            ]
+        else:
+            self.recommended_entries = recommended_entries
+
+        # These need to be numbers greater than zero
+
+        self.positive_entries = [
+            "_cell_length_a",
+            "_cell_length_b",
+            "_cell_length_c",
+            "_cell_volume",
+            "_cell_formula_units_z",
+            "_diffrn_ambient_temperature",
+            "_diffrn_radiation_wavelength",
+            "_exptl_crystal_size_max",
+            "_exptl_crystal_size_mid",
+            "_exptl_crystal_size_min",
+        ]
+
+        self.angle_entries = [
+            "_cell_angle_alpha",
+            "_cell_angle_beta",
+            "_cell_angle_gamma",
+        ]
+
+        # Percentage difference allowed between the reported and calculated cell volume
+
+        self.volume_tolerance = 1
+
+    def get_value(self, block, item: str) -> str:
+        """Gets a value out of a CIF block
+
+        Works for both PyCifRW blocks and normal dictionaries
+
+        Args:
+            block (CifFile.StarBlock or dict): the CIF data block
+            item (str): the CIF parameter
+
+        Returns:
+            value (str): the value, or None if it is missing or not filled in
+        """
+
+        try:
+            value = block[item]
+        except KeyError:
+            return None
+
+        if isinstance(value, list):
+            return None
+
+        value = str(value).strip()
+
+        if value in ["", "?", "."]:
+            return None
+
+        return value
+
+    def get_number(self, value: str) -> float:
+        """Converts a CIF value to a number, removing the esd
+
+        ie 10.2728(6) becomes 10.2728
+
+        Args:
+            value (str): the CIF value
+
+        Returns:
+            number (float): the value as a number, or None if it is not a number
+        """
+
+        try:
+            return float(value.split("(")[0])
+        except (ValueError, AttributeError):
+            return None
+
+    def check_block(self, block, cif_name: str) -> list:
+        """Checks a CIF block for completeness and consistency
+
+        Args:
+            block (CifFile.StarBlock or dict): the merged CIF data block
+            cif_name (str): name of the CIF, used in the alerts
+
+        Returns:
+            alerts (list): list of dictionaries with the CIF, item, level and message
+        """
+
+        alerts = []
+
+        def alert(item, level, message):
+            alerts.append(
+                {"CIF": str(cif_name), "Item": item, "Level": level, "Message": message}
+            )
+
+        numbers = {}
+
+        for item in self.required_entries:
+            value = self.get_value(block, item)
+            if value is None:
+                alert(item, "A", item + " is missing or not filled in")
+            elif item in self.positive_entries or item in self.angle_entries:
+                number = self.get_number(value)
+                if number is None:
+                    alert(item, "A", item + " is not a number: " + value)
+                else:
+                    numbers[item] = number
+
+        for item in self.recommended_entries:
+            if self.get_value(block, item) is None:
+                alert(item, "C", item + " is missing or not filled in")
+
+        for item in self.positive_entries:
+            if item in numbers and numbers[item] <= 0:
+                alert(item, "A", item + " must be greater than zero")
+
+        for item in self.angle_entries:
+            if item in numbers and not 0 < numbers[item] < 180:
+                alert(item, "A", item + " must be between 0 and 180 degrees")
+
+        # The crystal sizes should be in order
+
+        sizes = [
+            "_exptl_crystal_size_max",
+            "_exptl_crystal_size_mid",
+            "_exptl_crystal_size_min",
+        ]
+
+        if all(item in numbers for item in sizes):
+            if not (
+                numbers[sizes[0]] >= numbers[sizes[1]] >= numbers[sizes[2]]
+            ):
+                alert(
+                    "_exptl_crystal_size",
+                    "B",
+                    "crystal dimensions are not in the order max >= mid >= min",
+                )
+
+        # The reported volume should match the cell
+
+        cell = [
+            "_cell_length_a",
+            "_cell_length_b",
+            "_cell_length_c",
+            "_cell_angle_alpha",
+            "_cell_angle_beta",
+            "_cell_angle_gamma",
+            "_cell_volume",
+        ]
+
+        if all(item in numbers for item in cell):
+            a, b, c, alpha, beta, gamma, volume = [numbers[item] for item in cell]
+            alpha = math.radians(alpha)
+            beta = math.radians(beta)
+            gamma = math.radians(gamma)
+            volume_squared = 1 - (
+                math.cos(alpha) ** 2 + math.cos(beta) ** 2 + math.cos(gamma) ** 2
+            ) + (2 * math.cos(alpha) * math.cos(beta) * math.cos(gamma))
+            if volume_squared <= 0:
+                alert("_cell_angle", "A", "cell angles do not make a valid unit cell")
+            elif volume > 0:
+                calculated = a * b * c * math.sqrt(volume_squared)
+                if abs(calculated - volume) / volume * 100 > self.volume_tolerance:
+                    alert(
+                        "_cell_volume",
+                        "B",
+                        "_cell_volume "
+                        + str(volume)
+                        + " does not match the cell ("
+                        + str(round(calculated, 2))
+                        + ")",
+                    )
+
+        # The cell should have been measured at the data collection temperature
+
+        measurement = self.get_number(
+            self.get_value(block, "_cell_measurement_temperature")
+        )
+
+        if (
+            measurement is not None
+            and "_diffrn_ambient_temperature" in numbers
+            and measurement != numbers["_diffrn_ambient_temperature"]
+        ):
+            alert(
+                "_cell_measurement_temperature",
+                "C",
+                "_cell_measurement_temperature does not match _diffrn_ambient_temperature",
+            )
+
+        for item in alerts:
+            logging.info(
+                __name__
+                + " : "
+                + item["CIF"]
+                + " PRECHECK_ALERT_"
+                + item["Level"]
+                + " "
+                + item["Message"]
+            )
+
+        return alerts
+
+    def failed(self, alerts: list) -> bool:
+        """Checks whether a CIF will definitely fail checkCIF
+
+        Args:
+            alerts (list): alerts from the check_block function
+
+        Returns:
+            failed (bool): true if there are any level A alerts
+        """
+
+        return any(item["Level"] == "A" for item in alerts)
+
+    def report(self, alerts: list) -> list:
+        """Formats the alerts like a checkCIF report
+
+        This is written out instead of the platon report if platon is skipped
+
+        Args:
+            alerts (list): alerts from the check_block function
+
+        Returns:
+            lines (list): lines of the report
+        """
+
+        lines = []
+
+        if len(alerts) != 0:
+            lines.append("# CX-ASAP CIF pre-check for " + alerts[0]["CIF"] + "\n")
+            lines.append("# platon checkCIF was not run as this CIF has level A alerts\n")
+
+        for item in alerts:
+            lines.append(
+                "PRECHECK_ALERT_" + item["Level"] + " " + item["Message"] + "\n"
+            )
+
+        return lines
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+
+###################################################################################################
+# -------------------------------------CX-ASAP: CIF template---------------------------------------#
+# ---Authors: Amy J. Thompson, Kate M. Smith, Daniel J. Eriksson, Jack K. Clegg & Jason R. Price---#
+# -----------------------------------Python Implementation by AJT----------------------------------#
+# -----------------------------------Project Design by JRP and JKC---------------------------------#
+# --------------------------------Valuable Coding Support by KMS & DJE-----------------------------#
+###################################################################################################
+
+# ----------Required Modules----------#
+
+import os
+import pathlib
+import logging
+
+# ----------Class Definition----------#
+
+# Instrument CIFs that have already been read, so each one is only read once per run
+
+_template_cache = {}
+
+
+class CIF_Template:
+    def __init__(self, instrument: str = None, ignored_entries: list = None) -> None:
+        """Initialises the class
+
+        Reads in an instrument CIF once, and uses it as a template
+
+        to merge into structure CIFs
+
+        Unlike PyCifRW, the CIF is not converted into objects and back again,
+
+        the lines of the structure CIF are only changed where a parameter is
+
+        replaced, so the large text fields (ie the embedded .res and .hkl)
+
+        are copied straight through
+
+        Args:
+            instrument (str): full path to the instrument CIF
+
+                            if not given, the template is empty (nothing is merged)
+            ignored_entries (list): parameters in the instrument CIF which
+
+                                    should not be copied into the structure CIF
+        """
+
+        if ignored_entries is None:
+            self.ignored_entries = []
+        else:
+            self.ignored_entries = [item.lower() for item in ignored_entries]
+
+        if instrument is None:
+            self.instrument = None
+            self.lines = []
+            self.entries = []
+            return
+
+        self.instrument = pathlib.Path(instrument).absolute()
+
+        # Re-read the instrument CIF only if it has been changed
+
+        stats = os.stat(self.instrument)
+        cache_key = (str(self.instrument), stats.st_mtime_ns, stats.st_size)
+
+        if cache_key not in _template_cache:
+            lines = self.read_lines(self.instrument)
+            _template_cache[cache_key] = (lines, self.scan(lines))
+            logging.info(__name__ + " : Read instrument template " + str(instrument))
+
+        self.lines, self.entries = _template_cache[cache_key]
+
+    def read_lines(self, file_name: str) -> list:
+        """Reads in the lines of a CIF file
+
+        Args:
+            file_name (str): full path to the CIF file
+
+        Returns:
+            lines (list): lines of the CIF file
+        """
+
+        with open(file_name, "rt") as f:
+            lines = f.readlines()
+
+        # PyCifRW does not end the file with a new line, so anything
+
+        # moved to or added after the last line would be joined onto it
+
+        if len(lines) != 0 and not lines[-1].endswith("\n"):
+            lines[-1] += "\n"
+
+        return lines
+
+    def scan(self, lines: list) -> list:
+        """Finds where each parameter is in the lines of a CIF
+
+        Args:
+            lines (list): lines of the CIF file
+
+        Returns:
+            entries (list): list of dictionaries with the names of the parameters,
+
+                            the first and last (+1) line, whether it is a loop,
+
+                            and the value as it is written in the file (not for loops)
+        """
+
+        entries = []
+        i = 0
+
+        while i < len(lines):
+            stripped = lines[i].strip()
+
+            if stripped.lower() == "loop_":
+                start = i
+                names = []
+                i += 1
+
+                while i < len(lines) and lines[i].strip().startswith("_"):
+                    names.append(lines[i].split()[0].lower())
+                    i += 1
+
+                end = i
+
+                # Values carry on until the next parameter, loop or data block
+
+                while i < len(lines):
+                    line = lines[i]
+                    if line.startswith(";"):
+                        i = self.text_end(lines, i)
+                        end = i
+                        continue
+                    split_line = line.strip().lower()
+                    if (
+                        split_line.startswith("_")
+                        or split_line == "loop_"
+                        or split_line.startswith("data_")
+                    ):
+                        break
+                    if split_line != "" and not split_line.startswith("#"):
+                        end = i + 1
+                    i += 1
+
+                entries.append(
+                    {"names": names, "start": start, "end": end, "loop": True}
+                )
+                i = end
+
+            elif stripped.startswith("_"):
+                start = i
+                split_line = stripped.split(None, 1)
+                name = split_line[0].lower()
+
+                if len(split_line) == 2:
+                    value = split_line[1]
+                    i += 1
+                else:
+                    # The value is on the next line (ie a text field)
+
+                    i += 1
+                    while i < len(lines) and lines[i].strip() == "":
+                        i += 1
+                    if i < len(lines) and lines[i].startswith(";"):
+                        value_start = i
+                        i = self.text_end(lines, i)
+                        value = "".join(lines[value_start:i]).rstrip("\n")
+                    elif i < len(lines):
+                        value = lines[i].strip()
+                        i += 1
+                    else:
+                        value = "?"
+
+                entries.append(
+                    {
+                        "names": [name],
+                        "start": start,
+                        "end": i,
+                        "loop": False,
+                        "value": value,
+                    }
+                )
+
+            elif lines[i].startswith(";"):
+                i = self.text_end(lines, i)
+
+            else:
+                i += 1
+
+        return entries
+
+    def text_end(self, lines: list, start: int) -> int:
+        """Finds the end of a text field (between two lines starting with ;)
+
+        Args:
+            lines (list): lines of the CIF file
+            start (int): the line the text field starts on
+
+        Returns:
+            end (int): the line after the text field finishes
+        """
+
+        i = start + 1
+
+        while i < len(lines) and not lines[i].startswith(";"):
+            i += 1
+
+        return i + 1
+
+    def format_value(self, value) -> str:
+        """Converts a value into how it should be written in a CIF
+
+        Args:
+            value: the value for the CIF parameter
+
+        Returns:
+            value (str): the value, with quotes or as a text field if needed
+        """
+
+        value = str(value)
+
+        if "\n" in value:
+            return ";\n" + value.strip("\n") + "\n;"
+        if value == "":
+            return "?"
+        if any(character.isspace() for character in value) or value[0] in "_#$'\"[]":
+            if "'" not in value:
+                return "'" + value + "'"
+            return '"' + value + '"'
+
+        return value
+
+    def plain_value(self, value: str) -> str:
+        """Removes the quotes or text field markers from a value written in a CIF
+
+        Args:
+            value (str): the value as it is written in the file
+
+        Returns:
+            value (str): the value without the CIF formatting
+        """
+
+        if value.startswith(";"):
+            return value.strip(";").strip("\n")
+        if len(value) > 1 and value[0] in "'\"" and value[-1] == value[0]:
+            return value[1:-1]
+
+        return value
+
+    def format_item(self, name: str, value: str) -> str:
+        """Writes out a single CIF parameter in the same layout as SHELXL
+
+        Args:
+            name (str): the CIF parameter
+            value (str): the value as it should be written in the file
+
+        Returns:
+            text (str): the line(s) for the parameter
+        """
+
+        if value.startswith(";"):
+            return name + "\n" + value + "\n"
+
+        return name.ljust(39) + " " + value + "\n"
+
+    def read_structure(self, structure: str) -> dict:
+        """Reads in a structure CIF to merge the template into
+
+        Args:
+            structure (str): full path to the structure CIF
+
+        Returns:
+            structure (dict): the lines of the file and the parameters found in them
+        """
+
+        lines = self.read_lines(structure)
+
+        return {"lines": lines, "entries": self.scan(lines)}
+
+    def template_items(self) -> list:
+        """Gets the parameters from the instrument CIF which are copied across
+
+        Loops are never copied, so the symmetry operators, atom sites etc
+
+        of the structure CIF are kept (as the original merge_CIFs did)
+
+        Returns:
+            entries (list): single parameters which are not in the ignored entries
+        """
+
+        return [
+            entry
+            for entry in self.entries
+            if entry["loop"] == False
+            and not any(name in self.ignored_entries for name in entry["names"])
+        ]
+
+    def merged_values(self, structure: dict) -> dict:
+        """Gets the value of every (non-loop) parameter after merging
+
+        Args:
+            structure (dict): the structure CIF from read_structure
+
+        Returns:
+            values (dict): the value of each parameter as it is written in the file
+        """
+
+        values = {}
+
+        for entry in structure["entries"] + self.template_items():
+            if entry["loop"] == False:
+                values[entry["names"][0]] = entry["value"]
+
+        return values
+
+    def merge(self, structure: dict, edits: dict = None) -> str:
+        """Merges the instrument CIF into a structure CIF
+
+        Parameters already in the structure CIF are changed where they are,
+
+        and new parameters are added after the data_ line
+
+        Args:
+            structure (dict): the structure CIF from read_structure
+            edits (dict): any other parameters to change, with the values
+
+                            as they should be written in the file (see format_value)
+
+        Returns:
+            text (str): the merged CIF
+        """
+
+        changes = {}
+
+        for entry in self.template_items():
+            changes[entry["names"][0]] = "".join(
+                self.lines[entry["start"] : entry["end"]]
+            )
+
+        if edits is not None:
+            for name in edits:
+                changes[name.lower()] = self.format_item(name, edits[name])
+
+        return self.apply(structure, changes)
+
+    def render(self, edits: dict = None) -> str:
+        """Writes out the instrument CIF itself with some parameters changed
+
+        ie to set the temperature for each dataset
+
+        Args:
+            edits (dict): the parameters to change, with the values
+
+                            as they should be written in the file (see format_value)
+
+        Returns:
+            text (str): the edited instrument CIF
+        """
+
+        changes = {}
+
+        if edits is not None:
+            for name in edits:
+                changes[name.lower()] = self.format_item(name, edits[name])
+
+        return self.apply({"lines": self.lines, "entries": self.entries}, changes)
+
+    def apply(self, structure: dict, changes: dict) -> str:
+        """Makes the changes to the lines of a CIF
+
+        Loops in the CIF are left as they are
+
+        Args:
+            structure (dict): the lines of the CIF and the parameters found in them
+            changes (dict): text for each non-loop parameter to add or replace
+
+        Returns:
+            text (str): the changed CIF
+        """
+
+        lines = structure["lines"]
+        replacements = {}
+        in_loops = set()
+
+        for entry in structure["entries"]:
+            if entry["loop"] == True:
+                in_loops.update(entry["names"])
+
+        changes = dict(changes)
+
+        for entry in structure["entries"]:
+            if entry["loop"] == False and entry["names"][0] in changes:
+                replacements[entry["start"]] = (
+                    entry["end"],
+                    changes.pop(entry["names"][0]),
+                )
+
+        for name in list(changes):
+            if name in in_loops:
+                logging.info(
+                    __name__ + " : " + name + " is in a loop so has not been changed"
+                )
+                changes.pop(name)
+
+        insert = "".join(changes.values())
+
+        # New parameters go straight after the data_ line
+
+        insert_at = 0
+
+        for index, line in enumerate(lines):
+            if line.lower().startswith("data_"):
+                insert_at = index + 1
+                break
+
+        output = lines[:insert_at]
+
+        if insert != "":
+            output.append(insert)
+
+        i = insert_at
+
+        while i < len(lines):
+            if i in replacements:
+                end, text = replacements[i]
+                output.append(text)
+                i = end
+            else:
+                output.append(lines[i])
+                i += 1
+
+        return "".join(output)
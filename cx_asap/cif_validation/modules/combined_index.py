@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+
+###################################################################################################
+# ----------------------------------CX-ASAP: combined CIF index------------------------------------#
+# ---Authors: Amy J. Thompson, Kate M. Smith, Daniel J. Eriksson, Jack K. Clegg & Jason R. Price---#
+# -----------------------------------Python Implementation by AJT----------------------------------#
+# -----------------------------------Project Design by JRP and JKC---------------------------------#
+# --------------------------------Valuable Coding Support by KMS & DJE-----------------------------#
+###################################################################################################
+
+# ----------Required Modules----------#
+
+from CifFile import ReadCif
+import pandas as pd
+import pathlib
+import os
+import io
+import logging
+
+# ----------Class Definition----------#
+
+
+class Combined_CIF_Index:
+    def __init__(self, cif_path: str) -> None:
+        """Initialises the class
+
+        A combined CIF can have hundreds of structures in it, so reading
+
+        the whole file to get a few of them is slow
+
+        The index is a small csv next to the combined CIF (ie combined_index.csv)
+
+        with the position (in bytes) and length of each data block, as well as
+
+        the temperature and unit cell, so single blocks can be read straight away
+
+        The size and modification time of the combined CIF are saved with it,
+
+        so an index for a CIF that was changed some other way is not used
+
+        Args:
+            cif_path (str): full path to the combined CIF
+        """
+
+        self.cif_path = pathlib.Path(cif_path)
+        self.index_path = self.cif_path.parent / (self.cif_path.stem + "_index.csv")
+
+        # These are the parameters saved for each block
+
+        self.metadata = [
+            "_diffrn_ambient_temperature",
+            "_cell_length_a",
+            "_cell_length_b",
+            "_cell_length_c",
+            "_cell_angle_alpha",
+            "_cell_angle_beta",
+            "_cell_angle_gamma",
+        ]
+
+        self.columns = (
+            ["Data_Block", "Offset", "Length"]
+            + self.metadata
+            + ["CIF_Size", "CIF_Modified"]
+        )
+
+    def scan(self, data: bytes, start: int = 0) -> list:
+        """Finds the data blocks in some CIF text
+
+        Args:
+            data (bytes): the CIF text
+            start (int): position of this text in the combined CIF (in bytes)
+
+        Returns:
+            entries (list): list of dictionaries with the details of each block
+        """
+
+        entries = []
+        in_text = False
+        position = 0
+
+        for line in data.splitlines(keepends=True):
+            # Data blocks can't start inside text fields (ie the embedded .res and .hkl)
+
+            if line.startswith(b";"):
+                in_text = not in_text
+            elif in_text == False and line[:5].lower() == b"data_":
+                name = line[5:].strip().decode("utf8", errors="replace")
+                entries.append({"Data_Block": name, "Offset": position})
+            position += len(line)
+
+        for index, item in enumerate(entries):
+            if index + 1 < len(entries):
+                end = entries[index + 1]["Offset"]
+            else:
+                end = len(data)
+            item.update(self.block_metadata(data[item["Offset"] : end]))
+            item["Length"] = end - item["Offset"]
+            item["Offset"] += start
+
+        return entries
+
+    def block_metadata(self, data: bytes) -> dict:
+        """Gets the temperature and unit cell out of a single data block
+
+        Values are kept as they are in the CIF (ie with the esd)
+
+        Args:
+            data (bytes): the text of the data block
+
+        Returns:
+            metadata (dict): the value of each metadata parameter (None if not found)
+        """
+
+        metadata = dict.fromkeys(self.metadata)
+        in_text = False
+
+        for line in data.splitlines():
+            if line.startswith(b";"):
+                in_text = not in_text
+                continue
+            if in_text:
+                continue
+            split_line = line.split()
+            if len(split_line) == 2:
+                item = split_line[0].decode("utf8", errors="replace").lower()
+                if item in metadata and metadata[item] is None:
+                    metadata[item] = split_line[1].decode("utf8", errors="replace")
+
+        return metadata
+
+    def write(self, entries: list) -> "pd.DataFrame":
+        """Writes out the index
+
+        This should be done once the combined CIF is finished, as its
+
+        size and modification time at this point are saved in the index
+
+        Args:
+            entries (list): list of dictionaries with the details of each block
+
+        Returns:
+            df (pd.DataFrame): the index
+        """
+
+        cif_stat = os.stat(self.cif_path)
+
+        df = pd.DataFrame(entries, columns=self.columns)
+        df["CIF_Size"] = cif_stat.st_size
+        df["CIF_Modified"] = cif_stat.st_mtime_ns
+        df.to_csv(self.index_path, index=None)
+
+        return df
+
+    def build(self) -> "pd.DataFrame":
+        """Makes the index by reading through the whole combined CIF
+
+        This is only needed if the index is missing or out of date, as
+
+        Combined_CIF_Writer makes the index while writing the combined CIF
+
+        Returns:
+            df (pd.DataFrame): the index
+        """
+
+        with open(self.cif_path, "rb") as f:
+            data = f.read()
+
+        entries = self.scan(data)
+        df = self.write(entries)
+
+        logging.info(
+            __name__
+            + " : Made index of "
+            + str(len(entries))
+            + " blocks in "
+            + str(self.cif_path)
+        )
+
+        return df
+
+    def is_current(self, df: "pd.DataFrame") -> bool:
+        """Checks that the index matches the combined CIF
+
+        The combined CIF should have the same size and modification time as
+
+        when the index was written, and the last block should finish at its end
+
+        Args:
+            df (pd.DataFrame): the index
+
+        Returns:
+            current (bool): true if the index can be used
+        """
+
+        cif_stat = os.stat(self.cif_path)
+
+        if len(df) == 0:
+            return False
+
+        return (
+            int(df["CIF_Size"].iloc[0]) == cif_stat.st_size
+            and int(df["CIF_Modified"].iloc[0]) == cif_stat.st_mtime_ns
+            and int(df["Offset"].iloc[-1] + df["Length"].iloc[-1]) == cif_stat.st_size
+        )
+
+    def read(self) -> "pd.DataFrame":
+        """Reads in the index, remaking it if it is missing or out of date
+
+        Returns:
+            df (pd.DataFrame): the index
+        """
+
+        try:
+            df = pd.read_csv(self.index_path, dtype={"Data_Block": str})
+        except (FileNotFoundError, pd.errors.EmptyDataError):
+            return self.build()
+
+        if list(df.columns) != self.columns or not self.is_current(df):
+            return self.build()
+
+        return df
+
+    def read_block_text(self, blocks: list = None) -> dict:
+        """Reads the text of only the requested data blocks
+
+        Args:
+            blocks (list): names of the data blocks (without 'data_'),
+
+                            if not given, every block is read
+
+        Returns:
+            text (dict): the text of each block, with the block name as the key
+        """
+
+        df = self.read()
+
+        if blocks is not None:
+            wanted = [str(item).lower() for item in blocks]
+            df = df[df["Data_Block"].str.lower().isin(wanted)]
+
+        text = {}
+
+        with open(self.cif_path, "rb") as f:
+            for block, offset, length in zip(
+                df["Data_Block"], df["Offset"], df["Length"]
+            ):
+                f.seek(int(offset))
+                text[block] = f.read(int(length)).decode("utf8", errors="replace")
+
+        return text
+
+    def read_blocks(self, blocks: list = None) -> "CifFile.CifFile":
+        """Reads only the requested data blocks with PyCifRW
+
+        Args:
+            blocks (list): names of the data blocks (without 'data_'),
+
+                            if not given, every block is read
+
+        Returns:
+            cif (CifFile.CifFile): the requested blocks
+        """
+
+        text = "".join(self.read_block_text(blocks).values())
+
+        return ReadCif(io.StringIO(text))
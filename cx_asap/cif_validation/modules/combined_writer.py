@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+
+###################################################################################################
+# ----------------------------------CX-ASAP: combined CIF writer-----------------------------------#
+# ---Authors: Amy J. Thompson, Kate M. Smith, Daniel J. Eriksson, Jack K. Clegg & Jason R. Price---#
+# -----------------------------------Python Implementation by AJT----------------------------------#
+# -----------------------------------Project Design by JRP and JKC---------------------------------#
+# --------------------------------Valuable Coding Support by KMS & DJE-----------------------------#
+###################################################################################################
+
+# ----------Required Modules----------#
+
+import os
+import pathlib
+import shutil
+import logging
+from cif_validation.modules.combined_index import Combined_CIF_Index
+
+# ----------Class Definition----------#
+
+
+class Combined_CIF_Writer:
+    def __init__(
+        self,
+        location: str,
+        cif_name: str = "combined.cif",
+        validation_name: str = "check_CIF.chk",
+        append: bool = True,
+    ) -> None:
+        """Initialises the class
+
+        Writes the combined CIF and combined checkCIF report for a whole run
+
+        The files are kept open for the whole run and written to temporary files,
+
+        which only replace the real files when the run is finished (close)
+
+        This means a crash part way through never leaves a half-written combined CIF
+
+        Blocks can be added out of order - they are kept in memory until
+
+        all of the blocks before them have been written
+
+        An index of where each block is in the combined CIF is also written
+
+        (see Combined_CIF_Index)
+
+        Args:
+            location (str): full path to the folder the files are written to
+            cif_name (str): name of the combined CIF
+            validation_name (str): name of the combined checkCIF report
+            append (bool): if true, anything already in the combined files is kept
+
+                            (this is how the combined files have always worked)
+        """
+
+        self.location = pathlib.Path(location)
+        self.cif_path = self.location / cif_name
+        self.validation_path = self.location / validation_name
+        self.append = append
+
+        self.cif_temp = self.location / ("." + cif_name + ".tmp")
+        self.validation_temp = self.location / ("." + validation_name + ".tmp")
+
+        self.cif_file = None
+        self.validation_file = None
+
+        self.index = Combined_CIF_Index(self.cif_path)
+        self.index_entries = []
+
+        self.buffer = {}
+        self.next_position = 0
+        self.blocks_written = 0
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def open(self) -> None:
+        """Opens the temporary files
+
+        If appending, the current contents of the combined files are copied in first,
+
+        and the blocks already in the combined CIF are kept in the index
+        """
+
+        self.index_entries = []
+
+        if self.append == True and os.path.exists(self.cif_path):
+            self.index_entries = self.index.read().to_dict("records")
+
+        for final, temp in [
+            (self.cif_path, self.cif_temp),
+            (self.validation_path, self.validation_temp),
+        ]:
+            if self.append == True and os.path.exists(final):
+                shutil.copyfile(final, temp)
+            else:
+                with open(temp, "w"):
+                    pass
+
+        self.cif_file = open(self.cif_temp, "ab")
+        self.offset = os.path.getsize(self.cif_temp)
+        self.validation_file = open(self.validation_temp, "a")
+
+        self.buffer = {}
+        self.next_position = 0
+        self.blocks_written = 0
+
+    def write_block(
+        self, cif_text: str, validation: list = None, position: int = None
+    ) -> None:
+        """Adds a CIF block (and its checkCIF report) to the combined files
+
+        Args:
+            cif_text (str): the CIF text (ie from PyCifRW WriteOut)
+            validation (list): lines of the checkCIF report for this CIF
+            position (int): where this block goes in the combined CIF
+
+                            if not given, blocks are written in the order they are added
+        """
+
+        if self.cif_file is None:
+            self.open()
+
+        if validation is None:
+            validation = []
+
+        if position is None:
+            position = max([self.next_position - 1] + list(self.buffer.keys())) + 1
+
+        if position < self.next_position or position in self.buffer:
+            logging.info(
+                __name__
+                + " : Block position "
+                + str(position)
+                + " has already been written"
+            )
+            raise ValueError("Block position " + str(position) + " already used")
+
+        self.buffer[position] = (cif_text, validation)
+
+        # Write everything that is now in order
+
+        while self.next_position in self.buffer:
+            self._write(*self.buffer.pop(self.next_position))
+            self.next_position += 1
+
+    def _write(self, cif_text: str, validation: list) -> None:
+        """Writes one block straight to the temporary files
+
+        Args:
+            cif_text (str): the CIF text
+            validation (list): lines of the checkCIF report
+        """
+
+        # Otherwise the next block would start on the same line
+
+        if not cif_text.endswith("\n"):
+            cif_text += "\n"
+
+        data = cif_text.encode("utf8")
+
+        self.cif_file.write(data)
+        self.index_entries += self.index.scan(data, self.offset)
+        self.offset += len(data)
+
+        for line in validation:
+            self.validation_file.write(line)
+
+        self.blocks_written += 1
+
+    def close(self) -> None:
+        """Finishes the run
+
+        Any blocks still waiting (ie if a position was skipped) are written in order,
+
+        then the temporary files replace the combined files
+        """
+
+        if self.cif_file is None:
+            return
+
+        for position in sorted(self.buffer):
+            self._write(*self.buffer[position])
+
+        self.buffer = {}
+
+        for handle in [self.cif_file, self.validation_file]:
+            handle.flush()
+            os.fsync(handle.fileno())
+            handle.close()
+
+        os.replace(self.cif_temp, self.cif_path)
+        os.replace(self.validation_temp, self.validation_path)
+
+        # If this does not finish, the index is remade next time it is read
+
+        self.index.write(self.index_entries)
+
+        self.cif_file = None
+        self.validation_file = None
+
+        logging.info(
+            __name__
+            + " : "
+            + str(self.blocks_written)
+            + " blocks written to "
+            + str(self.cif_path)
+        )
+
+    def abort(self) -> None:
+        """Stops the run without changing the combined files
+
+        The temporary files are deleted
+        """
+
+        for handle in [self.cif_file, self.validation_file]:
+            if handle is not None:
+                handle.close()
+
+        for temp in [self.cif_temp, self.validation_temp]:
+            if os.path.exists(temp):
+                os.remove(temp)
+
+        self.cif_file = None
+        self.validation_file = None
+        self.buffer = {}
+
+        logging.info(__name__ + " : Combined CIF not written as the run was stopped")
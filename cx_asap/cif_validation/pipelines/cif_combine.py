@@ -12,6 +12,7 @@
 
 from system_files.utils import Nice_YAML_Dumper, Config, File_Sorter
 from cif_validation.modules.cif_merge import Cif_Merge
+from cif_validation.modules.combined_writer import Combined_CIF_Writer
 from CifFile import ReadCif
 import os
 import logging
@@ -52,12 +53,13 @@ class Cif_Combine:
         validate = Cif_Merge()
         sorter = File_Sorter()
 
-        for item in sorter.sorted_properly(os.listdir()):
-            if item.endswith(".cif"):
-                self.cif = ReadCif(item)
-                with open("combined.cif", "a") as f:
-                    f.write(self.cif.WriteOut())
-                validate.validate_CIFs(item)
-                with open("combined_check_CIF.chk", "a") as f:
-                    for line in validate.validation:
-                        f.write(line)
+        # The combined files are only replaced once every CIF has been added
+
+        with Combined_CIF_Writer(
+            location, "combined.cif", "combined_check_CIF.chk"
+        ) as writer:
+            for item in sorter.sorted_properly(os.listdir()):
+                if item.endswith(".cif") and item != "combined.cif":
+                    self.cif = ReadCif(item)
+                    validate.validate_CIFs(item)
+                    writer.write_block(self.cif.WriteOut(), validate.validation)
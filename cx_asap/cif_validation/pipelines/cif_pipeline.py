@@ -13,7 +13,9 @@
 import os
 import pathlib
 from cif_validation.modules.cif_merge import Cif_Merge
+from cif_validation.modules.combined_writer import Combined_CIF_Writer
 import logging
+import pandas as pd
 from system_files.utils import Nice_YAML_Dumper, Config, Directory_Browse
 
 # ----------Class Definition----------#
@@ -61,6 +63,7 @@ class CIF_Compile_Pipeline:
         instrument_ending: str = False,
         instrument_file: str = False,
         additional_user_parameters: list = False,
+        skip_failed_precheck: bool = False,
     ) -> None:
         """Allows input of variables to be saved to the class
 
@@ -78,6 +81,8 @@ class CIF_Compile_Pipeline:
             instrument_file(str): name of the instrument file if they are all consistent
             additional_user_parameters(list): list of extra cif parameters the user has edited
                                             CURRENTLY UNDER DEVELOPMENT AS OPTION NOT IMPLEMENTED
+            skip_failed_precheck(bool): if true, platon is not run on CIFs which
+                                        have level A alerts in the pre-check
         """
 
         self.tree = Directory_Browse(location, self.test_mode)
@@ -93,6 +98,7 @@ class CIF_Compile_Pipeline:
         self.instrument_ending = instrument_ending
         self.instrument_file = instrument_file
         self.additional_user_parameters = additional_user_parameters
+        self.skip_failed_precheck = skip_failed_precheck
 
     def compile_cifs(self, output_location: str, ignored_folders: list = []) -> None:
         """Goes to a defined experiment location (self.location)
@@ -107,6 +113,10 @@ class CIF_Compile_Pipeline:
 
         Outputs checkCIF and merged CIF into the output_location
 
+        These combined files are only replaced once every CIF has been added
+
+        The alerts from the CIF pre-check are also output as CIF_Precheck_Alerts.csv
+
         Args:
             output_location(str): full path to the output location
             ignored_folders(list): list of any folders which should be ignored during the iteration
@@ -114,58 +124,91 @@ class CIF_Compile_Pipeline:
 
         # Compiles the cif based on the directory browse for a set of data
 
-        for item in self.tree.directories:
+        precheck_alerts = []
 
-            if item not in ignored_folders:
+        with Combined_CIF_Writer(
+            output_location, "combined.cif", "check_CIF.chk"
+        ) as writer:
+            for item in self.tree.directories:
 
-                self.tree.enter_directory(
-                    item, ".cif", self.instrument_file, ignored_folders
-                )
-                if self.instrument_file == False:
-                    self.finalise.import_CIFs(
-                        pathlib.Path(self.tree.item_name + self.instrument_ending),
-                        self.tree.item_file,
-                    )
-                if (
-                    self.instrument_ending == False
-                    and self.instrument_file == "autoprocess.cif"
-                ):
-                    self.finalise.synchrotron_cif_edit(
-                        pathlib.Path(self.instrument_file)
-                    )
-                    self.finalise.import_CIFs(
-                        pathlib.Path(self.instrument_file), self.tree.item_file
-                    )
-                if (
-                    self.instrument_ending == False
-                    and self.instrument_file != "autoprocess.cif"
-                ):
-                    self.finalise.import_CIFs(
-                        pathlib.Path(self.instrument_file), self.tree.item_file
-                    )
-                self.finalise.merge_CIFs()
-                if self.additional_user_parameters == False:
-                    self.finalise.user_edits(
-                        self.solution_program,
-                        self.chemical_formula,
-                        self.crystal_habit,
-                        self.crystal_colour,
-                        self.max_dimension,
-                        self.middle_dimension,
-                        self.min_dimension,
-                    )
+                if item not in ignored_folders:
 
-                if self.tree.item_file != "":
-                    logging.info(__name__ + " : Adding Cif..." + str(item))
-                    self.finalise.single_write_out(self.tree.item_file.name)
-                    self.finalise.validate_CIFs(self.tree.item_file.name)
-                    self.finalise.write_out(
-                        output_location,
-                        "combined.cif",
-                        "check_CIF.chk",
-                        self.tree.item_file,
+                    self.tree.enter_directory(
+                        item, ".cif", self.instrument_file, ignored_folders
                     )
-                    self.tree.check_file_contents()
-                self.tree.exit_directory()
+                    # The synchrotron autoprocess.cif still needs PyCifRW to fix its formatting
+
+                    if (
+                        self.instrument_ending == False
+                        and self.instrument_file == "autoprocess.cif"
+                    ):
+                        self.finalise.synchrotron_cif_edit(
+                            pathlib.Path(self.instrument_file)
+                        )
+                        self.finalise.import_CIFs(
+                            pathlib.Path(self.instrument_file), self.tree.item_file
+                        )
+                        self.finalise.merge_CIFs()
+                        if self.additional_user_parameters == False:
+                            self.finalise.user_edits(
+                                self.solution_program,
+                                self.chemical_formula,
+                                self.crystal_habit,
+                                self.crystal_colour,
+                                self.max_dimension,
+                                self.middle_dimension,
+                                self.min_dimension,
+                            )
+
+                    # Otherwise the instrument CIF is only read once and patched into each CIF
+
+                    else:
+                        if self.instrument_file == False:
+                            instrument = pathlib.Path(
+                                self.tree.item_name + self.instrument_ending
+                            )
+                        else:
+                            instrument = pathlib.Path(self.instrument_file)
+
+                        if self.additional_user_parameters == False:
+                            user_parameters = self.finalise.user_parameters(
+                                self.solution_program,
+                                self.chemical_formula,
+                                self.crystal_habit,
+                                self.crystal_colour,
+                                self.max_dimension,
+                                self.middle_dimension,
+                                self.min_dimension,
+                            )
+                        else:
+                            user_parameters = None
+
+                        self.finalise.template_merge(
+                            instrument, self.tree.item_file, user_parameters
+                        )
+
+                    if self.tree.item_file != "":
+                        logging.info(__name__ + " : Adding Cif..." + str(item))
+                        self.finalise.single_write_out(self.tree.item_file.name)
+                        precheck_alerts += self.finalise.precheck_CIFs(
+                            self.tree.item_file.name
+                        )
+                        self.finalise.validate_CIFs(
+                            self.tree.item_file.name, self.skip_failed_precheck
+                        )
+                        self.finalise.write_out(
+                            output_location,
+                            "combined.cif",
+                            "check_CIF.chk",
+                            self.tree.item_file,
+                            writer,
+                        )
+                        self.tree.check_file_contents()
+                    self.tree.exit_directory()
 
         os.chdir(output_location)
+
+        alerts_df = pd.DataFrame(
+            precheck_alerts, columns=["CIF", "Item", "Level", "Message"]
+        )
+        alerts_df.to_csv("CIF_Precheck_Alerts.csv", index=None)
@@ -111,13 +111,16 @@ import logging
 import platform
 import time
 import shutil
+import pandas as pd
 from typing import Union, Tuple
 
-from system_files.utils import Generate, File_Sorter
+from system_files.utils import Generate, File_Sorter, Config, YAML_Loader, YAML_Dumper
+from system_files.figure_rendering import Figure_Renderer, find_manifests
 from system_files.test_installation import Test
 from data_refinement.modules.refinement import Structure_Refinement
 from data_refinement.pipelines.refine_pipeline import Refinement_Pipeline
 from cif_validation.modules.cif_merge import Cif_Merge
+from cif_validation.modules.checkcif_cache import CheckCIF_Cache
 from cif_validation.modules.instrument_cif_generation import Instrument_CIF
 from cif_validation.pipelines.cif_combine import Cif_Combine
 from cif_validation.pipelines.cif_pipeline import CIF_Compile_Pipeline
@@ -125,6 +128,7 @@ from post_refinement_analysis.modules.cell_analysis import Cell_Deformation
 from post_refinement_analysis.modules.cif_read import CIF_Read
 from post_refinement_analysis.modules.rotation_planes import Rotation
 from post_refinement_analysis.modules.structural_analysis import Structural_Analysis
+from post_refinement_analysis.modules.partitioned_output import Partitioned_Output
 from post_refinement_analysis.modules.ADP_analysis import ADP_analysis
 from post_refinement_analysis.pipelines.rotation_pipeline import Rotation_Pipeline
 from post_refinement_analysis.pipelines.variable_cif_parameter import (
@@ -307,7 +311,7 @@ def yaml_creation(yaml_dict: dict) -> None:
     # yaml_path = pathlib.Path(os.path.join(os.getcwd()), "conf.yaml")
 
     with open(yaml_path, "w") as f:
-        new_yaml = yaml.dump(yaml_dict, f)
+        new_yaml = yaml.dump(yaml_dict, f, Dumper=YAML_Dumper)
 
 
 def configuration_check(heading: str) -> Tuple[bool, dict]:
@@ -347,7 +351,7 @@ def configuration_check(heading: str) -> Tuple[bool, dict]:
     else:
         with open(yaml_path, "r") as f:
             try:
-                cfg = yaml.load(f, yaml.FullLoader)
+                cfg = yaml.load(f, YAML_Loader)
             except:
                 click.echo("Failed to set up config file. Try reconfiguring")
                 exit()
@@ -450,6 +454,13 @@ def cli():
     """
 
 
+@cli.result_callback()
+def flush_system_file(result, **kwargs) -> None:
+    """Writes the changes to sys.yaml made by a module/pipeline once it finishes"""
+
+    Config.flush()
+
+
 ##########-Test Command-##########
 
 
@@ -483,6 +494,80 @@ def errors() -> None:
                 click.echo(line)
 
 
+##########-CheckCIF Cache Command-##########
+
+
+@click.command("checkcif-cache", short_help="List or purge cached checkCIF reports")
+@click.option("--list", "show", is_flag=True, help="view the cached checkCIF reports")
+@click.option("--purge", is_flag=True, help="delete all cached checkCIF reports")
+def checkcif_cache(show, purge) -> None:
+    """checkCIF reports are cached so that CIFs which have not changed
+    are not sent through platon again.
+    This command will list or delete the cached reports.
+    """
+    cache = CheckCIF_Cache()
+
+    if show:
+        entries = cache.list_entries()
+        click.echo("\nCached checkCIF reports: " + str(len(entries)))
+        for item in entries:
+            click.echo(item["created"] + "  " + item["cif"] + "  " + item["key"])
+    elif purge:
+        removed = cache.purge()
+        click.echo("\nRemoved " + str(removed) + " cached checkCIF reports")
+    else:
+        click.echo("Please select an option. To view options, add --help")
+
+
+##########-Export Individual CSVs Command-##########
+
+
+@click.command(
+    "export-csv", short_help="Write individual .csv files from a parquet/hdf5 file"
+)
+@click.argument("dataset", type=click.Path(exists=True))
+@click.option("--key", multiple=True, help="only export this bond/atom (repeatable)")
+def export_csv(dataset, key) -> None:
+    """Structural and ADP analysis can write their individual data
+    as one parquet/hdf5 file instead of thousands of .csv files.
+    This command writes the individual .csv files back out from that file,
+    into a folder with the same name.
+    """
+    dataset = pathlib.Path(dataset).absolute()
+    output = Partitioned_Output(dataset.parent / dataset.stem, output_format=None)
+
+    if output.output_format == "csv":
+        click.echo("\nCould not read " + str(dataset))
+    else:
+        exported = output.export_csv(list(key) if key else None)
+        click.echo(
+            "\nWrote " + str(len(exported)) + " .csv files to " + str(output.location)
+        )
+
+
+@click.command("render", short_help="Draw figures saved as .plot.json files")
+@click.argument("paths", nargs=-1, type=click.Path(exists=True))
+@click.option("--workers", type=int, help="number of processes drawing figures")
+def render(paths, workers) -> None:
+    """Modules and pipelines run with --render-later save a small .plot.json
+    file instead of each figure. This command draws the figures from them,
+    either the given .plot.json files or every one in the given folders
+    (the current folder if none are given).
+    """
+    manifests = find_manifests(paths if paths else [pathlib.Path.cwd()])
+
+    with Figure_Renderer(workers) as renderer:
+        failed = renderer.render(manifests)
+
+    click.echo(
+        "\nDrew "
+        + str(len(manifests) - len(failed))
+        + " of "
+        + str(len(manifests))
+        + " figures"
+    )
+
+
 ##########-Output Completion Message-##########
 
 
@@ -552,7 +637,12 @@ def os_test() -> None:
 @click.option("--files", is_flag=True, help="view the required input files")
 @click.option("--configure", is_flag=True, help="generate your conf.yaml file")
 @click.option("--run", is_flag=True, help="run the code!")
-def module_refinement(dependencies, files, configure, run):
+@click.option(
+    "--render-later",
+    is_flag=True,
+    help="save plot specs (.plot.json) to draw later with 'cxasap render'",
+)
+def module_refinement(dependencies, files, configure, run, render_later):
     """This module will refine a single structure to convergence using a
     single reference file.
     """
@@ -602,14 +692,15 @@ def module_refinement(dependencies, files, configure, run):
             click.echo("READY TO RUN SCRIPT!\n")
 
             reset_logs()
-            shelxl = Structure_Refinement()
-            shelxl.run_shelxl(
-                cfg["structure_location"],
-                cfg["reference_path"],
-                cfg["refinements_to_check"],
-                cfg["tolerance"],
-                cfg["maximum_cycles"],
-            )
+            with Figure_Renderer(render_later=render_later):
+                shelxl = Structure_Refinement()
+                shelxl.run_shelxl(
+                    cfg["structure_location"],
+                    cfg["reference_path"],
+                    cfg["refinements_to_check"],
+                    cfg["tolerance"],
+                    cfg["maximum_cycles"],
+                )
 
             copy_logs(pathlib.Path(cfg["structure_location"]).parent)
 
@@ -644,7 +735,18 @@ def module_refinement(dependencies, files, configure, run):
 @click.option("--files", is_flag=True, help="view the required input files")
 @click.option("--configure", is_flag=True, help="generate your conf.yaml file")
 @click.option("--run", is_flag=True, help="run the code!")
-def pipeline_refinement(dependencies, files, configure, run):
+@click.option(
+    "--render-later",
+    is_flag=True,
+    help="save plot specs (.plot.json) to draw later with 'cxasap render'",
+)
+@click.option(
+    "--processes",
+    type=int,
+    default=None,
+    help="refine this many structures at once, with checkCIF as each one finishes",
+)
+def pipeline_refinement(dependencies, files, configure, run, render_later, processes):
     """This module will refine a series of structures to convergence
     based on a single reference file. Such a dataset might have come from a
     dynamic experiment, such as variable-temperature, variable-pressure,
@@ -652,7 +754,8 @@ def pipeline_refinement(dependencies, files, configure, run):
     """
     if dependencies:
         click.echo("\nYou require the below software in your path:")
-        click.echo("- SHELXL\n")
+        click.echo("- SHELXL")
+        click.echo("- Platon (only with --processes)\n")
     elif files:
         click.echo("\nYou require the below files:")
         click.echo(" - a reference .ins or .res file")
@@ -699,15 +802,17 @@ def pipeline_refinement(dependencies, files, configure, run):
         else:
             click.echo("READY TO RUN SCRIPT!\n")
             reset_logs()
-            shelxl = Refinement_Pipeline()
-            shelxl.multiple_refinement(
-                cfg["experiment_location"],
-                cfg["reference_path"],
-                cfg["experiment_location"],
-                cfg["refinements_to_check"],
-                cfg["tolerance"],
-                cfg["maximum_cycles"],
-            )
+            with Figure_Renderer(render_later=render_later):
+                shelxl = Refinement_Pipeline()
+                shelxl.multiple_refinement(
+                    cfg["experiment_location"],
+                    cfg["reference_path"],
+                    cfg["experiment_location"],
+                    cfg["refinements_to_check"],
+                    cfg["tolerance"],
+                    cfg["maximum_cycles"],
+                    processes,
+                )
 
             copy_logs(cfg["experiment_location"])
         output_message()
@@ -744,7 +849,12 @@ def pipeline_refinement(dependencies, files, configure, run):
 @click.option("--files", is_flag=True, help="view the required input files")
 @click.option("--configure", is_flag=True, help="generate your conf.yaml file")
 @click.option("--run", is_flag=True, help="run the code!")
-def pipeline_general(dependencies, files, configure, run):
+@click.option(
+    "--render-later",
+    is_flag=True,
+    help="save plot specs (.plot.json) to draw later with 'cxasap render'",
+)
+def pipeline_general(dependencies, files, configure, run, render_later):
     """This pipeline will refine a series of .hkl/.ins files based on a common
     reference and provide finalised .cif files, checkCIF reports and structural
     analysis. Use this only if your files are already in the correct directory
@@ -834,47 +944,48 @@ def pipeline_general(dependencies, files, configure, run):
             reset_logs()
             full = General_Pipeline()
 
-            full.make_dirs(cfg["experiment_location"])
+            with Figure_Renderer(render_later=render_later):
+                full.make_dirs(cfg["experiment_location"])
 
-            full.reference_extract(
-                cfg["reference_cif_location"],
-                cfg["experiment_location"],
-                cfg["varying_parameter_values"],
-                cfg["varying_cif_parameter"],
-            )
+                full.reference_extract(
+                    cfg["reference_cif_location"],
+                    cfg["experiment_location"],
+                    cfg["varying_parameter_values"],
+                    cfg["varying_cif_parameter"],
+                )
 
-            full.process(
-                cfg["experiment_location"],
-                full.reference_res,
-                full.stats_location,
-                cfg["refinements_to_check"],
-                cfg["tolerance"],
-                cfg["maximum_cycles"],
-            )
+                full.process(
+                    cfg["experiment_location"],
+                    full.reference_res,
+                    full.stats_location,
+                    cfg["refinements_to_check"],
+                    cfg["tolerance"],
+                    cfg["maximum_cycles"],
+                )
 
-            full.analyse(
-                full.reference_res,
-                cfg["experiment_location"],
-                full.results_location,
-                "cx-asap",
-                full.chemical_formula,
-                full.crystal_habit,
-                full.crystal_colour,
-                full.max_dimension,
-                full.mid_dimension,
-                full.min_dimension,
-                cfg["structural_analysis_bonds"],
-                cfg["structural_analysis_angles"],
-                cfg["structural_analysis_torsions"],
-                cfg["structural_analysis_hbonds"],
-                cfg["cif_parameters"],
-                cfg["atoms_for_analysis"],
-                cfg["varying_cif_parameter"],
-                False,
-                "instrument.cif",
-                True,
-                cfg["ADP_analysis"],
-            )
+                full.analyse(
+                    full.reference_res,
+                    cfg["experiment_location"],
+                    full.results_location,
+                    "cx-asap",
+                    full.chemical_formula,
+                    full.crystal_habit,
+                    full.crystal_colour,
+                    full.max_dimension,
+                    full.mid_dimension,
+                    full.min_dimension,
+                    cfg["structural_analysis_bonds"],
+                    cfg["structural_analysis_angles"],
+                    cfg["structural_analysis_torsions"],
+                    cfg["structural_analysis_hbonds"],
+                    cfg["cif_parameters"],
+                    cfg["atoms_for_analysis"],
+                    cfg["varying_cif_parameter"],
+                    False,
+                    "instrument.cif",
+                    True,
+                    cfg["ADP_analysis"],
+                )
 
             copy_logs(full.results_location)
 
@@ -912,7 +1023,12 @@ def pipeline_general(dependencies, files, configure, run):
 @click.option("--files", is_flag=True, help="view the required input files")
 @click.option("--configure", is_flag=True, help="generate your conf.yaml file")
 @click.option("--run", is_flag=True, help="run the code!")
-def pipeline_general_extra(dependencies, files, configure, run):
+@click.option(
+    "--render-later",
+    is_flag=True,
+    help="save plot specs (.plot.json) to draw later with 'cxasap render'",
+)
+def pipeline_general_extra(dependencies, files, configure, run, render_later):
     """This pipeline will refine a series of .hkl/.ins files based on a common
     reference and provide finalised .cif files, checkCIF reports and structural analysis.
     This version of the script will set up folders for you based on your configuration file.
@@ -1003,46 +1119,47 @@ def pipeline_general_extra(dependencies, files, configure, run):
             reset_logs()
             full = General_Pipeline()
 
-            full.make_dirs(cfg["experiment_location"])
+            with Figure_Renderer(render_later=render_later):
+                full.make_dirs(cfg["experiment_location"])
 
-            full.file_tree_setup(
-                cfg["reference_location"],
-                cfg["experiment_location"],
-                cfg["varying_parameter_values"],
-                cfg["varying_cif_parameter"],
-            )
+                full.file_tree_setup(
+                    cfg["reference_location"],
+                    cfg["experiment_location"],
+                    cfg["varying_parameter_values"],
+                    cfg["varying_cif_parameter"],
+                )
 
-            full.process(
-                cfg["experiment_location"],
-                full.reference_res,
-                full.stats_location,
-                cfg["refinements_to_check"],
-                cfg["tolerance"],
-                cfg["maximum_cycles"],
-            )
+                full.process(
+                    cfg["experiment_location"],
+                    full.reference_res,
+                    full.stats_location,
+                    cfg["refinements_to_check"],
+                    cfg["tolerance"],
+                    cfg["maximum_cycles"],
+                )
 
-            full.analyse(
-                full.reference_res,
-                cfg["experiment_location"],
-                full.results_location,
-                "cx-asap",
-                full.chemical_formula,
-                full.crystal_habit,
-                full.crystal_colour,
-                full.max_dimension,
-                full.mid_dimension,
-                full.min_dimension,
-                cfg["structural_analysis_bonds"],
-                cfg["structural_analysis_angles"],
-                cfg["structural_analysis_torsions"],
-                cfg["structural_analysis_hbonds"],
-                cfg["cif_parameters"],
-                cfg["atoms_for_analysis"],
-                cfg["varying_cif_parameter"],
-                False,
-                "instrument.cif",
-                True,
-            )
+                full.analyse(
+                    full.reference_res,
+                    cfg["experiment_location"],
+                    full.results_location,
+                    "cx-asap",
+                    full.chemical_formula,
+                    full.crystal_habit,
+                    full.crystal_colour,
+                    full.max_dimension,
+                    full.mid_dimension,
+                    full.min_dimension,
+                    cfg["structural_analysis_bonds"],
+                    cfg["structural_analysis_angles"],
+                    cfg["structural_analysis_torsions"],
+                    cfg["structural_analysis_hbonds"],
+                    cfg["cif_parameters"],
+                    cfg["atoms_for_analysis"],
+                    cfg["varying_cif_parameter"],
+                    False,
+                    "instrument.cif",
+                    True,
+                )
 
             copy_logs(full.results_location)
 
@@ -1078,11 +1195,18 @@ def pipeline_general_extra(dependencies, files, configure, run):
 @click.option("--files", is_flag=True, help="view the required input files")
 @click.option("--configure", is_flag=True, help="generate your conf.yaml file")
 @click.option("--run", is_flag=True, help="run the code!")
-def module_cif_merge(dependencies, files, configure, run):
+@click.option(
+    "--skip-failed-precheck",
+    is_flag=True,
+    help="do not run checkCIF if the CIF fails the quick pre-check",
+)
+def module_cif_merge(dependencies, files, configure, run, skip_failed_precheck):
     """This module will merge one instrument CIF with one structure cif.
     This is useful if it was not done automatically through your structure
     solution/refinement software.
     CheckCIF will also be run to quickly validate the output.
+    The CIF is quickly pre-checked for missing or impossible values first,
+    with the alerts output to CIF_Precheck_Alerts.csv
     """
     if dependencies:
         click.echo("\nYou require the below software in your path:")
@@ -1125,13 +1249,22 @@ def module_cif_merge(dependencies, files, configure, run):
                 pathlib.Path(cfg["instrument_cif"]), pathlib.Path(cfg["new_cif"])
             )
             merge.merge_CIFs()
+            precheck_alerts = merge.precheck_CIFs(cfg["new_cif"])
             merge.write_out(
                 pathlib.Path(cfg["new_cif"]).parent,
                 "combined.cif",
                 "check_CIF.chk",
                 pathlib.Path(cfg["new_cif"]).name,
             )
-            merge.validate_CIFs("combined.cif")
+            merge.validate_CIFs("combined.cif", skip_failed_precheck)
+
+            alerts_df = pd.DataFrame(
+                precheck_alerts, columns=["CIF", "Item", "Level", "Message"]
+            )
+            alerts_df.to_csv(
+                pathlib.Path(cfg["new_cif"]).parent / "CIF_Precheck_Alerts.csv",
+                index=None,
+            )
 
             copy_logs(pathlib.Path(cfg["new_cif"]).parent)
 
@@ -1304,9 +1437,16 @@ def pipeline_cif_combine(dependencies, files, configure, run):
 @click.option("--files", is_flag=True, help="view the required input files")
 @click.option("--configure", is_flag=True, help="generate your conf.yaml file")
 @click.option("--run", is_flag=True, help="run the code!")
-def pipeline_cif(dependencies, files, configure, run):
+@click.option(
+    "--skip-failed-precheck",
+    is_flag=True,
+    help="do not run checkCIF on CIFs that fail the quick pre-check",
+)
+def pipeline_cif(dependencies, files, configure, run, skip_failed_precheck):
     """This pipeline will merge a series of CIF files with instrument CIFs.
     All CIFs will then be combined and run through checkCIF.
+    Each CIF is quickly pre-checked for missing or impossible values first,
+    with the alerts output to CIF_Precheck_Alerts.csv
     """
     if dependencies:
         click.echo("\nYou require the below software in your path:")
@@ -1375,6 +1515,7 @@ def pipeline_cif(dependencies, files, configure, run):
                 cfg["min_crystal_dimension"],
                 cfg["instrument_ending"],
                 cfg["instrument_file"],
+                skip_failed_precheck=skip_failed_precheck,
             )
 
             cifs.compile_cifs(cfg["experiment_location"])
@@ -1410,7 +1551,12 @@ def pipeline_cif(dependencies, files, configure, run):
 @click.option("--files", is_flag=True, help="view the required input files")
 @click.option("--configure", is_flag=True, help="generate your conf.yaml file")
 @click.option("--run", is_flag=True, help="run the code!")
-def module_cell_analysis(dependencies, files, configure, run):
+@click.option(
+    "--render-later",
+    is_flag=True,
+    help="save plot specs (.plot.json) to draw later with 'cxasap render'",
+)
+def module_cell_analysis(dependencies, files, configure, run, render_later):
     """This module will analyse changes in the unit cell from a .csv file.
     If you have already run the cif reading module, then the file should be in the correct format.
     """
@@ -1453,35 +1599,37 @@ def module_cell_analysis(dependencies, files, configure, run):
         else:
             click.echo("READY TO RUN SCRIPT!\n")
             reset_logs()
-            analysis = Cell_Deformation()
-            analysis.import_data(cfg["csv_location"], cfg["reference_unit_cell"])
-            analysis.calculate_deformations()
-            analysis.graphical_analysis(cfg["x_axis_header"], cfg["x_axis_header"])
-
-            # This is defined outside of the class, because when doing multiple analysis for a series of mapping experiments, the dictionary will be different, however, as this is a standalone module and not a pipeline for multiple structures, it is defined here
-
-            try:
-                test1 = analysis.df["_diffrn_reflns_av_R_equivalents"]
-                test2 = analysis.df["_refine_ls_R_factor_gt"]
-                test3 = analysis.df["_diffrn_measured_fraction_theta_full"]
-            except:
-                # self.logger.critical('No data quality statistics found in imported .csv file')
-                logging.critical(
-                    __name__
-                    + " : No data quality statistics found in imported .csv file"
+            with Figure_Renderer(render_later=render_later):
+                analysis = Cell_Deformation()
+                analysis.import_data(cfg["csv_location"], cfg["reference_unit_cell"])
+                analysis.calculate_deformations()
+                analysis.write_strain_analysis(cfg["x_axis_header"])
+                analysis.graphical_analysis(cfg["x_axis_header"], cfg["x_axis_header"])
+
+                # This is defined outside of the class, because when doing multiple analysis for a series of mapping experiments, the dictionary will be different, however, as this is a standalone module and not a pipeline for multiple structures, it is defined here
+
+                try:
+                    test1 = analysis.df["_diffrn_reflns_av_R_equivalents"]
+                    test2 = analysis.df["_refine_ls_R_factor_gt"]
+                    test3 = analysis.df["_diffrn_measured_fraction_theta_full"]
+                except:
+                    # self.logger.critical('No data quality statistics found in imported .csv file')
+                    logging.critical(
+                        __name__
+                        + " : No data quality statistics found in imported .csv file"
+                    )
+                    print("Error! Check logs")
+                    exit()
+
+                y_dict = {
+                    "R1": analysis.df["_refine_ls_R_factor_gt"],
+                    "Rint": analysis.df["_diffrn_reflns_av_R_equivalents"],
+                    "Completeness": analysis.df["_diffrn_measured_fraction_theta_full"],
+                }
+
+                analysis.quality_analysis(
+                    cfg["x_axis_header"], y_dict, analysis.cfg["x_axis_header"]
                 )
-                print("Error! Check logs")
-                exit()
-
-            y_dict = {
-                "R1": analysis.df["_refine_ls_R_factor_gt"],
-                "Rint": analysis.df["_diffrn_reflns_av_R_equivalents"],
-                "Completeness": analysis.df["_diffrn_measured_fraction_theta_full"],
-            }
-
-            analysis.quality_analysis(
-                cfg["x_axis_header"], y_dict, analysis.cfg["x_axis_header"]
-            )
 
             copy_logs(pathlib.Path(cfg["csv_location"]).parent)
 
@@ -1695,7 +1843,18 @@ def module_rotation_planes(dependencies, files, configure, run):
 @click.option("--files", is_flag=True, help="view the required input files")
 @click.option("--configure", is_flag=True, help="generate your conf.yaml file")
 @click.option("--run", is_flag=True, help="run the code!")
-def module_structural_analysis(dependencies, files, configure, run):
+@click.option(
+    "--output-format",
+    type=click.Choice(["csv", "parquet", "hdf5"]),
+    default="csv",
+    help="write individual data as .csv files, or as one parquet/hdf5 file",
+)
+@click.option(
+    "--render-later",
+    is_flag=True,
+    help="save plot specs (.plot.json) to draw later with 'cxasap render'",
+)
+def module_structural_analysis(dependencies, files, configure, run, output_format, render_later):
     """This module will examine structural data in .csv files and separate/graph the important parts of interest.
     For example, if you are investigating the spin-crossover properties of a metal complex, you might be most interested in the M-L bond lengths.
     By specifying the metal atom, you graphs will be provided and a separated spreadsheet of those bonds will be provided.
@@ -1750,14 +1909,16 @@ def module_structural_analysis(dependencies, files, configure, run):
         else:
             click.echo("READY TO RUN SCRIPT!\n")
             reset_logs()
-            geometry = Structural_Analysis()
-            geometry.import_and_analyse(
-                cfg["bond_data"],
-                cfg["angle_data"],
-                cfg["torsion_data"],
-                cfg["hbond_data"],
-                cfg["atoms_for_analysis"],
-            )
+            with Figure_Renderer(render_later=render_later):
+                geometry = Structural_Analysis()
+                geometry.import_and_analyse(
+                    cfg["bond_data"],
+                    cfg["angle_data"],
+                    cfg["torsion_data"],
+                    cfg["hbond_data"],
+                    cfg["atoms_for_analysis"],
+                    output_format=output_format,
+                )
 
             copy_logs(pathlib.Path.cwd())
 
@@ -1872,7 +2033,12 @@ def pipeline_rotation_planes(dependencies, files, configure, run):
 @click.option("--files", is_flag=True, help="view the required input files")
 @click.option("--configure", is_flag=True, help="generate your conf.yaml file")
 @click.option("--run", is_flag=True, help="run the code!")
-def pipeline_variable_analysis(dependencies, files, configure, run):
+@click.option(
+    "--render-later",
+    is_flag=True,
+    help="save plot specs (.plot.json) to draw later with 'cxasap render'",
+)
+def pipeline_variable_analysis(dependencies, files, configure, run, render_later):
     """This pipeline will analyse .cif files for a dynamic experiment where one
     parameter in the cif files is changing. For example, this might be a
     change in temperature, pressure, etc.
@@ -1934,19 +2100,20 @@ def pipeline_variable_analysis(dependencies, files, configure, run):
         else:
             click.echo("READY TO RUN SCRIPT!\n")
             reset_logs()
-            variable_analysis = Variable_Analysis_Pipeline()
-            variable_analysis.analyse_data(
-                cfg["reference_unit_cell"],
-                cfg["experiment_location"],
-                cfg["cif_parameters"],
-                cfg["atoms_for_analysis"],
-                cfg["varying_cif_parameter"],
-                cfg["structural_analysis_bonds"],
-                cfg["structural_analysis_angles"],
-                cfg["structural_analysis_torsions"],
-                cfg["structural_analysis_hbonds"],
-                cfg["ADP_analysis"],
-            )
+            with Figure_Renderer(render_later=render_later):
+                variable_analysis = Variable_Analysis_Pipeline()
+                variable_analysis.analyse_data(
+                    cfg["reference_unit_cell"],
+                    cfg["experiment_location"],
+                    cfg["cif_parameters"],
+                    cfg["atoms_for_analysis"],
+                    cfg["varying_cif_parameter"],
+                    cfg["structural_analysis_bonds"],
+                    cfg["structural_analysis_angles"],
+                    cfg["structural_analysis_torsions"],
+                    cfg["structural_analysis_hbonds"],
+                    cfg["ADP_analysis"],
+                )
 
             copy_logs(cfg["experiment_location"])
 
@@ -1980,7 +2147,13 @@ def pipeline_variable_analysis(dependencies, files, configure, run):
 @click.option("--files", is_flag=True, help="view the required input files")
 @click.option("--configure", is_flag=True, help="generate your conf.yaml file")
 @click.option("--run", is_flag=True, help="run the code!")
-def module_adp_analysis(dependencies, files, configure, run):
+@click.option(
+    "--output-format",
+    type=click.Choice(["csv", "parquet", "hdf5"]),
+    default="csv",
+    help="write individual data as .csv files, or as one parquet/hdf5 file",
+)
+def module_adp_analysis(dependencies, files, configure, run, output_format):
     """This module will analyse the ADPs that have been previously
     extracted from CIF files. It is recommended that you run this
     AFTER module-cif-read OR use a pipeline with this included
@@ -2026,7 +2199,7 @@ def module_adp_analysis(dependencies, files, configure, run):
             click.echo("READY TO RUN SCRIPT!\n")
             reset_logs()
             adps = ADP_analysis()
-            adps.analyse_data(cfg["csv_path"], cfg["cell_path"])
+            adps.analyse_data(cfg["csv_path"], cfg["cell_path"], output_format)
 
             copy_logs(pathlib.Path(cfg["csv_path"]).parent)
 
@@ -2046,6 +2219,9 @@ if os_name == "Windows":
 windows_modules = [
     test,
     errors,
+    checkcif_cache,
+    export_csv,
+    render,
     module_refinement,
     pipeline_refinement,
     pipeline_general,
@@ -2089,6 +2265,9 @@ else:
 
     cli.add_command(test)
     cli.add_command(errors)
+    cli.add_command(checkcif_cache)
+    cli.add_command(export_csv)
+    cli.add_command(render)
     cli.add_command(module_refinement)
     cli.add_command(pipeline_refinement)
     cli.add_command(pipeline_general)
@@ -26,7 +26,7 @@ import pathlib
 import subprocess
 import shutil
 import logging
-from typing import Tuple
+from typing import Tuple, Generator
 
 # ----------Class Definition----------#
 
@@ -321,6 +321,57 @@ class Structure_Refinement:
 
         Outputs statistics graphs (R1, Weight, Shift)
 
+        The refinement itself is in refinement_steps, this function
+
+        just runs SHELXL each time it is asked for
+
+        Args:
+            ins_file (str): full path to the new .ins file
+            reference (str): full path to the reference .ins file
+            refinements (int): number of refinements to check for shift convergence
+            tolerance (float): target shift value
+            max_cycles (int): maximum cycles SHELXL can run before stopping
+
+        Returns:
+            worked_flag (bool): whether or not the structure refined successfully
+        """
+
+        os.chdir(pathlib.Path(ins_file).parent)
+
+        steps = self.refinement_steps(
+            ins_file, reference, refinements, tolerance, max_cycles
+        )
+
+        try:
+            command, folder = next(steps)
+            while True:
+                shelxl = subprocess.call(command, cwd=folder)
+                command, folder = next(steps)
+        except StopIteration as finished:
+            return finished.value
+
+    def refinement_steps(
+        self,
+        ins_file: str,
+        reference: str,
+        refinements: int,
+        tolerance: float,
+        max_cycles: int,
+    ) -> Generator[Tuple[list, pathlib.Path], None, bool]:
+        """Does the refinement of a single structure, stopping each time
+
+        SHELXL needs to be run
+
+        Each time it stops, it gives the command and the folder to run it in,
+
+        and carries on once SHELXL has finished (ie with next())
+
+        This means the same refinement can be run one at a time (run_shelxl)
+
+        or alongside other structures (overall_pipelines.async_pipeline)
+
+        All files are found with full paths, so the current working directory does not matter
+
         Args:
             ins_file (str): full path to the new .ins file
             reference (str): full path to the reference .ins file
@@ -334,13 +385,15 @@ class Structure_Refinement:
 
         failure = False
 
-        new_structure = pathlib.Path(ins_file)
+        new_structure = pathlib.Path(ins_file).absolute()
 
-        res_file = str(new_structure.stem) + ".res"
+        folder = new_structure.parent
 
-        os.chdir(new_structure.parent)
+        res_file = folder / (str(new_structure.stem) + ".res")
 
-        self.import_refinement(new_structure.name, reference)
+        lst_file_name = folder / (str(new_structure.stem) + ".lst")
+
+        self.import_refinement(new_structure, reference)
 
         df_weights = pd.DataFrame()
         df_shifts = pd.DataFrame()
@@ -359,7 +412,7 @@ class Structure_Refinement:
             refine_count += 1
             weight = ""
             new_weight = ""
-            shelxl = subprocess.call(["shelxl", new_structure.stem])
+            yield ["shelxl", new_structure.stem], folder
 
             with open(res_file, "rt") as refinement:
                 lines = refinement.readlines()
@@ -370,9 +423,9 @@ class Structure_Refinement:
 
             for line in lines:
                 if "TITL" in line:
-                    for item in os.listdir():
+                    for item in os.listdir(folder):
                         if new_structure.stem + ".cif" == item:
-                            file_size = os.path.getsize(item)
+                            file_size = os.path.getsize(folder / item)
                             if file_size > 0:
                                 worked_flag = True
 
@@ -383,7 +436,7 @@ class Structure_Refinement:
             else:
 
                 try:
-                    shutil.copy(res_file, new_structure.name)
+                    shutil.copy(res_file, new_structure)
                 except FileNotFoundError:
                     logging.info(__name__ + " : Refinement Failed")
                 else:
@@ -415,7 +468,7 @@ class Structure_Refinement:
 
                     # Copying the res to the ins file and changing the weight in the instruction section of the file
 
-                    with open(new_structure.name, "rt") as initial:
+                    with open(new_structure, "rt") as initial:
                         lines = initial.readlines()
 
                         ACTA_flag = False
@@ -425,7 +478,7 @@ class Structure_Refinement:
                             if "ACTA" in line:
                                 ACTA_flag = True
 
-                        with open(new_structure.name, "w") as initial:
+                        with open(new_structure, "w") as initial:
                             for line in lines:
                                 if End_Flag == False:
 
@@ -456,9 +509,7 @@ class Structure_Refinement:
                             logging.info(__name__ + " : " + str(new_structure.name))
                             logging.info(__name__ + " : " + str(new_weight))
 
-                            with open(
-                                str(new_structure.stem) + ".lst", "rt"
-                            ) as lst_file:
+                            with open(lst_file_name, "rt") as lst_file:
                                 lst_lines = lst_file.readlines()
                             for line in lst_lines:
                                 if "R1" and "Fo > 4sig(Fo)" in line:
@@ -467,16 +518,19 @@ class Structure_Refinement:
                                     elif line.split(" ")[4] != "":
                                         r_factor_list.append(float(line.split(" ")[4]))
                                     else:
+                                        logging.critical(
+                                            __name__
+                                            + " : Could not read R1 from "
+                                            + str(lst_file_name)
+                                        )
                                         print(
-                                            "Error with reading R1 from shelxl. Plz investigate refinement.py line ~300"
+                                            "Error with reading R1 from shelxl - check error log"
                                         )
-                                        exit()
+                                        return False
 
-                            if os.path.exists(str(new_structure.stem) + ".lst"):
+                            if os.path.exists(lst_file_name):
 
-                                with open(
-                                    new_structure.stem + ".lst", "rt"
-                                ) as refinement:
+                                with open(lst_file_name, "rt") as refinement:
                                     lines = refinement.readlines()
 
                                 (
@@ -528,8 +582,9 @@ class Structure_Refinement:
                 == len(r_factor_list)
             ):
 
-                self.figure_name = (
-                    "Refinement_Statistics_" + str(new_structure.stem) + ".png"
+                self.figure_name = str(
+                    folder
+                    / ("Refinement_Statistics_" + str(new_structure.stem) + ".png")
                 )
                 x1 = list(range(1, len(weight_list_1) + 1))
                 x2 = list(range(1, len(refinement_shifts) + 1))
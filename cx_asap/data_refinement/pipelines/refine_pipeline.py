@@ -12,6 +12,10 @@
 
 from system_files.utils import Nice_YAML_Dumper, Config, Directory_Browse
 from data_refinement.modules.refinement import Structure_Refinement
+from overall_pipelines.async_pipeline import Async_Series_Pipeline
+from system_files.figure_rendering import copy_figure
+from typing import Tuple
+import pathlib
 import shutil
 import os
 import logging
@@ -56,6 +60,7 @@ class Refinement_Pipeline:
         refinements_to_check: int,
         tolerance: float,
         max_cycles: int,
+        max_processes: int = None,
     ) -> None:
         """Runs SHELXL on a series of structures based on one reference
 
@@ -65,6 +70,12 @@ class Refinement_Pipeline:
 
         is output as both a file and to the terminal
 
+        If max_processes is given, the structures are refined at the same time
+
+        (see overall_pipelines.async_pipeline) and checkCIF is run on each
+
+        structure as soon as it has refined
+
         Args:
             location (str): full path to the folder containing folders of .ins files
             reference (str): full path to the reference .ins/.res file
@@ -72,6 +83,9 @@ class Refinement_Pipeline:
             refinements_to_check (int): number of refinements to check for shift convergence
             tolerance (float): target shift value
             max_cycles (int): maximum cycles SHELXL can run before stopping
+            max_processes (int): maximum number of programs running at once
+
+                                if not given, one structure is refined at a time
         """
 
         successful_structures = []
@@ -79,8 +93,24 @@ class Refinement_Pipeline:
         failed_structures = []
 
         self.tree = Directory_Browse(location, self.test_mode)
+        if max_processes is not None:
+            successful_structures, failed_structures = self.overlapped_refinement(
+                reference,
+                graph_output_location,
+                refinements_to_check,
+                tolerance,
+                max_cycles,
+                max_processes,
+            )
+
+            # Every folder has been refined already, so the loop below is skipped
+
+            directories = []
+        else:
+            directories = self.tree.directories
+
         self.shelxl = Structure_Refinement(self.test_mode)
-        for item in self.tree.directories:
+        for item in directories:
 
             shelxl_run_flag = False
 
@@ -102,7 +132,7 @@ class Refinement_Pipeline:
                 # Ie it saves the user having to dig through each individual folder to look at them
 
                 try:
-                    shutil.copy(self.shelxl.figure_name, graph_output_location)
+                    copy_figure(self.shelxl.figure_name, graph_output_location)
                 except:
                     logging.info(__name__ + " : Refinement failed so no graph :( ")
 
@@ -188,3 +218,73 @@ class Refinement_Pipeline:
         else:
             print("None")
         print(a)
+
+    def overlapped_refinement(
+        self,
+        reference: str,
+        graph_output_location: str,
+        refinements_to_check: int,
+        tolerance: float,
+        max_cycles: int,
+        max_processes: int,
+    ) -> Tuple[list, list]:
+        """Refines and validates every structure in self.tree at the same time
+
+        The next structure is refining while the last one is being validated,
+
+        with at most max_processes programs running at once
+
+        Args:
+            reference (str): full path to the reference .ins/.res file
+            graph_output_location (str): full path to the location of output files
+            refinements_to_check (int): number of refinements to check for shift convergence
+            tolerance (float): target shift value
+            max_cycles (int): maximum cycles SHELXL can run before stopping
+            max_processes (int): maximum number of programs running at once
+
+        Returns:
+            successful_structures (list): full paths to the .ins files that refined
+            failed_structures (list): full paths to the .ins files that did not refine
+        """
+
+        successful_structures = []
+
+        failed_structures = []
+
+        ins_files = []
+
+        for item in self.tree.directories:
+            self.tree.enter_directory(item, ".ins")
+            if self.tree.item_file != "":
+                ins_files.append(pathlib.Path(self.tree.item_file).absolute())
+            else:
+                logging.info(__name__ + " : No .ins file in folder " + str(item))
+            self.tree.exit_directory()
+
+        pipeline = Async_Series_Pipeline(max_processes, self.test_mode)
+
+        results = pipeline.run_series(
+            ins_files, reference, refinements_to_check, tolerance, max_cycles
+        )
+
+        for result in results:
+            ins_file = result["ins_file"]
+            cif_file = ins_file.parent / (ins_file.stem + ".cif")
+            figure_name = ins_file.parent / (
+                "Refinement_Statistics_" + ins_file.stem + ".png"
+            )
+
+            self.tree.check_file_contents(ins_file)
+
+            if result["refined"] == True:
+                successful_structures.append(ins_file)
+                try:
+                    copy_figure(figure_name, graph_output_location)
+                except:
+                    logging.info(__name__ + " : Refinement failed so no graph :( ")
+            else:
+                failed_structures.append(ins_file)
+                if cif_file.exists():
+                    os.rename(cif_file, str(cif_file) + "_old")
+
+        return successful_structures, failed_structures
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+
+###################################################################################################
+# -----------------------------------CX-ASAP: async tool pipeline----------------------------------#
+# ---Authors: Amy J. Thompson, Kate M. Smith, Daniel J. Eriksson, Jack K. Clegg & Jason R. Price---#
+# -----------------------------------Python Implementation by AJT----------------------------------#
+# -----------------------------------Project Design by JRP and JKC---------------------------------#
+# --------------------------------Valuable Coding Support by KMS & DJE-----------------------------#
+###################################################################################################
+
+# ----------Required Modules----------#
+
+from data_refinement.modules.refinement import Structure_Refinement
+from cif_validation.modules.checkcif_cache import CheckCIF_Cache
+import asyncio
+import weakref
+import pathlib
+import shutil
+import os
+import logging
+
+# ----------Class Definition----------#
+
+
+class Async_Tool_Runner:
+    def __init__(self, max_processes: int = None, use_cache: bool = True) -> None:
+        """Initialises the class
+
+        Runs the external programs (shelxl, platon, shredcif) with asyncio,
+
+        so that while one program is running, others can be started
+
+        The number of programs running at once is limited by max_processes
+
+        Nothing here changes the current working directory, so many
+
+        structures can be worked on at the same time
+
+        Args:
+            max_processes (int): maximum number of programs running at once
+
+                                if not given, this is the number of CPUs
+            use_cache (bool): if true, previous checkCIF reports are reused
+
+                                (see CheckCIF_Cache)
+        """
+
+        if max_processes is None:
+            max_processes = os.cpu_count() or 1
+
+        self.max_processes = max_processes
+        self.use_cache = use_cache
+        self.cache = CheckCIF_Cache()
+
+        # A semaphore belongs to the event loop it is first used in, so there is
+
+        # one for each event loop (ie each asyncio.run) the runner is used in
+
+        self._budgets = weakref.WeakKeyDictionary()
+
+    @property
+    def budget(self) -> asyncio.Semaphore:
+        """The semaphore limiting the programs running at once in this event loop"""
+
+        loop = asyncio.get_running_loop()
+
+        if loop not in self._budgets:
+            self._budgets[loop] = asyncio.Semaphore(self.max_processes)
+
+        return self._budgets[loop]
+
+    async def run_tool(
+        self, command: list, folder: str, timeout: float = None
+    ) -> int:
+        """Runs a single program once there is room in the budget
+
+        Args:
+            command (list): the program and its arguments
+            folder (str): full path to the folder to run the program in
+            timeout (float): seconds before the program is stopped
+
+        Returns:
+            return_code (int): the return code of the program, or None
+
+                                if it was stopped or could not be found
+        """
+
+        async with self.budget:
+            logging.info(
+                __name__ + " : Running " + " ".join(command) + " in " + str(folder)
+            )
+
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *command,
+                    cwd=folder,
+                    stdin=asyncio.subprocess.DEVNULL,
+                )
+            except FileNotFoundError:
+                logging.info(__name__ + " : " + command[0] + " is not in your path")
+                return None
+
+            try:
+                return await asyncio.wait_for(process.wait(), timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                logging.info(
+                    __name__
+                    + " : "
+                    + command[0]
+                    + " stopped after "
+                    + str(timeout)
+                    + " seconds"
+                )
+                return None
+
+    async def shelxl(self, ins_file: str) -> int:
+        """Runs SHELXL once on a .ins file
+
+        Args:
+            ins_file (str): full path to the .ins file
+
+        Returns:
+            return_code (int): the return code of SHELXL
+        """
+
+        ins_file = pathlib.Path(ins_file).absolute()
+
+        return await self.run_tool(["shelxl", ins_file.stem], ins_file.parent)
+
+    async def shredcif(self, cif_file: str) -> int:
+        """Runs shredCIF on a .cif to get the .res and .hkl out of it
+
+        Args:
+            cif_file (str): full path to the .cif file
+
+        Returns:
+            return_code (int): the return code of shredCIF
+        """
+
+        cif_file = pathlib.Path(cif_file).absolute()
+
+        return await self.run_tool(["shredcif", cif_file.name], cif_file.parent)
+
+    async def platon(self, cif_file: str, timeout: float = 45) -> list:
+        """Runs platon checkCIF on a .cif
+
+        Like Cif_Merge.validate_CIFs, the report is saved as check_CIF.chk
+
+        in the same folder as the .cif
+
+        Args:
+            cif_file (str): full path to the .cif file
+            timeout (float): seconds before platon is stopped
+
+        Returns:
+            validation (list): lines of the checkCIF report (empty if it failed)
+        """
+
+        cif_file = pathlib.Path(cif_file).absolute()
+        report_path = cif_file.parent / "check_CIF.chk"
+
+        if self.use_cache == True:
+            cache_key = self.cache.cif_key(cif_file)
+            cached_report = self.cache.lookup(cache_key)
+
+            if cached_report is not None:
+                with open(report_path, "w") as f:
+                    for line in cached_report:
+                        f.write(line)
+                return cached_report
+
+        return_code = await self.run_tool(
+            ["platon", "-u", cif_file.name], cif_file.parent, timeout
+        )
+
+        try:
+            shutil.move(cif_file.parent / (cif_file.stem + ".chk"), report_path)
+        except FileNotFoundError:
+            return []
+
+        with open(report_path, "rt") as f:
+            validation = f.readlines()
+
+        if self.use_cache == True and return_code is not None:
+            self.cache.store(cache_key, cif_file, validation)
+
+        return validation
+
+    async def refine(
+        self,
+        ins_file: str,
+        reference: str,
+        refinements: int,
+        tolerance: float,
+        max_cycles: int,
+        test_mode: bool = False,
+    ) -> bool:
+        """Refines a single structure against a reference model
+
+        This is the same refinement as Structure_Refinement.run_shelxl,
+
+        but other structures can be refined or validated while SHELXL runs
+
+        Args:
+            ins_file (str): full path to the new .ins file
+            reference (str): full path to the reference .ins file
+            refinements (int): number of refinements to check for shift convergence
+            tolerance (float): target shift value
+            max_cycles (int): maximum cycles SHELXL can run before stopping
+            test_mode (bool): if true, the functions are compatible with the testing script
+
+        Returns:
+            worked_flag (bool): whether or not the structure refined successfully
+        """
+
+        refinement = Structure_Refinement(test_mode)
+
+        steps = refinement.refinement_steps(
+            ins_file, reference, refinements, tolerance, max_cycles
+        )
+
+        # The work between SHELXL runs (reading the results, drawing the graphs)
+
+        # is done in a thread, so other programs can still be started meanwhile
+
+        def step() -> tuple:
+            try:
+                return False, next(steps)
+            except StopIteration as finished:
+                return True, finished.value
+
+        loop = asyncio.get_running_loop()
+
+        # Structure_Refinement stops the whole program (exit()) if the .ins files
+
+        # cannot be merged, which would stop every other structure in the series,
+
+        # so here it only fails this structure
+
+        try:
+            finished, value = await loop.run_in_executor(None, step)
+            while finished == False:
+                command, folder = value
+                await self.run_tool(command, folder)
+                finished, value = await loop.run_in_executor(None, step)
+        except SystemExit:
+            logging.critical(
+                __name__ + " : Refinement of " + str(ins_file) + " stopped early"
+            )
+            return False
+
+        return value
+
+
+class Async_Series_Pipeline:
+    def __init__(
+        self, max_processes: int = None, test_mode: bool = False
+    ) -> None:
+        """Initialises the class
+
+        Refines and validates a series of structures, where each structure
+
+        is validated as soon as it has refined
+
+        This means the next structure is refining while the last one is being
+
+        validated, rather than waiting for every structure to refine first
+
+        Args:
+            max_processes (int): maximum number of programs running at once
+            test_mode (bool): Automatically false, if true it will
+
+                            make the functions compatible with the testing script
+        """
+
+        self.test_mode = test_mode
+        self.runner = Async_Tool_Runner(max_processes)
+
+    async def refine_and_validate(
+        self,
+        ins_file: str,
+        reference: str,
+        refinements: int,
+        tolerance: float,
+        max_cycles: int,
+    ) -> dict:
+        """Refines one structure, then runs checkCIF on the .cif from SHELXL
+
+        Args:
+            ins_file (str): full path to the new .ins file
+            reference (str): full path to the reference .ins file
+            refinements (int): number of refinements to check for shift convergence
+            tolerance (float): target shift value
+            max_cycles (int): maximum cycles SHELXL can run before stopping
+
+        Returns:
+            result (dict): the .ins file, whether it refined and the checkCIF report
+        """
+
+        ins_file = pathlib.Path(ins_file).absolute()
+
+        worked = await self.runner.refine(
+            ins_file, reference, refinements, tolerance, max_cycles, self.test_mode
+        )
+
+        validation = []
+
+        if worked == True:
+            validation = await self.runner.platon(
+                ins_file.parent / (ins_file.stem + ".cif")
+            )
+
+        return {"ins_file": ins_file, "refined": worked, "validation": validation}
+
+    async def series(
+        self,
+        ins_files: list,
+        reference: str,
+        refinements: int,
+        tolerance: float,
+        max_cycles: int,
+    ) -> list:
+        """Refines and validates a series of structures at the same time
+
+        Args:
+            ins_files (list): full paths to each new .ins file
+            reference (str): full path to the reference .ins file
+            refinements (int): number of refinements to check for shift convergence
+            tolerance (float): target shift value
+            max_cycles (int): maximum cycles SHELXL can run before stopping
+
+        Returns:
+            results (list): the result for each structure (see refine_and_validate),
+
+                            in the same order as ins_files
+        """
+
+        return await asyncio.gather(
+            *[
+                self.refine_and_validate(
+                    item, reference, refinements, tolerance, max_cycles
+                )
+                for item in ins_files
+            ]
+        )
+
+    def run_series(
+        self,
+        ins_files: list,
+        reference: str,
+        refinements: int,
+        tolerance: float,
+        max_cycles: int,
+    ) -> list:
+        """Runs the series function for code that is not using asyncio
+
+        Args:
+            ins_files (list): full paths to each new .ins file
+            reference (str): full path to the reference .ins file
+            refinements (int): number of refinements to check for shift convergence
+            tolerance (float): target shift value
+            max_cycles (int): maximum cycles SHELXL can run before stopping
+
+        Returns:
+            results (list): the result for each structure (see refine_and_validate)
+        """
+
+        return asyncio.run(
+            self.series(ins_files, reference, refinements, tolerance, max_cycles)
+        )
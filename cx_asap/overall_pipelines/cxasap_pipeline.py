@@ -14,6 +14,7 @@ from system_files.utils import Nice_YAML_Dumper, Config, File_Sorter, Cell_Impor
 from data_refinement.pipelines.refine_pipeline import Refinement_Pipeline
 from cif_validation.pipelines.cif_pipeline import CIF_Compile_Pipeline
 from cif_validation.modules.instrument_cif_generation import Instrument_CIF
+from cif_validation.modules.cif_template import CIF_Template
 from post_refinement_analysis.pipelines.variable_cif_parameter import (
     Variable_Analysis_Pipeline,
 )
@@ -183,6 +184,10 @@ class General_Pipeline:
 
         instrument_path = pathlib.Path.cwd() / "instrument.cif"
 
+        # The instrument CIF is read once, then only the varying parameter is changed for each folder
+
+        template = CIF_Template(instrument_path)
+
         os.chdir(working_directory)
 
         # DON'T use enumerate here, because stats_location and results_location would also contribute to numbers
@@ -198,16 +203,14 @@ class General_Pipeline:
             ):
                 print(item)
 
-                shutil.copy(instrument_path, item)
-
                 os.chdir(item)
 
-                cif = ReadCif(instrument_path.name)
-                data_block = cif.first_block()
-                data_block[varying_param] = varying_data[index]
-
                 with open("instrument.cif", "w") as f:
-                    f.write(cif.WriteOut())
+                    f.write(
+                        template.render(
+                            {varying_param: template.format_value(varying_data[index])}
+                        )
+                    )
 
                 index += 1
                 os.chdir("..")
@@ -271,6 +274,8 @@ class General_Pipeline:
 
         instrument_path = pathlib.Path.cwd() / "instrument.cif"
 
+        template = CIF_Template(instrument_path)
+
         os.chdir(working_directory)
 
         for i, item in enumerate(varying_data):
@@ -290,9 +295,9 @@ class General_Pipeline:
                 and item != self.results_location.name
                 and os.path.isdir(item) == True
             ):
-                try:
-                    shutil.copy(instrument_path, item)
-                except shutil.SameFileError:
+                if (
+                    pathlib.Path(item) / "instrument.cif"
+                ).resolve() == instrument_path.resolve():
                     print(
                         "Error! Please put your reference outside of the working directory"
                     )
@@ -300,12 +305,12 @@ class General_Pipeline:
 
                 os.chdir(item)
 
-                cif = ReadCif(instrument_path.name)
-                data_block = cif.first_block()
-                data_block[varying_param] = varying_data[index]
-
                 with open("instrument.cif", "w") as f:
-                    f.write(cif.WriteOut())
+                    f.write(
+                        template.render(
+                            {varying_param: template.format_value(varying_data[index])}
+                        )
+                    )
 
                 index += 1
                 os.chdir("..")
@@ -347,6 +352,8 @@ class General_Pipeline:
             max_cycles,
         )
 
+        Config.flush()
+
     def analyse(
         self,
         reference: str,
@@ -415,6 +422,9 @@ class General_Pipeline:
             additional_params,
         )
         cif.compile_cifs(results_location, [self.stats_location, self.results_location])
+
+        Config.flush()
+
         analysis = Variable_Analysis_Pipeline(self.test_mode)
         analysis.analyse_data(
             reference,
@@ -428,3 +438,5 @@ class General_Pipeline:
             hbonds,
             adps,
         )
+
+        Config.flush()
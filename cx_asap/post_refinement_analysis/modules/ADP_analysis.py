@@ -11,6 +11,9 @@
 # ----------Required Modules----------#
 
 from system_files.utils import Nice_YAML_Dumper, Config
+from system_files.cell_geometry import Cell_Geometry
+from system_files.compact_tables import Table_Compactor
+from post_refinement_analysis.modules.partitioned_output import Partitioned_Output
 import logging
 import pandas as pd
 import numpy as np
@@ -106,296 +109,263 @@ class ADP_analysis:
 
         return angle, supplementary_angle
 
-    def analyse_data(self, csv_file: str, cell_data: str) -> None:
-        """RECOMMENDED THAT CIF_READ.PY IS RUN FIRST FOR CORRECT FORMATTING
+    def match_cells(
+        self, adp_df: "pd.DataFrame", cell_df: "pd.DataFrame"
+    ) -> "np.array":
+        """Finds the row of the cell table for each atom in the ADP table
 
-        OF INPUT .CSV FILES
+        The tables are joined on CIF_File and Data_Block
 
-        Will take information from ADP data and unit cell data and
+        If the cell table has no Data_Block column (older CIF_Parameters.csv files),
 
-        calculate the principle axes of all the atoms
+        the data blocks in each CIF are matched in the order they appear
 
-        Also calculates the angle between these principle axes and the
+        If neither table has a CIF_File column, the cells are matched to the
 
-        various unit cell axes
+        data blocks in alphabetical order, which is how this used to work
 
         Args:
-            csv_file (str): path to csv containing ADP parameters
-            cell_data (str): path to csv containing cell parameters
+            adp_df (pd.DataFrame): table of ADPs from cif_read
+            cell_df (pd.DataFrame): table of unit cells from cif_read
+
+        Returns:
+            cell_index (np.array): row of cell_df for each atom, or -1 if not found
         """
 
-        adp_df = pd.read_csv(csv_file)
+        blocks = adp_df.loc[:, adp_df.columns.isin(["CIF_File", "Data_Block"])].astype(
+            str
+        )
+        cells = cell_df.loc[
+            :, cell_df.columns.isin(["CIF_File", "Data_Block"])
+        ].astype(str)
+
+        if "Data_Block" in cells:
+            keys = [key for key in ["CIF_File", "Data_Block"] if key in blocks]
+        elif "CIF_File" in cells and "CIF_File" in blocks:
+            keys = ["CIF_File", "Block_Number"]
+            cells["Block_Number"] = cells.groupby("CIF_File").cumcount()
+            unique_blocks = blocks.drop_duplicates()
+            unique_blocks["Block_Number"] = unique_blocks.groupby("CIF_File").cumcount()
+            blocks = blocks.merge(unique_blocks, how="left", on=list(blocks.columns))
+        else:
+            keys = ["Data_Block"]
+            names = np.sort(blocks["Data_Block"].unique())
+            cells = pd.DataFrame({"Data_Block": names[: len(cells)]})
+
+        cells["Cell_Row"] = np.arange(len(cells))
+        cells = cells.drop_duplicates(keys)
+
+        cell_index = (
+            blocks[keys]
+            .merge(cells[keys + ["Cell_Row"]], how="left", on=keys)["Cell_Row"]
+            .fillna(-1)
+            .to_numpy(dtype=int)
+        )
+
+        if (cell_index < 0).any():
+            logging.info(
+                __name__
+                + " : No unit cell found for "
+                + str((cell_index < 0).sum())
+                + " atoms, so these are left blank"
+            )
 
-        new_adp_df = pd.DataFrame()
+        return cell_index
 
-        new_adp_df["Data_Block"] = adp_df["Data_Block"]
-        new_adp_df["Atom"] = adp_df["_atom_site_aniso_label"]
+    def principal_axes(
+        self, U: "np.array", G: "np.array", cell_index: "np.array" = None
+    ) -> dict:
+        """Calculates the principal axes of many atoms at once
 
-        cell_df = pd.read_csv(cell_data)
+        All of the atoms are stacked into one (N,3,3) array, so numpy
 
-        adp_by_cell = adp_df.groupby("Data_Block")
-
-        counter = 0
-
-        principle_A = []
-        principle_B = []
-        principle_C = []
-        principle_A2 = []
-        principle_B2 = []
-        principle_C2 = []
-        vector_A = []
-        vector_B = []
-        vector_C = []
-        vector_A_angle_a = []
-        vector_A_angle_b = []
-        vector_A_angle_c = []
-        vector_B_angle_a = []
-        vector_B_angle_b = []
-        vector_B_angle_c = []
-        vector_C_angle_a = []
-        vector_C_angle_b = []
-        vector_C_angle_c = []
-        vector_A_angle_a_sup = []
-        vector_A_angle_b_sup = []
-        vector_A_angle_c_sup = []
-        vector_B_angle_a_sup = []
-        vector_B_angle_b_sup = []
-        vector_B_angle_c_sup = []
-        vector_C_angle_a_sup = []
-        vector_C_angle_b_sup = []
-        vector_C_angle_c_sup = []
-
-        # Loop through each CIF file
-
-        for name, group in adp_by_cell:
-            # Calculate metric matrix for the structure
-
-            a = cell_df.iloc[counter]["_cell_length_a"]
-            b = cell_df.iloc[counter]["_cell_length_b"]
-            c = cell_df.iloc[counter]["_cell_length_c"]
-            alpha = cell_df.iloc[counter]["_cell_angle_alpha"]
-            beta = cell_df.iloc[counter]["_cell_angle_beta"]
-            gamma = cell_df.iloc[counter]["_cell_angle_gamma"]
-
-            alpha_rad = alpha * (math.pi / 180)
-            beta_rad = beta * (math.pi / 180)
-            gamma_rad = gamma * (math.pi / 180)
-
-            G = np.array(
-                [
-                    [
-                        (a * a),
-                        (a * b * math.cos(gamma_rad)),
-                        (a * c * math.cos(beta_rad)),
-                    ],
-                    [
-                        (b * a * math.cos(gamma_rad)),
-                        (b * b),
-                        (b * c * math.cos(alpha_rad)),
-                    ],
-                    [
-                        (c * a * math.cos(beta_rad)),
-                        (c * b * math.cos(alpha_rad)),
-                        (c * c),
-                    ],
-                ]
-            )
+        does every atom in one call instead of looping through them
+
+        The B matrix is made symmetric using G = L.L^T (Cholesky),
+
+        so that np.linalg.eigh can be used - the eigenvalues are the same
 
-            G_recip = np.linalg.inv(G)
+        as for BG, and the eigenvectors (v = L^-T.y) are already scaled
 
-            a_recip = math.sqrt(G_recip[0][0])
-            b_recip = math.sqrt(G_recip[1][1])
-            c_recip = math.sqrt(G_recip[2][2])
+        to unit length by G, like scale_vector does
 
-            # Loop through each atom
+        Note that the direction (+/-) of an eigenvector is arbitrary, so
 
-            for idx, row in group.iterrows():
-                # Calculate the matricies of thermal parameters for each atom
+        the largest component of each vector is made positive
 
-                U11 = row["_atom_site_aniso_U_11"]
-                U12 = row["_atom_site_aniso_U_12"]
-                U13 = row["_atom_site_aniso_U_13"]
-                U22 = row["_atom_site_aniso_U_22"]
-                U23 = row["_atom_site_aniso_U_23"]
-                U33 = row["_atom_site_aniso_U_33"]
+        Args:
+            U (np.array): (N,6) array of U11, U12, U13, U22, U23, U33 for each atom
+            G (np.array): metric matrix of the unit cell (3,3),
 
-                B11 = 2 * (math.pi**2) * U11 * (a_recip**2)
-                B12 = 2 * (math.pi**2) * U12 * (a_recip * b_recip)
-                B13 = 2 * (math.pi**2) * U13 * (a_recip * c_recip)
-                B22 = 2 * (math.pi**2) * U22 * (b_recip**2)
-                B23 = 2 * (math.pi**2) * U23 * (b_recip * c_recip)
-                B33 = 2 * (math.pi**2) * U33 * (c_recip**2)
+                        or of each unit cell (M,3,3)
+            cell_index (np.array): which unit cell (0 to M-1) each atom is in,
 
-                B = np.array([[B11, B12, B13], [B12, B22, B23], [B13, B23, B33]])
+                        -1 if it has no unit cell
 
-                BG = np.matmul(B, G)
+                        if not given, G must be one cell or one for each atom
 
-                values_unsorted, vectors = np.linalg.eig(BG)
+        Returns:
+            results (dict): "values" (N,3) mean square displacements (largest first),
 
-                test = values_unsorted.tolist()
+                            "vectors" (N,3,3) scaled principal vectors (one per row),
 
-                values = sorted(test)
+                            "angles" (N,3,3) angle between each vector and the a, b, c axes
+        """
 
-                values.reverse()
+        U = np.asarray(U, dtype=float)
+        G = np.asarray(G, dtype=float).reshape(-1, 3, 3)
 
-                positions = {}
+        if cell_index is None:
+            cell_index = np.zeros(len(U), dtype=int) if len(G) == 1 else np.arange(len(U))
 
-                for i_1, i in enumerate(values_unsorted):
-                    for i_2, j in enumerate(values):
-                        if i == j:
-                            positions[i_1] = i_2
+        # Cells with missing values are swapped for a cube so the maths still works
 
-                vector_1 = np.array(
-                    [
-                        [
-                            vectors[0][positions[0]],
-                            vectors[1][positions[0]],
-                            vectors[2][positions[0]],
-                        ]
-                    ]
-                )
+        bad_cells = ~np.isfinite(G).all(axis=(1, 2))
+        G = np.where(bad_cells[:, None, None], np.eye(3), G)
 
-                vector_2 = np.array(
-                    [
-                        [
-                            vectors[0][positions[1]],
-                            vectors[1][positions[1]],
-                            vectors[2][positions[1]],
-                        ]
-                    ]
-                )
+        # Everything that only depends on the cell is worked out once per cell
 
-                vector_3 = np.array(
-                    [
-                        [
-                            vectors[0][positions[2]],
-                            vectors[1][positions[2]],
-                            vectors[2][positions[2]],
-                        ]
-                    ]
-                )
+        G_recip = np.linalg.inv(G)
+        recip_lengths = np.sqrt(np.diagonal(G_recip, axis1=1, axis2=2))
+        cell_lengths = np.sqrt(np.diagonal(G, axis1=1, axis2=2))
+        L = np.linalg.cholesky(G)
+        L_T = np.swapaxes(L, 1, 2)
+        L_T_inv = np.linalg.inv(L_T)
 
-                try:
-                    principle_A.append(math.sqrt(values[0] / (2 * (math.pi**2))))
-                except ValueError:
-                    principle_A.append("NPD")
-                try:
-                    principle_B.append(math.sqrt(values[1] / (2 * (math.pi**2))))
-                except ValueError:
-                    principle_B.append("NPD")
-                try:
-                    principle_C.append(math.sqrt(values[2] / (2 * (math.pi**2))))
-                except ValueError:
-                    principle_C.append("NPD")
-
-                principle_A2.append(values[0] / (2 * (math.pi**2)))
-                principle_B2.append(values[1] / (2 * (math.pi**2)))
-                principle_C2.append(values[2] / (2 * (math.pi**2)))
-
-                scaled_vector_A = self.scale_vector(vector_1, G)
-                scaled_vector_B = self.scale_vector(vector_2, G)
-                scaled_vector_C = self.scale_vector(vector_3, G)
-
-                vector_A.append(scaled_vector_A)
-                vector_B.append(scaled_vector_B)
-                vector_C.append(scaled_vector_C)
-
-                a = np.array([[1], [0], [0]])
-                b = np.array([[0], [1], [0]])
-                c = np.array([[0], [0], [1]])
-
-                v1_a, v1_a_sup = self.calculate_angle(
-                    scaled_vector_A, a, math.sqrt(G[0][0]), G
-                )
-                v1_b, v1_b_sup = self.calculate_angle(
-                    scaled_vector_A, b, math.sqrt(G[1][1]), G
-                )
-                v1_c, v1_c_sup = self.calculate_angle(
-                    scaled_vector_A, c, math.sqrt(G[2][2]), G
-                )
-                v2_a, v2_a_sup = self.calculate_angle(
-                    scaled_vector_B, a, math.sqrt(G[0][0]), G
-                )
-                v2_b, v2_b_sup = self.calculate_angle(
-                    scaled_vector_B, b, math.sqrt(G[1][1]), G
-                )
-                v2_c, v2_c_sup = self.calculate_angle(
-                    scaled_vector_B, c, math.sqrt(G[2][2]), G
-                )
-                v3_a, v3_a_sup = self.calculate_angle(
-                    scaled_vector_C, a, math.sqrt(G[0][0]), G
-                )
-                v3_b, v3_b_sup = self.calculate_angle(
-                    scaled_vector_C, b, math.sqrt(G[1][1]), G
-                )
-                v3_c, v3_c_sup = self.calculate_angle(
-                    scaled_vector_C, c, math.sqrt(G[2][2]), G
-                )
+        # Atoms with missing values are left as NaN
 
-                vector_A_angle_a.append(v1_a)
-                vector_A_angle_b.append(v1_b)
-                vector_A_angle_c.append(v1_c)
-                vector_B_angle_a.append(v2_a)
-                vector_B_angle_b.append(v2_b)
-                vector_B_angle_c.append(v2_c)
-                vector_C_angle_a.append(v3_a)
-                vector_C_angle_b.append(v3_b)
-                vector_C_angle_c.append(v3_c)
-
-                vector_A_angle_a_sup.append(v1_a_sup)
-                vector_A_angle_b_sup.append(v1_b_sup)
-                vector_A_angle_c_sup.append(v1_c_sup)
-                vector_B_angle_a_sup.append(v2_a_sup)
-                vector_B_angle_b_sup.append(v2_b_sup)
-                vector_B_angle_c_sup.append(v2_c_sup)
-                vector_C_angle_a_sup.append(v3_a_sup)
-                vector_C_angle_b_sup.append(v3_b_sup)
-                vector_C_angle_c_sup.append(v3_c_sup)
-
-            counter += 1
-
-        new_adp_df["Root_Mean_Square_Principle_Axis_Displacement_1"] = principle_A
-        new_adp_df["Root_Mean_Square_Principle_Axis_Displacement_2"] = principle_B
-        new_adp_df["Root_Mean_Square_Principle_Axis_Displacement_3"] = principle_C
-        new_adp_df["Mean_Square_Principle_Axis_Displacement_1"] = principle_A2
-        new_adp_df["Mean_Square_Principle_Axis_Displacement_2"] = principle_B2
-        new_adp_df["Mean_Square_Principle_Axis_Displacement_3"] = principle_C2
-        new_adp_df["Principle_Vector_1"] = vector_A
-        new_adp_df["Principle_Vector_2"] = vector_B
-        new_adp_df["Principle_Vector_3"] = vector_C
-        new_adp_df["Vector_1_Angle_to_a_axis"] = vector_A_angle_a
-        new_adp_df["Supplementary_Angle_V1_a"] = vector_A_angle_a_sup
-        new_adp_df["Vector_1_Angle_to_b_axis"] = vector_A_angle_b
-        new_adp_df["Supplementary_Angle_V1_b"] = vector_A_angle_b_sup
-        new_adp_df["Vector_1_Angle_to_c_axis"] = vector_A_angle_c
-        new_adp_df["Supplementary_Angle_V1_c"] = vector_A_angle_c_sup
-        new_adp_df["Vector_2_Angle_to_a_axis"] = vector_B_angle_a
-        new_adp_df["Supplementary_Angle_V2_a"] = vector_B_angle_a_sup
-        new_adp_df["Vector_2_Angle_to_b_axis"] = vector_B_angle_b
-        new_adp_df["Supplementary_Angle_V2_b"] = vector_B_angle_b_sup
-        new_adp_df["Vector_2_Angle_to_c_axis"] = vector_B_angle_c
-        new_adp_df["Supplementary_Angle_V2_c"] = vector_B_angle_c_sup
-        new_adp_df["Vector_3_Angle_to_a_axis"] = vector_C_angle_a
-        new_adp_df["Supplementary_Angle_V3_a"] = vector_C_angle_a_sup
-        new_adp_df["Vector_3_Angle_to_b_axis"] = vector_C_angle_b
-        new_adp_df["Supplementary_Angle_V3_b"] = vector_C_angle_b_sup
-        new_adp_df["Vector_3_Angle_to_c_axis"] = vector_C_angle_c
-        new_adp_df["Supplementary_Angle_V3_c"] = vector_C_angle_c_sup
-
-        adp_by_atom = new_adp_df.groupby("Atom")
+        bad = np.isnan(U).any(axis=1) | (cell_index < 0)
+        cell_index = np.where(cell_index < 0, 0, cell_index)
+        bad = bad | bad_cells[cell_index]
+        U = np.where(bad[:, None], 0, U)
 
-        os.chdir(pathlib.Path(csv_file).parent)
+        index = np.array([[0, 1, 2], [1, 3, 4], [2, 4, 5]])
+        B = (
+            2
+            * (math.pi**2)
+            * U[:, index]
+            * recip_lengths[cell_index, :, None]
+            * recip_lengths[cell_index, None, :]
+        )
 
-        new_folder = "Individual_Atomic_ADP_Analysis"
+        values, y = np.linalg.eigh(L_T[cell_index] @ B @ L[cell_index])
+        vectors = L_T_inv[cell_index] @ y
 
-        try:
-            os.mkdir(new_folder)
-        except FileExistsError:
-            pass
+        # Largest first, with one vector per row
+
+        values = values[:, ::-1] / (2 * (math.pi**2))
+        vectors = np.swapaxes(vectors[:, :, ::-1], 1, 2)
 
-        for i, j in adp_by_atom:
-            csv_location = (
-                pathlib.Path(csv_file).parent / new_folder / (str(i) + "_ADPs.csv")
+        largest = np.take_along_axis(
+            vectors, np.abs(vectors).argmax(axis=2)[:, :, None], axis=2
+        )
+        vectors = np.where(largest < 0, -vectors, vectors)
+
+        # The angle to each cell axis, which is 0 if rounding puts it out of range
+
+        cos_angle = (vectors @ G[cell_index]) / cell_lengths[cell_index, None, :]
+
+        with np.errstate(invalid="ignore"):
+            angles = np.where(
+                np.abs(cos_angle) <= 1, np.degrees(np.arccos(cos_angle)), 0
             )
 
-            j.to_csv(csv_location, index=False)
+        angles = np.round(angles, 1)
+
+        values[bad] = np.nan
+        vectors[bad] = np.nan
+        angles[bad] = np.nan
+
+        return {"values": values, "vectors": vectors, "angles": angles}
+
+    def analyse_data(
+        self, csv_file: str, cell_data: str, output_format: str = "csv"
+    ) -> None:
+        """RECOMMENDED THAT CIF_READ.PY IS RUN FIRST FOR CORRECT FORMATTING
+
+        OF INPUT .CSV FILES
+
+        Will take information from ADP data and unit cell data and
+
+        calculate the principle axes of all the atoms
+
+        Also calculates the angle between these principle axes and the
+
+        various unit cell axes
+
+        Args:
+            csv_file (str): path to csv containing ADP parameters
+            cell_data (str): path to csv containing cell parameters
+            output_format (str): "csv" for a folder of .csv files for each atom,
+
+                                or "parquet"/"hdf5" for one file (see Partitioned_Output)
+        """
+
+        adp_df = Table_Compactor().compact(pd.read_csv(csv_file), "ADPs")
+
+        new_adp_df = pd.DataFrame()
+
+        new_adp_df["Data_Block"] = adp_df["Data_Block"]
+        new_adp_df["Atom"] = adp_df["_atom_site_aniso_label"]
+
+        cell_df = pd.read_csv(cell_data)
+
+        U_columns = [
+            "_atom_site_aniso_U_11",
+            "_atom_site_aniso_U_12",
+            "_atom_site_aniso_U_13",
+            "_atom_site_aniso_U_22",
+            "_atom_site_aniso_U_23",
+            "_atom_site_aniso_U_33",
+        ]
+
+        # Every atom of every structure at once, each looking up its own unit cell
+
+        results = self.principal_axes(
+            adp_df[U_columns].to_numpy(),
+            Cell_Geometry().calculate(cell_df)["G"],
+            self.match_cells(adp_df, cell_df),
+        )
+
+        values = results["values"]
+        vectors = results["vectors"]
+        angles = results["angles"]
+
+        # Negative eigenvalues mean the ADP is non-positive definite (NPD)
+
+        with np.errstate(invalid="ignore"):
+            root_values = np.sqrt(values)
+
+        for i in range(3):
+            new_adp_df[
+                "Root_Mean_Square_Principle_Axis_Displacement_" + str(i + 1)
+            ] = np.where(values[:, i] < 0, "NPD", root_values[:, i].astype(object))
+
+        for i in range(3):
+            new_adp_df["Mean_Square_Principle_Axis_Displacement_" + str(i + 1)] = values[
+                :, i
+            ]
+
+        for i in range(3):
+            new_adp_df["Principle_Vector_" + str(i + 1)] = [
+                vector.reshape(1, 3) for vector in vectors[:, i]
+            ]
+
+        for i in range(3):
+            for j, axis in enumerate(["a", "b", "c"]):
+                new_adp_df[
+                    "Vector_" + str(i + 1) + "_Angle_to_" + axis + "_axis"
+                ] = angles[:, i, j]
+                new_adp_df["Supplementary_Angle_V" + str(i + 1) + "_" + axis] = (
+                    180 - angles[:, i, j]
+                )
+
+        os.chdir(pathlib.Path(csv_file).parent)
+
+        individual = Partitioned_Output(
+            pathlib.Path(csv_file).parent / "Individual_Atomic_ADP_Analysis",
+            "Atom",
+            output_format,
+            suffix="_ADPs.csv",
+        )
+        individual.write(new_adp_df)
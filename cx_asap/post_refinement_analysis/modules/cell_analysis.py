@@ -11,7 +11,10 @@
 # ----------Required Modules----------#
 
 from system_files.utils import Nice_YAML_Dumper, Config, Grapher, Cell_Import
+from system_files.cell_geometry import Cell_Geometry
 import pandas as pd
+import numpy as np
+import itertools
 import pathlib
 import os
 import logging
@@ -158,6 +161,358 @@ class Cell_Deformation:
 
         self.df.to_csv(self.csv, index=None)
 
+    def strain_tensors(self, cells, ref: list) -> "np.array":
+        """Calculates the Lagrangian strain tensor of many unit cells at once
+
+        The deformation gradient F takes the reference cell vectors to the
+
+        new cell vectors (A = F.A0), and the strain is E = (F^T.F - I) / 2
+
+        Both cells use the Cartesian axes of Cell_Geometry (a along x, b in the xy plane)
+
+        Args:
+            cells: unit cells as a list/array of [a, b, c, alpha, beta, gamma],
+
+                    or a table with the _cell_* columns
+            ref (list): reference unit cell a, b, c, alpha, beta, gamma
+
+                        (any values after these, ie volume, are ignored)
+
+        Returns:
+            strain (np.array): (N,3,3) strain tensor of each cell
+        """
+
+        geometry = Cell_Geometry()
+
+        A = geometry.calculate(cells)["M"]
+        A0_inv = geometry.calculate(list(ref)[:6])["M_inv"][0]
+
+        F = A @ A0_inv
+
+        return (np.swapaxes(F, 1, 2) @ F - np.eye(3)) / 2
+
+    def principal_strains(self, strain: "np.array") -> dict:
+        """Calculates the principal strains and their directions for many cells at once
+
+        Note that the direction (+/-) of an eigenvector is arbitrary, so
+
+        the largest component of each vector is made positive
+
+        Args:
+            strain (np.array): (N,3,3) strain tensor of each cell
+
+        Returns:
+            results (dict): "values" (N,3) principal strains (largest first),
+
+                            "vectors" (N,3,3) unit vector of each principal axis
+
+                            (one per row) in the Cartesian axes of the reference cell
+        """
+
+        strain = np.asarray(strain, dtype=float).reshape(-1, 3, 3)
+
+        # Cells with missing values are left as NaN
+
+        bad = ~np.isfinite(strain).all(axis=(1, 2))
+
+        values, vectors = np.linalg.eigh(np.where(bad[:, None, None], 0, strain))
+
+        values = values[:, ::-1]
+        vectors = np.swapaxes(vectors[:, :, ::-1], 1, 2)
+
+        largest = np.take_along_axis(
+            vectors, np.abs(vectors).argmax(axis=2)[:, :, None], axis=2
+        )
+        vectors = np.where(largest < 0, -vectors, vectors)
+
+        values[bad] = np.nan
+        vectors[bad] = np.nan
+
+        return {"values": values, "vectors": vectors}
+
+    def track_principal_axes(self, values, vectors, order=None) -> dict:
+        """Reorders the principal strains so each one follows the same direction
+
+        principal_strains puts them in order of size, so where two principal
+
+        strains cross over (ie as the temperature changes) they would swap axes
+
+        Starting from the dataset where the principal strains are most clearly
+
+        different, the datasets either side are gone through in order, and the
+
+        axes of each are matched to the closest directions in the one before,
+
+        with the signs of the vectors made to agree with it
+
+        The starting dataset keeps the largest first order (near the reference
+
+        cell all of the strains are close to zero, so their order means little)
+
+        Args:
+            values: (N,3) principal strains from principal_strains
+            vectors: (N,3,3) principal axes from principal_strains
+            order: the order of the datasets (ie sorted by temperature),
+
+                    if not given the order they are in
+
+        Returns:
+            results (dict): "values" (N,3) and "vectors" (N,3,3) with each
+
+                            principal axis following one direction
+        """
+
+        values = np.array(values, dtype=float)
+        vectors = np.array(vectors, dtype=float)
+
+        if order is None:
+            order = np.arange(len(values))
+
+        order = [row for row in order if np.isfinite(vectors[row]).all()]
+
+        if len(order) == 0:
+            return {"values": values, "vectors": vectors}
+
+        gaps = [np.min(-np.diff(values[row])) for row in order]
+        start = int(np.argmax(gaps))
+
+        permutations = np.array(list(itertools.permutations(range(3))))
+
+        for walk in [order[start:], order[start::-1]]:
+            previous = vectors[walk[0]]
+
+            for row in walk[1:]:
+                # overlap[i, j] - how close axis j here is to axis i of the last dataset
+
+                overlap = np.abs(previous @ vectors[row].T)
+                best = permutations[
+                    overlap[np.arange(3), permutations].sum(axis=1).argmax()
+                ]
+
+                values[row] = values[row, best]
+                vectors[row] = vectors[row, best]
+
+                signs = np.where(np.sum(previous * vectors[row], axis=1) < 0, -1, 1)
+                vectors[row] = vectors[row] * signs[:, None]
+
+                previous = vectors[row]
+
+        return {"values": values, "vectors": vectors}
+
+    def expansion_coefficients(self, x, y, esd=None, order: int = 1) -> dict:
+        """Fits a polynomial to many data series at once and calculates the
+
+        expansion coefficient (1/y)(dy/dx) at each point
+
+        Each series is weighted by 1/esd if every point used has an esd,
+
+        otherwise the fit is unweighted and the errors of the coefficients are
+
+        scaled by the residuals (like np.polyfit)
+
+        Points with missing values are left out of the fit of that series
+
+        Args:
+            x: (N) the varying parameter (ie temperature)
+            y: (N,K) K series to fit (ie cell lengths)
+            esd: (N,K) esd of each value in y, if not given every fit is unweighted
+            order (int): order of the polynomial (1 = linear)
+
+        Returns:
+            results (dict): "coefficients" (K,order+1) polynomial coefficients
+
+                            (constant first),
+
+                            "errors" (K,order+1) esds of the coefficients,
+
+                            "alpha" (N,K) expansion coefficient at each point,
+
+                            "weighted" (K) whether each series was weighted by its esds
+        """
+
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float).reshape(len(x), -1)
+
+        if esd is None:
+            esd = np.full(y.shape, np.nan)
+        else:
+            esd = np.asarray(esd, dtype=float).reshape(y.shape)
+
+        used = np.isfinite(x)[:, None] & np.isfinite(y)
+        good_esd = np.isfinite(esd) & (esd > 0)
+
+        weighted = (good_esd | ~used).all(axis=0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weights = np.where(weighted, 1 / esd, 1.0)
+        weights = np.where(used, weights, 0)
+
+        powers = np.arange(order + 1)
+        V = np.where(np.isfinite(x), x, 0)[:, None] ** powers
+
+        # Weighted least squares for every series together (K,N,order+1)
+
+        A = weights.T[:, :, None] * V
+        b = (weights * np.where(used, y, 0)).T[:, :, None]
+
+        coefficients = (np.linalg.pinv(A) @ b)[:, :, 0]
+        covariance = np.linalg.pinv(np.swapaxes(A, 1, 2) @ A)
+
+        degrees_of_freedom = used.sum(axis=0) - len(powers)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            chi_squared = ((A @ coefficients[:, :, None] - b) ** 2).sum(axis=(1, 2))
+            scale = np.where(
+                weighted, 1.0, chi_squared / np.maximum(degrees_of_freedom, 0)
+            )
+
+        errors = np.sqrt(np.diagonal(covariance, axis1=1, axis2=2) * scale[:, None])
+
+        # Series without enough points for the polynomial are not fitted
+
+        too_few = used.sum(axis=0) < len(powers)
+        coefficients[too_few] = np.nan
+        errors[too_few | ((degrees_of_freedom <= 0) & ~weighted)] = np.nan
+
+        fitted = V @ coefficients.T
+        slope = (V[:, :-1] * powers[1:]) @ coefficients[:, 1:].T
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            alpha = np.where(np.isfinite(x)[:, None], slope / fitted, np.nan)
+
+        return {
+            "coefficients": coefficients,
+            "errors": errors,
+            "alpha": alpha,
+            "weighted": weighted,
+        }
+
+    def strain_analysis(self, x_axis: str, order: int = 1) -> "pd.DataFrame":
+        """Calculates the strain tensor, principal strains and expansion coefficients
+
+        of every dataset against the reference unit cell
+
+        The expansion coefficients are fitted for the a, b and c axes, the volume
+
+        and the three principal axes (from the stretch sqrt(1 + 2 * strain))
+
+        Each principal axis follows one direction through the datasets in order of
+
+        x_axis (see track_principal_axes), rather than being ordered by size,
+
+        so principal_axis_1 is only the largest where the strains are most different
+
+        Args:
+            x_axis (str): heading in the dataframe for the varying parameter
+            order (int): order of the polynomial fitted for the expansion coefficients
+
+        Returns:
+            fits (pd.DataFrame): the coefficients of the fit for each series
+        """
+
+        ref = [
+            self.sys["ref_a"],
+            self.sys["ref_b"],
+            self.sys["ref_c"],
+            self.sys["ref_alpha"],
+            self.sys["ref_beta"],
+            self.sys["ref_gamma"],
+        ]
+
+        x = self.df[x_axis].to_numpy(dtype=float)
+
+        strain = self.strain_tensors(self.df, ref)
+        principal = self.principal_strains(strain)
+        principal = self.track_principal_axes(
+            principal["values"], principal["vectors"], np.argsort(x, kind="stable")
+        )
+        values = principal["values"]
+        vectors = principal["vectors"]
+
+        for i, j in [(0, 0), (1, 1), (2, 2), (0, 1), (0, 2), (1, 2)]:
+            self.df["strain_e" + str(i + 1) + str(j + 1)] = strain[:, i, j]
+
+        for index in range(3):
+            name = "principal_axis_" + str(index + 1)
+            self.df["principal_strain_" + str(index + 1)] = values[:, index]
+            for axis_index, axis in enumerate(["x", "y", "z"]):
+                self.df[name + "_" + axis] = vectors[:, index, axis_index]
+
+        # All of the series are fitted together
+
+        series = {
+            "a_axis": "_cell_length_a",
+            "b_axis": "_cell_length_b",
+            "c_axis": "_cell_length_c",
+            "volume": "_cell_volume",
+        }
+
+        y = []
+        esd = []
+
+        for heading in series.values():
+            if heading in self.df:
+                y.append(self.df[heading].to_numpy(dtype=float))
+            else:
+                # the volume is calculated from the cell if it was not in the cif
+                y.append(Cell_Geometry().calculate(self.df)["volume"])
+
+            if heading + "_error" in self.df:
+                esd.append(self.df[heading + "_error"].to_numpy(dtype=float))
+            else:
+                esd.append(np.full(len(self.df), np.nan))
+
+        for index in range(3):
+            series["principal_axis_" + str(index + 1)] = None
+            with np.errstate(invalid="ignore"):
+                y.append(np.sqrt(1 + 2 * values[:, index]))
+            esd.append(np.full(len(self.df), np.nan))
+
+        results = self.expansion_coefficients(
+            x,
+            np.stack(y, axis=1),
+            np.stack(esd, axis=1),
+            order,
+        )
+
+        fits = pd.DataFrame({"Series": list(series), "Weighted": results["weighted"]})
+
+        for index, name in enumerate(series):
+            self.df[name + "_expansion"] = results["alpha"][:, index]
+
+        for power in range(order + 1):
+            fits["coefficient_" + str(power)] = results["coefficients"][:, power]
+            fits["coefficient_" + str(power) + "_error"] = results["errors"][:, power]
+
+        return fits
+
+    def write_strain_analysis(self, x_axis: str, order: int = 1) -> None:
+        """Runs strain_analysis and writes out the results
+
+        The strain columns are added to the imported .csv file, and the fits
+
+        are written to strain_expansion.csv in the same folder
+
+        Args:
+            x_axis (str): heading in the dataframe for the varying parameter
+            order (int): order of the polynomial fitted for the expansion coefficients
+        """
+
+        try:
+            fits = self.strain_analysis(x_axis, order)
+        except (ValueError, KeyError) as error:
+            logging.info(
+                __name__
+                + " : Strain analysis not possible against "
+                + str(x_axis)
+                + " - "
+                + str(error)
+            )
+            return
+
+        self.df.to_csv(self.csv, index=None)
+        fits.to_csv(self.csv.parent / "strain_expansion.csv", index=None)
+
     def graphical_analysis(
         self,
         x_axis: str,
@@ -11,6 +11,7 @@
 # ----------Required Modules----------#
 
 from system_files.utils import Nice_YAML_Dumper, Config, Directory_Browse
+from system_files.compact_tables import Table_Compactor
 from CifFile import ReadCif
 import yaml
 import pandas as pd
@@ -55,19 +56,16 @@ class CIF_Read:
         self.results = {}
         self.errors = {}
 
+        # Repeated labels, CIF names and data blocks are stored once (see Table_Compactor)
+
+        self.compactor = Table_Compactor()
+
         # Sets these to 0 to reset from previous runs
 
         self.sys["Structures_in_each_CIF"] = self.structures_in_cif
         self.sys["Successful_Positions"] = self.successful_positions
 
-        with open(self.sys_path, "w") as f:
-            yaml.dump(
-                self.sys,
-                f,
-                default_flow_style=False,
-                Dumper=Nice_YAML_Dumper,
-                sort_keys=False,
-            )
+        Config.write_sys(self.sys_path, self.sys)
 
     def configure(self, search_items: list) -> None:
         """Sets up dictionaries and data frames to put data into
@@ -164,6 +162,7 @@ class CIF_Read:
         hbonds: bool = False,
         adp: bool = False,
         varying_parameter: str = "_diffrn_ambient_temperature",
+        float32_errors: bool = False,
     ) -> None:
         """Searches through all folders in current working directory for CIFs
 
@@ -176,9 +175,15 @@ class CIF_Read:
             torsions (bool): whether or not torsion analysis should be run
             hbonds (bool): whether or not Hbond analysis should be run
             adps (bool): whether or not ADP analysis should be run
-
+            float32_errors (bool): if true, the errors are stored as float32 to save memory
         """
 
+        # The rows from each CIF are compacted as they are read, so the tables
+
+        # are never held in full size (see Table_Compactor)
+
+        self.compactor = Table_Compactor(float32_errors)
+
         # This function searches through all of the folders in the current working directory for a cif file
 
         self.tree_browse = Directory_Browse(pathlib.Path(location), self.test_mode)
@@ -204,22 +209,26 @@ class CIF_Read:
             self.adp_analysis(cif_file, adp)
 
             # self.data = self.data.append(temp_data)
-            self.data = pd.concat([self.data, temp_data])
+            self.data = self.compactor.append(self.data, temp_data, "CIF_Parameters")
             self.structures_in_cif.append(structures_in_cif_tmp)
             for item in successful_positions_tmp:
                 self.successful_positions.append(item.strip("structure_"))
 
+        self.compactor.log_appended(
+            {
+                "CIF_Parameters": self.data,
+                "Bond_Lengths": self.bond_data,
+                "Bond_Angles": self.angle_data,
+                "Bond_Torsions": self.torsion_data,
+                "HBond_details": self.hbond_data,
+                "ADPs": self.adp_data,
+            }
+        )
+
         self.sys["Structures_in_each_CIF"] = self.structures_in_cif
         self.sys["Successful_Positions"] = self.successful_positions
 
-        with open(self.sys_path, "w") as f:
-            yaml.dump(
-                self.sys,
-                f,
-                default_flow_style=False,
-                Dumper=Nice_YAML_Dumper,
-                sort_keys=False,
-            )
+        Config.write_sys(self.sys_path, self.sys)
 
     def structural_analysis(
         self,
@@ -283,7 +292,9 @@ class CIF_Read:
                 successful_positions_tmp_bonds,
             ) = self.data_harvest(cif_file, bond_paras, varying_parameter)
             # self.bond_data = self.bond_data.append(temp_data_bonds)
-            self.bond_data = pd.concat([self.bond_data, temp_data_bonds])
+            self.bond_data = self.compactor.append(
+                self.bond_data, temp_data_bonds, "Bond_Lengths"
+            )
         if angles == True:
             (
                 temp_data_angles,
@@ -291,7 +302,9 @@ class CIF_Read:
                 successful_positions_tmp_angles,
             ) = self.data_harvest(cif_file, angle_paras, varying_parameter)
             # self.angle_data = self.angle_data.append(temp_data_angles)
-            self.angle_data = pd.concat([self.angle_data, temp_data_angles])
+            self.angle_data = self.compactor.append(
+                self.angle_data, temp_data_angles, "Bond_Angles"
+            )
         if torsions == True:
             (
                 temp_data_torsions,
@@ -299,7 +312,9 @@ class CIF_Read:
                 successful_positions_tmp_torsions,
             ) = self.data_harvest(cif_file, torsion_paras, varying_parameter)
             # self.torsion_data = self.torsion_data.append(temp_data_torsions)
-            self.torsion_data = pd.concat([self.torsion_data, temp_data_torsions])
+            self.torsion_data = self.compactor.append(
+                self.torsion_data, temp_data_torsions, "Bond_Torsions"
+            )
         if hbonds == True:
             (
                 temp_data_hbonds,
@@ -307,7 +322,9 @@ class CIF_Read:
                 successful_positions_tmp_hbonds,
             ) = self.data_harvest(cif_file, hbond_paras, varying_parameter)
             # self.hbond_data = self.hbond_data.append(temp_data_hbonds)
-            self.hbond_data = pd.concat([self.hbond_data, temp_data_hbonds])
+            self.hbond_data = self.compactor.append(
+                self.hbond_data, temp_data_hbonds, "HBond_details"
+            )
 
     def adp_analysis(
         self,
@@ -339,7 +356,7 @@ class CIF_Read:
                 successful_positions_tmp_adps,
             ) = self.data_harvest(cif_file, adps, varying_parameter)
             # self.adp_data = self.adp_data.append(temp_data_adps)
-            self.adp_data = pd.concat([self.adp_data, temp_data_adps])
+            self.adp_data = self.compactor.append(self.adp_data, temp_data_adps, "ADPs")
 
     def data_harvest(
         self,
@@ -457,6 +474,8 @@ class CIF_Read:
                 self.temp_df["CIF_File"],
                 self.temp_df["Data_Block"],
             ) = self.generate_cif_list(self.temp_df, test_val)
+        else:
+            self.temp_df["Data_Block"] = list(self.data_blocks)
 
         return self.temp_df, number_of_structures, self.data_blocks
 
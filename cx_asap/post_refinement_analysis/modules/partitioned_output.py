@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+
+###################################################################################################
+# ---------------------------------CX-ASAP: partitioned_output-------------------------------------#
+# ---Authors: Amy J. Thompson, Kate M. Smith, Daniel J. Eriksson, Jack K. Clegg & Jason R. Price---#
+# -----------------------------------Python Implementation by AJT----------------------------------#
+# -----------------------------------Project Design by JRP and JKC---------------------------------#
+# --------------------------------Valuable Coding Support by KMS & DJE-----------------------------#
+###################################################################################################
+
+# ----------Required Modules----------#
+
+import importlib.util
+import pandas as pd
+import numpy as np
+import pathlib
+import os
+import logging
+
+# ----------Class Definition----------#
+
+
+class Partitioned_Output:
+    def __init__(
+        self,
+        location: str,
+        key: str = None,
+        output_format: str = "csv",
+        prefix: str = "",
+        suffix: str = ".csv",
+    ) -> None:
+        """Initialises the class
+
+        Writes a table split up by one of its columns (ie each bond or atom)
+
+        The "csv" format writes one .csv file per value in a folder (the original output)
+
+        The "parquet" and "hdf5" formats write the whole table into one file
+
+        (location.parquet or location.h5) sorted by the key, with an index of
+
+        which rows belong to each value (location_index.csv)
+
+        If pyarrow (parquet) or pytables (hdf5) are not installed, the next
+
+        available format is used instead
+
+        Args:
+            location (str): full path to the output folder (csv) or the
+
+                            output file without its extension (parquet/hdf5)
+            key (str): the column to split the table by
+
+                        if not given, it is read from an existing index
+            output_format (str): "csv", "parquet" or "hdf5"
+
+                                if None, the format of an existing dataset is used
+            prefix (str): start of the name of each individual .csv file
+            suffix (str): end of the name of each individual .csv file
+        """
+
+        self.location = pathlib.Path(location)
+        self.index_path = self.location.parent / (self.location.name + "_index.csv")
+        self.extensions = {"parquet": ".parquet", "hdf5": ".h5"}
+
+        if output_format is None:
+            output_format = "csv"
+            for item in self.extensions:
+                if self.dataset_path(item).exists():
+                    output_format = item
+
+        self.output_format = self.available_format(output_format)
+        self.key = key
+        self.prefix = prefix
+        self.suffix = suffix
+
+        # Small row groups let a filtered read skip most of a .parquet file
+
+        self.row_group_size = 10000
+
+    def available_format(self, output_format: str) -> str:
+        """Checks the libraries for the output format are installed
+
+        Args:
+            output_format (str): "csv", "parquet" or "hdf5"
+
+        Returns:
+            output_format (str): the requested format, or the one to use instead
+        """
+
+        libraries = {"parquet": "pyarrow", "hdf5": "tables"}
+
+        order = ["parquet", "hdf5", "csv"]
+
+        if output_format not in order:
+            logging.info(
+                __name__
+                + " : Unknown output format "
+                + str(output_format)
+                + " so writing individual .csv files"
+            )
+            return "csv"
+
+        for item in order[order.index(output_format) :]:
+            if item == "csv" or importlib.util.find_spec(libraries[item]) is not None:
+                if item != output_format:
+                    logging.info(
+                        __name__
+                        + " : "
+                        + libraries[output_format]
+                        + " is not installed, so writing "
+                        + item
+                        + " output instead"
+                    )
+                return item
+
+    def dataset_path(self, output_format: str = None) -> pathlib.Path:
+        """Gets the path of the single file dataset
+
+        Args:
+            output_format (str): "parquet" or "hdf5", if not given the current format
+
+        Returns:
+            path (pathlib.Path): full path to the dataset file
+        """
+
+        if output_format is None:
+            output_format = self.output_format
+
+        return self.location.parent / (
+            self.location.name + self.extensions[output_format]
+        )
+
+    def file_name(self, item) -> str:
+        """Gets the name of the individual .csv file for one value of the key
+
+        Args:
+            item: value of the key column
+
+        Returns:
+            file_name (str): name of the .csv file
+        """
+
+        return self.prefix + str(item) + self.suffix
+
+    def write(self, df: "pd.DataFrame") -> None:
+        """Writes out the table in the chosen format
+
+        Args:
+            df (pd.DataFrame): the table to split by the key column
+        """
+
+        if self.output_format == "csv":
+            self.write_csv(df)
+            return
+
+        # Rows for each value are put together, in the order the values first appear
+
+        codes = pd.factorize(df[self.key])[0]
+        order = np.argsort(codes, kind="stable")
+
+        df = df.iloc[order].reset_index(drop=True)
+        codes = codes[order]
+
+        # Columns with arrays or a mix of numbers and text (ie "NPD") are stored as text
+
+        for column in df.columns:
+            if pd.api.types.is_object_dtype(df[column]):
+                df[column] = [
+                    item
+                    if isinstance(item, str)
+                    or (not isinstance(item, np.ndarray) and pd.isna(item))
+                    else str(item)
+                    for item in df[column]
+                ]
+                df[column] = df[column].where(df[column].notna(), None)
+
+        number_of_keys = codes.max() + 1 if len(codes) != 0 else 0
+
+        starts = np.searchsorted(codes, np.arange(number_of_keys))
+        stops = np.append(starts[1:], len(codes))
+
+        keys = df[self.key].iloc[starts] if len(starts) != 0 else []
+
+        index = pd.DataFrame(
+            {
+                self.key: list(keys),
+                "Start": starts,
+                "Stop": stops,
+                "File_Name": [self.file_name(item) for item in keys],
+            }
+        )
+
+        if self.output_format == "parquet":
+            df.to_parquet(
+                self.dataset_path(), index=False, row_group_size=self.row_group_size
+            )
+        else:
+            df.to_hdf(self.dataset_path(), key="data", mode="w", format="table")
+
+        index.to_csv(self.index_path, index=None)
+
+        logging.info(
+            __name__
+            + " : Wrote "
+            + str(len(index))
+            + " "
+            + self.key
+            + " groups to "
+            + str(self.dataset_path())
+        )
+
+    def write_csv(self, df: "pd.DataFrame") -> None:
+        """Writes one .csv file for each value of the key
+
+        Args:
+            df (pd.DataFrame): the table to split by the key column
+        """
+
+        try:
+            os.mkdir(self.location)
+        except FileExistsError:
+            pass
+
+        for item, separated_df in df.groupby(self.key, sort=False):
+            separated_df.to_csv(self.location / self.file_name(item), index=None)
+
+    def read_index(self) -> "pd.DataFrame":
+        """Reads the index of a single file dataset
+
+        Returns:
+            index (pd.DataFrame): the key, first and last (+1) row and .csv name for each value
+        """
+
+        index = pd.read_csv(self.index_path, dtype=str)
+        index["Start"] = index["Start"].astype(int)
+        index["Stop"] = index["Stop"].astype(int)
+
+        if self.key is None:
+            self.key = index.columns[0]
+
+        return index
+
+    def read(self, keys: list = None) -> "pd.DataFrame":
+        """Reads rows back out of a single file dataset
+
+        Args:
+            keys (list): the values of the key to read, if not given the whole table
+
+        Returns:
+            df (pd.DataFrame): the rows for those values
+        """
+
+        index = self.read_index()
+
+        if keys is not None:
+            index = index[index[self.key].isin([str(item) for item in keys])]
+
+        if self.output_format == "parquet":
+            return self.read_parquet(index, keys is None)
+
+        return pd.concat(
+            [pd.DataFrame()]
+            + [
+                pd.read_hdf(self.dataset_path(), "data", start=start, stop=stop)
+                for start, stop in zip(index.Start, index.Stop)
+            ]
+        ).reset_index(drop=True)
+
+    def read_parquet(self, index: "pd.DataFrame", whole: bool) -> "pd.DataFrame":
+        """Reads the rows for some values of the key out of the .parquet file
+
+        Only the row groups which can hold those values are read, the rest are
+
+        skipped using the statistics stored in the file
+
+        Args:
+            index (pd.DataFrame): the index rows for the values to read
+            whole (bool): True to read the whole table without filtering
+
+        Returns:
+            df (pd.DataFrame): the rows for those values
+        """
+
+        import pyarrow.parquet as pq
+
+        if whole:
+            return pq.read_table(self.dataset_path()).to_pandas()
+
+        # The index stores the values as text, so they are taken from the file
+
+        # itself (one column only) to keep their type for the filter
+
+        stored = pq.read_table(self.dataset_path(), columns=[self.key])
+        values = stored.column(self.key).take(list(index.Start)).to_pylist()
+
+        if len(values) == 0:
+            return pq.read_schema(self.dataset_path()).empty_table().to_pandas()
+
+        table = pq.read_table(self.dataset_path(), filters=[(self.key, "in", values)])
+
+        return table.to_pandas()
+
+    def export_csv(self, keys: list = None) -> list:
+        """Writes individual .csv files from a single file dataset
+
+        They have the same names as those written by the "csv" format
+
+        Args:
+            keys (list): the values of the key to export, if not given all of them
+
+        Returns:
+            exported (list): full paths to the .csv files written
+        """
+
+        index = self.read_index()
+
+        if keys is not None:
+            index = index[index[self.key].isin([str(item) for item in keys])]
+
+        df = self.read(list(index[self.key]))
+
+        try:
+            os.mkdir(self.location)
+        except FileExistsError:
+            pass
+
+        exported = []
+        position = 0
+
+        for file_name, start, stop in zip(index.File_Name, index.Start, index.Stop):
+            path = self.location / file_name
+            df.iloc[position : position + stop - start].to_csv(path, index=None)
+            position += stop - start
+            exported.append(path)
+
+        return exported
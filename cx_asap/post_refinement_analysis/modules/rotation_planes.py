@@ -12,6 +12,7 @@
 
 from unittest import result
 from system_files.utils import Nice_YAML_Dumper, Config
+from system_files.cell_geometry import Cell_Geometry
 import pathlib
 import os
 import math
@@ -73,6 +74,62 @@ class Rotation:
             print("Error - check logs!")
             exit()
 
+    def scan_lst(self, file_name: str) -> dict:
+        """Reads the unit cell and every MPLA plane from a .lst file in a single pass
+
+        The file is read line by line rather than all at once, and reading stops
+
+        as soon as the cell and one plane for each MPLA instruction have been found
+
+        Args:
+            file_name (str): full path to the .lst file
+
+        Returns:
+            lst_data (dict): "cell" - the unit cell as [a, b, c, alpha, beta, gamma]
+
+                            (None if there is no CELL instruction),
+
+                            "planes" - the equation line of each least-squares plane
+        """
+
+        cell = None
+        planes = []
+        number_of_mpla = 0
+
+        # counts down the lines from a "Least-squares planes" heading to its equation
+
+        lines_to_plane = None
+
+        with open(file_name, "rt") as lst_file:
+            for line in lst_file:
+                if lines_to_plane is not None:
+                    lines_to_plane -= 1
+
+                    if lines_to_plane == 0:
+                        planes.append(line)
+                        lines_to_plane = None
+
+                        if cell is not None and len(planes) == number_of_mpla:
+                            break
+
+                    continue
+
+                if "Least-squares planes" in line:
+                    lines_to_plane = 3
+                    continue
+
+                split_line = line.split()
+
+                if len(split_line) == 0:
+                    continue
+
+                if split_line[0] == "CELL" and cell is None:
+                    cell = [float(item) for item in split_line[2:8]]
+                elif split_line[0] == "MPLA":
+                    number_of_mpla += 1
+
+        return {"cell": cell, "planes": planes}
+
     def grab_cell(self, file_name: str) -> None:
         """Collects the unit cell for later calculations
 
@@ -82,26 +139,10 @@ class Rotation:
 
         # collects the cell from that run to calculate the rotation against
 
-        with open(file_name, "rt") as ins_file:
-            split_line = []
-            for line in ins_file:
-                if "CELL" in line:
-                    split_line = line.split()
-
-        if len(split_line) != 0:
-            ref_parameters = [
-                "ref_INS_a",
-                "ref_INS_b",
-                "ref_INS_c",
-                "ref_INS_alpha",
-                "ref_INS_beta",
-                "ref_INS_gamma",
-            ]
-
-            self.ref_values = [0, 0, 0, 0, 0, 0]
-
-            for index, item in enumerate(ref_parameters):
-                self.ref_values[index] = float(split_line[index + 2])
+        cell = self.scan_lst(file_name)["cell"]
+
+        if cell is not None:
+            self.ref_values = cell
         else:
             self.bad_flag = True
 
@@ -112,9 +153,7 @@ class Rotation:
 
         Calculates the angle between it and the reference plane
 
-        Note that the requires a number of calculations to be peformed on the unit cell. Some of these are planned to be moved to the unit cell class in the future.
-
-        The unit cell class may then also be moved to the system_files folder.
+        The calculations on the unit cell are done by Cell_Geometry in the system_files folder.
 
         Args:
             data (str): .lst file with MPLA info as a string
@@ -141,110 +180,123 @@ class Rotation:
                 flag = 1
             index += 1
 
-        plane_data = []
-        index = 0
-        # extract coefficients from the plane string and append to data list
         if flag == 1:
-            # remove parentheses and contents
-            s = re.sub(r"\([^)]*\)", "", plane)
-            # remove =
-            s = s.replace("=", " ")
-            # attach signs to numbers separated by spaces
-            s = re.sub(r"([+-])\s+(\d)", r"\1\2", s)
-            vals = re.findall(r"[-+]?\d*\.?\d+(?:[eE][-+]?\d+)?", s)
-            # append to data keeping - but removing +
-            for item in vals:
-                if item.startswith("+"):
-                    item = item[1:]
-                if item.startswith("-"):
-                    plane_data.append(f"-{item[1:]}")
-                else:
-                    plane_data.append(item)
-
-            # calculate G the metric matrix
-            alpha = np.radians(self.ref_values[3])
-            beta = np.radians(self.ref_values[4])
-            gamma = np.radians(self.ref_values[5])
-            a = self.ref_values[0]
-            b = self.ref_values[1]
-            c = self.ref_values[2]
-            G = np.zeros((3, 3))
-            G[0, 0] = a**2
-            G[0, 1] = a * b * np.cos(gamma)
-            G[0, 2] = a * c * np.cos(beta)
-            G[1, 0] = a * b * np.cos(gamma)
-            G[1, 1] = b**2
-            G[1, 2] = b * c * np.cos(alpha)
-            G[2, 0] = a * c * np.cos(beta)
-            G[2, 1] = b * c * np.cos(alpha)
-            G[2, 2] = c**2
-            detG = np.linalg.det(G)
-            V = np.sqrt(detG)
-            V_star = 1 / V
-            a_star = b * c * np.sin(alpha) * V_star
-            b_star = a * c * np.sin(beta) * V_star
-            c_star = a * b * np.sin(gamma) * V_star
-            alpha_star = np.arccos(
-                (np.cos(beta) * np.cos(gamma) - np.cos(alpha))
-                / (np.sin(beta) * np.sin(gamma))
-            )
-            beta_star = np.arccos(
-                (np.cos(alpha) * np.cos(gamma) - np.cos(beta))
-                / (np.sin(alpha) * np.sin(gamma))
-            )
-            gamma_star = np.arccos(
-                (np.cos(alpha) * np.cos(beta) - np.cos(gamma))
-                / (np.sin(alpha) * np.sin(beta))
-            )
-            # cacluates the orthonormalisation matrix M
-            M = np.zeros((3, 3))
-            M[0, 0] = a
-            M[0, 1] = b * np.cos(gamma)
-            M[0, 2] = c * np.cos(beta)
-            M[1, 0] = 0
-            M[1, 1] = b * np.sin(gamma)
-            M[1, 2] = -c * np.sin(beta) * np.cos(alpha_star)
-            M[2, 0] = 0
-            M[2, 1] = 0
-            M[2, 2] = c * np.sin(beta) * np.sin(alpha_star)
-            M_star = np.linalg.inv(M)
-
-            ## converst the molecule plane into fractional coordinates
-            cart_coords = np.zeros((1, 3))
-            cart_coords[0, 0] = float(plane_data[0])
-            cart_coords[0, 1] = float(plane_data[1])
-            cart_coords[0, 2] = float(plane_data[2])
-            frac_coords = np.dot(cart_coords, M_star)
-            molecule_plane = frac_coords
-
-            # convert the reference plane into fractional coordinates
-
-            ref_plane = np.zeros((1, 3))
-            ref_plane[0, 0] = self.ref_plane[0]
-            ref_plane[0, 1] = self.ref_plane[1]
-            ref_plane[0, 2] = self.ref_plane[2]
-            ref_frac_coords = np.dot(ref_plane, M_star)
-
-            ## Calculates the difference in angle between atom plane and reference plane
-
-            angle = np.degrees(
-                np.arccos(
-                    np.dot(molecule_plane, ref_frac_coords.T)
-                    / (
-                        np.dot(
-                            (np.linalg.norm(molecule_plane)),
-                            (np.linalg.norm(ref_frac_coords)),
-                        )
-                    )
-                )
-            )
-            # there is probably a better way to do this it seems to be required for the plotting function in pipeline to get a single value without double square brackets around it!
-            angle = angle[0]
-            angle = angle[0]
-            if 180 - angle < 90:
-                angle = 180 - angle
+            angle = self.plane_angle(plane)
+
         return angle
 
+    def parse_plane(self, plane: str) -> list:
+        """Gets the coefficients of a plane from its equation line in the .lst file
+
+        Args:
+            plane (str): the equation line of the plane from the .lst file
+
+        Returns:
+            coefficients (list): the x, y and z coefficients of the plane
+        """
+
+        plane_data = []
+        # remove parentheses and contents
+        s = re.sub(r"\([^)]*\)", "", plane)
+        # remove =
+        s = s.replace("=", " ")
+        # attach signs to numbers separated by spaces
+        s = re.sub(r"([+-])\s+(\d)", r"\1\2", s)
+        vals = re.findall(r"[-+]?\d*\.?\d+(?:[eE][-+]?\d+)?", s)
+        # append to data keeping - but removing +
+        for item in vals:
+            if item.startswith("+"):
+                item = item[1:]
+            plane_data.append(float(item))
+
+        return plane_data[:3]
+
+    def plane_angle(self, plane: str) -> float:
+        """Calculates the angle between one MPLA plane and the reference plane
+
+        Args:
+            plane (str): the equation line of the plane from the .lst file
+
+        Returns:
+            angle (float): the resulting angle from the calculations
+        """
+
+        angles = self.plane_angles(
+            [[self.parse_plane(plane)]], [self.ref_values], [self.ref_plane]
+        )
+
+        return angles[0, 0, 0]
+
+    def plane_angles(self, normals, cells, ref_planes) -> "np.array":
+        """Calculates the angles between many MPLA planes and reference planes at once
+
+        Structures with fewer planes than the others are padded with NaN,
+
+        which gives NaN angles
+
+        Args:
+            normals: (S,P,3) coefficients of P planes for each of S structures
+            cells: (S,6) unit cell of each structure
+            ref_planes: (R,3) reference planes ie [[1,0,0],[0,0,1]]
+
+        Returns:
+            angles (np.array): (S,P,R) angle between each plane and each reference
+
+                                plane (degrees, between 0 and 90)
+        """
+
+        normals = np.asarray(normals, dtype=float).reshape(len(cells), -1, 3)
+        ref_planes = np.asarray(ref_planes, dtype=float).reshape(-1, 3)
+
+        # the inverse of the orthonormalisation matrix M for each cell
+
+        M_star = Cell_Geometry().calculate(cells)["M_inv"]
+
+        # converts the planes and reference planes into fractional coordinates
+
+        molecule_planes = np.einsum("spi,sij->spj", normals, M_star)
+        ref_frac_coords = np.einsum("ri,sij->srj", ref_planes, M_star)
+
+        ## Calculates the difference in angle between atom planes and reference planes
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cos_angles = np.einsum(
+                "spj,srj->spr", molecule_planes, ref_frac_coords
+            ) / (
+                np.linalg.norm(molecule_planes, axis=2)[:, :, None]
+                * np.linalg.norm(ref_frac_coords, axis=2)[:, None, :]
+            )
+
+        angles = np.degrees(np.arccos(np.clip(cos_angles, -1, 1)))
+
+        return np.where(angles > 90, 180 - angles, angles)
+
+    def collect_planes(self, lst_files: list) -> tuple:
+        """Reads the cell and every MPLA plane from a series of .lst files
+
+        Args:
+            lst_files (list): full paths to each .lst file
+
+        Returns:
+            normals (np.array): (S,P,3) plane coefficients, padded with NaN
+            cells (np.array): (S,6) unit cells (NaN if the file had no cell)
+        """
+
+        scanned = [self.scan_lst(item) for item in lst_files]
+
+        number_of_planes = max([len(item["planes"]) for item in scanned] + [0])
+
+        normals = np.full((len(scanned), number_of_planes, 3), np.nan)
+        cells = np.full((len(scanned), 6), np.nan)
+
+        for index, item in enumerate(scanned):
+            if item["cell"] is not None:
+                cells[index] = item["cell"]
+            for position, plane in enumerate(item["planes"]):
+                normals[index, position] = self.parse_plane(plane)
+
+        return normals, cells
+
     def find_planes(self, file_name: str) -> float:
         """Imports .lst file and then runs the function to calculate the rotation angle
 
@@ -257,19 +309,30 @@ class Rotation:
 
         # Finds the calculation in the .lst file
 
-        with open(file_name, "rt") as lst_file:
-            data = lst_file.readlines()
+        planes = self.scan_lst(file_name)["planes"]
+
+        angle = 0
 
-        angle = self.calculate_planes(data, self.ref_plane, self.ref_values)
+        if len(planes) != 0:
+            angle = self.plane_angle(planes[-1])
 
         return angle
 
-    def analysis(self, lst_name: str, structure_number: int, results_path: str) -> None:
+    def analysis(
+        self,
+        lst_name: str,
+        structure_number: int,
+        results_path: str,
+        results: "Rotation_Results" = None,
+    ) -> None:
         """Runs the previous functions and also outputs the results to a .csv file
         Args:
             lst_name (str): full path to the .lst file for analysis
             structure_number (int): gives the structure number as independent variable
             results_path (str): full path to the location of the output results
+            results (Rotation_Results): collects the angles for a series of structures,
+
+                                    if not given the angle is added to the .csv file straight away
         """
 
         self.bad_flag = False
@@ -277,19 +340,107 @@ class Rotation:
         if lst_name == "":
             logging.info(__name__ + " : Refinement failed, no mean plane to analyse")
         else:
-            self.grab_cell(pathlib.Path(lst_name))
+            # the cell and planes are found in one read of the .lst file
+
+            lst_data = self.scan_lst(pathlib.Path(lst_name))
+
+            if lst_data["cell"] is None:
+                self.bad_flag = True
+            else:
+                self.ref_values = lst_data["cell"]
 
             if self.bad_flag == False:
-                rot_angle = self.find_planes(pathlib.Path(lst_name))
+                rot_angle = 0
+
+                if len(lst_data["planes"]) != 0:
+                    rot_angle = self.plane_angle(lst_data["planes"][-1])
+
                 self.df = pd.DataFrame(
                     {"Structure": [structure_number], "Rotation Angle": [rot_angle]}
                 )
-                os.chdir(results_path)
-                try:
-                    old_data = pd.read_csv("rotation_angles.csv")
-                except FileNotFoundError:
-                    self.df.to_csv("rotation_angles.csv", index=None)
+
+                if results is None:
+                    with Rotation_Results(results_path) as single_result:
+                        single_result.add(structure_number, rot_angle)
                 else:
-                    # new_df = old_data.append(self.df)
-                    new_df = pd.concat([old_data, self.df])
-                    new_df.to_csv("rotation_angles.csv", index=None)
+                    results.add(structure_number, rot_angle)
+
+
+class Rotation_Results:
+    def __init__(self, results_path: str, flush_interval: int = None) -> None:
+        """Initialises the class
+
+        Collects the rotation angles for a series of structures and adds them
+
+        to rotation_angles.csv, rather than re-reading and re-writing the
+
+        whole file for every structure
+
+        The file is opened once, and new rows are added to the end of it
+
+        (so results from earlier runs are kept, as before)
+
+        Args:
+            results_path (str): full path to the folder for rotation_angles.csv
+            flush_interval (int): if given, the angles are written to the file
+
+                                every flush_interval structures, so they are not
+
+                                lost if the run crashes - otherwise they are
+
+                                all written at the end
+        """
+
+        self.path = pathlib.Path(results_path) / "rotation_angles.csv"
+        self.flush_interval = flush_interval
+        self.rows = []
+        self.unwritten = 0
+        self.handle = None
+
+    def __enter__(self) -> "Rotation_Results":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def add(self, structure_number: int, angle: float) -> None:
+        """Adds the angle for one structure
+
+        Args:
+            structure_number (int): the structure number (independent variable)
+            angle (float): the rotation angle
+        """
+
+        self.rows.append({"Structure": structure_number, "Rotation Angle": angle})
+        self.unwritten += 1
+
+        if self.flush_interval is not None and self.unwritten >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes any angles not yet in the file"""
+
+        if self.unwritten == 0:
+            return
+
+        if self.handle is None:
+            new_file = not self.path.exists() or os.path.getsize(self.path) == 0
+            self.handle = open(self.path, "a", newline="")
+        else:
+            new_file = False
+
+        pd.DataFrame(self.rows[-self.unwritten :]).to_csv(
+            self.handle, header=new_file, index=None
+        )
+        self.handle.flush()
+
+        self.unwritten = 0
+
+    def close(self) -> None:
+        """Writes any remaining angles and closes the file"""
+
+        self.flush()
+
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
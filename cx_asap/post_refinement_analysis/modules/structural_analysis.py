@@ -11,6 +11,8 @@
 # ----------Required Modules----------#
 
 from system_files.utils import Nice_YAML_Dumper, Config, Grapher
+from post_refinement_analysis.modules.partitioned_output import Partitioned_Output
+from system_files.compact_tables import Table_Compactor
 import os
 import pathlib
 import pandas as pd
@@ -87,6 +89,8 @@ class Structural_Analysis:
         prefix: str = "",
         flexible: bool = False,
         varying_parameter: str = "Data_Block",
+        output_format: str = "csv",
+        float32_errors: bool = False,
     ) -> None:
         """Imports data from .csv files for analysis
 
@@ -105,8 +109,14 @@ class Structural_Analysis:
             prefix (str): Adds a prefix to folder names
             flexible (bool): True for flexible mapping experiment, false if anything else
             varying_parameter (str): Which parameter is varying (ie _diffrn_ambient_temperature)
+            output_format (str): "csv" for a folder of individual .csv files,
+
+                                or "parquet"/"hdf5" for one file (see Partitioned_Output)
+            float32_errors (bool): if true, the errors are stored as float32 to save memory
         """
-        # Imports data from .csv files
+        # Imports data from .csv files, with repeated labels stored once (see Table_Compactor)
+
+        compactor = Table_Compactor(float32_errors)
 
         if location == False:
             try:
@@ -127,6 +137,7 @@ class Structural_Analysis:
 
         if bond_csv != False:
             bond_df = pd.read_csv(pathlib.Path(bond_csv))
+            bond_df = compactor.compact(bond_df, pathlib.Path(bond_csv).name)
 
             os.chdir(pathlib.Path(bond_csv).parent)
 
@@ -141,10 +152,12 @@ class Structural_Analysis:
                 prefix,
                 flexible,
                 varying_parameter,
+                output_format,
             )
 
         if angle_csv != False:
             angle_df = pd.read_csv(pathlib.Path(angle_csv))
+            angle_df = compactor.compact(angle_df, pathlib.Path(angle_csv).name)
 
             os.chdir(pathlib.Path(angle_csv).parent)
 
@@ -159,10 +172,14 @@ class Structural_Analysis:
                 prefix,
                 flexible,
                 varying_parameter,
+                output_format,
             )
         if torsion_csv != False:
             try:
                 torsion_df = pd.read_csv(pathlib.Path(torsion_csv))
+                torsion_df = compactor.compact(
+                    torsion_df, pathlib.Path(torsion_csv).name
+                )
             except FileNotFoundError:
                 logging.info(
                     __name__
@@ -182,10 +199,14 @@ class Structural_Analysis:
                     prefix,
                     flexible,
                     varying_parameter,
+                    output_format,
                 )
         if hbond_csv != False:
             try:
                 hbond_df = pd.read_csv(pathlib.Path(hbond_csv))
+                hbond_df = compactor.compact(
+                    hbond_df, pathlib.Path(hbond_csv).name
+                )
             except FileNotFoundError:
                 logging.info(
                     __name__
@@ -205,8 +226,31 @@ class Structural_Analysis:
                     prefix,
                     flexible,
                     varying_parameter,
+                    output_format,
                 )
 
+    def join_labels(self, df: "pd.DataFrame", columns: list) -> "pd.Series":
+        """Joins the atom labels of each bond/angle/torsion/hbond into one key
+
+        ie C1 and C2 become C1C2
+
+        Args:
+            df (pd.DataFrame): dataframe containing the atom labels
+            columns (list): the atom label columns, in order
+
+        Returns:
+            joined (pd.Series): the joined labels for each row
+        """
+
+        # Labels may be categories (see Table_Compactor), which cannot be added together
+
+        joined = df[columns[0]].astype(object)
+
+        for column in columns[1:]:
+            joined = joined + df[column].astype(object)
+
+        return joined
+
     def structural_analysis(
         self,
         df: "pd.DataFrame",
@@ -219,6 +263,7 @@ class Structural_Analysis:
         prefix: str,
         flexible: bool = False,
         varying_parameter: str = "Data_Block",
+        output_format: str = "csv",
     ) -> None:
         """Performs structural analysis for bonds, angles, hbonds and torsions
 
@@ -250,6 +295,9 @@ class Structural_Analysis:
             prefix (str): Adds a prefix to folder names
             flexible (bool): True for flexible mapping experiment, false if anything else
             varying_parameter (str): Which parameter is varying (ie _diffrn_ambient_temperature)
+            output_format (str): "csv" for a folder of individual .csv files,
+
+                                or "parquet"/"hdf5" for one file (see Partitioned_Output)
         """
 
         os.chdir(self.location)
@@ -261,27 +309,28 @@ class Structural_Analysis:
         important_df = pd.DataFrame()
 
         if df.empty == False:
-            # Separates out important atoms by looking for them in any column and merging into one dataframe
-
-            for item in atoms_for_analysis:
-                temp_df = df[df.eq(item).any(axis=1)]
-                important_df = pd.concat([important_df, temp_df], axis=0)
-
-            # Need to make a new column of the indices - the above code will give you double ups if both atoms in a bond are "important"
+            # Separates out important atoms by looking for them in any of the atom label columns
 
-            # When concatanating the dataframes, it keeps the indicies of the original dataframes
+            # Rows are kept in the order of atoms_for_analysis (ie all bonds to the first atom,
 
-            # Meaning... doubleup indices AND out of order indices
+            # then any others to the second atom), and a bond between two important atoms only once
 
-            # Both are bad, so make a new column of the indicies, use it to drop duplicates, and then resets the index of the important dataframe
+            label_columns = [item for item in components if "label" in item]
 
-            important_df["index_2"] = list(important_df.index)
-
-            important_df = important_df.drop_duplicates(subset=["index_2"])
+            atom_rank = pd.Series(
+                range(len(atoms_for_analysis)), index=atoms_for_analysis
+            )
+            atom_rank = atom_rank[~atom_rank.index.duplicated()]
 
-            important_df = important_df.drop(["index_2"], axis=1)
+            row_rank = df[label_columns].apply(
+                lambda column: column.map(atom_rank).astype(float)
+            )
+            row_rank = row_rank.min(axis=1)
 
-            important_df = important_df.reset_index(drop=True)
+            important_df = df[row_rank.notna()]
+            important_df = important_df.iloc[
+                row_rank[row_rank.notna()].argsort(kind="stable")
+            ].reset_index(drop=True)
 
             # Making symmetry equivalent bonds (ie same atom 1 and atom 2) distinguishable
 
@@ -289,107 +338,57 @@ class Structural_Analysis:
 
             # Put the atoms together into a 'joined' list to make it easier to sort through
 
-            if structure_type == "Bonds":
-                important_df["Joined"] = (
-                    important_df[column_names[0]] + important_df[column_names[2]]
-                )
-            elif structure_type == "Angles":
-                important_df["Joined"] = (
-                    important_df[column_names[0]]
-                    + important_df[column_names[2]]
-                    + important_df[column_names[4]]
-                )
-            elif structure_type == "Torsions":
-                important_df["Joined"] = (
-                    important_df[column_names[0]]
-                    + important_df[column_names[2]]
-                    + important_df[column_names[4]]
-                    + important_df[column_names[6]]
-                )
-            elif structure_type == "Hbonds":
-                important_df["Joined"] = (
-                    important_df[column_names[0]]
-                    + important_df[column_names[2]]
-                    + important_df[column_names[4]]
+            joined_columns = {
+                "Bonds": [column_names[0], column_names[2]],
+                "Angles": [column_names[0], column_names[2], column_names[4]],
+                "Torsions": [
+                    column_names[0],
+                    column_names[2],
+                    column_names[4],
+                    column_names[6],
+                ],
+                "Hbonds": [column_names[0], column_names[2], column_names[4]],
+            }
+
+            if structure_type in joined_columns:
+                important_df["Joined"] = self.join_labels(
+                    important_df, joined_columns[structure_type]
                 )
             else:
                 logging.info("Something went weird.")
 
-            dup = important_df.duplicated(["Joined", varying_parameter], keep=False)
-
-            # The below function counts the number of each group of duplicates
-
-            list_dup = important_df.pivot_table(
-                columns=["Joined", varying_parameter], aggfunc="size"
-            ).to_dict()
-
-            counter = 0
-
-            new_column = []
-
             # This appends a suffix to each duplicated bond in the joined column based on how many there are
 
-            for j, i in enumerate(dup):
-                bond = important_df["Joined"][j]
+            # NOTE HERE VARIABLE 'TEMPERATURE' CAN BE ANY PARAMETER BUT I DIDN'T WANT TO CHANGE WHOLE CODE
 
-                # NOTE HERE VARIABLE 'TEMPERATURE' CAN BE ANY PARAMETER BUT I DIDN'T WANT TO CHANGE WHOLE CODE
+            dup = important_df.duplicated(["Joined", varying_parameter], keep=False)
 
-                temperature = important_df[varying_parameter][j]
+            suffix = important_df.groupby(
+                ["Joined", varying_parameter], sort=False, dropna=False
+            ).cumcount()
 
-                if i == True:
-                    temp = important_df["Joined"][j]
-                    new_column.append(important_df["Joined"][j] + "_" + str(counter))
-                    counter += 1
-                else:
-                    new_column.append(important_df["Joined"][j])
-                try:
-                    if counter == list_dup[(bond, temperature)]:
-                        counter = 0
-                except UnboundLocalError:
-                    pass
-
-            important_df["Joined"] = new_column
+            important_df["Joined"] = important_df["Joined"].where(
+                ~dup, important_df["Joined"] + "_" + suffix.astype(str)
+            )
 
             important_df.to_csv(prefix + "_Important_" + file_name, index=None)
 
             # Individual CSVs
 
-            if structure_type == "Bonds":
-                df["Joined"] = df[column_names[0]] + df[column_names[2]]
-            elif structure_type == "Angles":
-                df["Joined"] = (
-                    df[column_names[0]] + df[column_names[2]] + df[column_names[4]]
-                )
-            elif structure_type == "Torsions":
-                df["Joined"] = (
-                    df[column_names[0]]
-                    + df[column_names[2]]
-                    + df[column_names[4]]
-                    + df[column_names[6]]
-                )
-            elif structure_type == "Hbonds":
-                df["Joined"] = (
-                    df[column_names[0]] + df[column_names[2]] + df[column_names[4]]
-                )
+            if structure_type in joined_columns:
+                df["Joined"] = self.join_labels(df, joined_columns[structure_type])
             else:
                 logging.info("Something went weird.")
 
-            discrete_atoms = list(dict.fromkeys(df["Joined"]))
-
-            try:
-                os.mkdir(folder_name)
-            except FileExistsError:
-                pass
-
-            os.chdir(folder_name)
+            # One pass through the table, keeping the order each bond first appears in
 
-            for item in discrete_atoms:
-                separated_df = df[df.eq(item).any(axis=1)]
-                separated_df.to_csv(
-                    structure_type + "_" + str(item) + ".csv", index=None
-                )
-
-            os.chdir("..")
+            individual = Partitioned_Output(
+                pathlib.Path.cwd() / folder_name,
+                "Joined",
+                output_format,
+                structure_type + "_",
+            )
+            individual.write(df)
 
             # Make Graphs
 
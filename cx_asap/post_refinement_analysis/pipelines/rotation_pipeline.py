@@ -11,7 +11,7 @@
 # ----------Required Modules----------#
 
 from system_files.utils import Nice_YAML_Dumper, Config, Directory_Browse, Grapher
-from post_refinement_analysis.modules.rotation_planes import Rotation
+from post_refinement_analysis.modules.rotation_planes import Rotation, Rotation_Results
 import os
 import pandas as pd
 import logging
@@ -47,7 +47,11 @@ class Rotation_Pipeline:
         self.sys_path = config.sys_path
 
     def analysis(
-        self, working_directory: str, reference_plane: list, results_directory: str
+        self,
+        working_directory: str,
+        reference_plane: list,
+        results_directory: str,
+        flush_interval: int = None,
     ) -> None:
         """Initialises the class
 
@@ -67,14 +71,18 @@ class Rotation_Pipeline:
             reference_plane (list): plane to compare MPLA against as a list
                             ie [1,0,0] corresponds to the (100) plane
             results_directory (str): full path to the location for output graphs
+            flush_interval (int): if given, the angles are saved every flush_interval
+
+                                structures, otherwise once at the end (see Rotation_Results)
         """
         plane = Rotation()
         plane.configure(reference_plane)
         tree = Directory_Browse(working_directory)
-        for index, item in enumerate(tree.directories):
-            tree.enter_directory(item, ".lst")
-            plane.analysis(tree.item_file, index + 1, results_directory)
-            tree.exit_directory()
+        with Rotation_Results(results_directory, flush_interval) as results:
+            for index, item in enumerate(tree.directories):
+                tree.enter_directory(item, ".lst")
+                plane.analysis(tree.item_file, index + 1, results_directory, results)
+                tree.exit_directory()
         os.chdir(results_directory)
 
         try:
@@ -15,6 +15,8 @@ from post_refinement_analysis.modules.cif_read import CIF_Read
 from post_refinement_analysis.modules.cell_analysis import Cell_Deformation
 from post_refinement_analysis.modules.structural_analysis import Structural_Analysis
 from post_refinement_analysis.modules.ADP_analysis import ADP_analysis
+import pandas as pd
+import numpy as np
 import yaml
 import logging
 
@@ -50,7 +52,7 @@ class Variable_Analysis_Pipeline:
         self.conf_path = config.conf_path
         self.sys_path = config.sys_path
 
-    def determine_behaviour(self, df: "pd.DataFrame", param: str) -> list:
+    def determine_behaviour(self, df: "pd.DataFrame", param) -> list:
         """Searches through the data and classifies everything as a
 
         minima, maxima, increasing or decreasing
@@ -68,53 +70,85 @@ class Variable_Analysis_Pipeline:
             param (str) = heading in the dataframe for the variable of interest
                             function analyses how THIS param in the df is changing
 
+                            can also be a list of headings, which are all
+
+                            classified at once
+
         Returns:
             behaviour (list) = a list of the behaviour with the same length
                                 as the data in the dataframe
+
+                                if param is a list, a dataframe with the
+
+                                behaviour of each heading
+        """
+
+        if isinstance(param, str):
+            behaviour = list(self.classify_behaviour(df[[param]].to_numpy())[:, 0])
+
+            df["behaviour"] = behaviour
+
+            return behaviour
+
+        return pd.DataFrame(
+            self.classify_behaviour(df[list(param)].to_numpy()),
+            columns=list(param),
+            index=df.index,
+        )
+
+    def classify_behaviour(self, data: "np.array") -> "np.array":
+        """Classifies every point in any number of data series at once
+
+        Each point is classified from the sign of the change from the point
+
+        before it and the sign of the change to the point after it
+
+        Args:
+            data (np.array): (N,K) array of K series with N points each
+
+        Returns:
+            behaviour (np.array): (N,K) array of the behaviour of each point
         """
 
-        behaviour = []
-
-        data = df[param]
-
-        for index, i in enumerate(data):
-            if index != 0 and index != len(data) - 1:
-                if i < data[index - 1] and i < data[index + 1]:
-                    behaviour.append("Minima")
-                elif i > data[index - 1] and i > data[index + 1]:
-                    behaviour.append("Maxima")
-                elif i < data[index - 1] and i > data[index + 1]:
-                    behaviour.append("Decreasing")
-                elif i > data[index - 1] and i < data[index + 1]:
-                    behaviour.append("Increasing")
-                elif i > data[index - 1] and i == data[index + 1]:
-                    behaviour.append("Increasing")
-                elif i < data[index - 1] and i == data[index + 1]:
-                    behaviour.append("Decreasing")
-                elif i == data[index - 1]:
-                    behaviour.append("Did Not Change")
-                else:
-                    behaviour.append("Error")
-
-            # This else statement is needed to classify the first and last points
-
-            else:
-                if index == 0:
-                    if i < data[index + 1]:
-                        behaviour.append("Increasing")
-                    elif i == data[index + 1]:
-                        behaviour.append("Did Not Change")
-                    else:
-                        behaviour.append("Decreasing")
-                else:
-                    if i < data[index - 1]:
-                        behaviour.append("Decreasing")
-                    elif i == data[index - 1]:
-                        behaviour.append("Did Not Change")
-                    else:
-                        behaviour.append("Increasing")
-
-        df["behaviour"] = behaviour
+        data = np.asarray(data, dtype=float)
+
+        behaviour = np.full(data.shape, "Did Not Change", dtype=object)
+
+        if len(data) < 2:
+            return behaviour
+
+        with np.errstate(invalid="ignore"):
+            change = np.sign(np.diff(data, axis=0))
+
+        # sign of the change from the point before (backward) and to the next point (forward)
+
+        backward = change[:-1]
+        forward = change[1:]
+
+        behaviour[1:-1] = np.select(
+            [
+                (backward == -1) & (forward == 1),
+                (backward == 1) & (forward == -1),
+                (backward == -1) & (forward <= 0),
+                (backward == 1) & (forward >= 0),
+                backward == 0,
+            ],
+            ["Minima", "Maxima", "Decreasing", "Increasing", "Did Not Change"],
+            "Error",
+        )
+
+        # The first and last points only have one neighbour
+
+        behaviour[0] = np.select(
+            [change[0] == 1, change[0] == 0],
+            ["Increasing", "Did Not Change"],
+            "Decreasing",
+        )
+        behaviour[-1] = np.select(
+            [change[-1] == -1, change[-1] == 0],
+            ["Decreasing", "Did Not Change"],
+            "Increasing",
+        )
 
         return behaviour
 
@@ -187,6 +221,7 @@ class Variable_Analysis_Pipeline:
         cell = Cell_Deformation(self.test_mode)
         cell.import_data("CIF_Parameters.csv", ref_cell)
         cell.calculate_deformations()
+        cell.write_strain_analysis(param)
         cell.quality_analysis(
             param,
             {
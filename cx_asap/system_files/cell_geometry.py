@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+###################################################################################################
+# ------------------------------------CX-ASAP: cell_geometry---------------------------------------#
+# ---Authors: Amy J. Thompson, Kate M. Smith, Daniel J. Eriksson, Jack K. Clegg & Jason R. Price---#
+# -----------------------------------Python Implementation by AJT----------------------------------#
+# -----------------------------------Project Design by JRP and JKC---------------------------------#
+# --------------------------------Valuable Coding Support by KMS & DJE-----------------------------#
+###################################################################################################
+
+# ----------Required Modules----------#
+
+import numpy as np
+
+# ----------Class Definition----------#
+
+# Cells that have already been calculated, so each unit cell is only worked out once per run
+
+_geometry_cache = {}
+
+
+class Cell_Geometry:
+    def __init__(self) -> None:
+        """Initialises the class
+
+        Calculates the geometry of unit cells (metric matrix, volume,
+
+        reciprocal cell and orthogonalisation matrix)
+
+        Any number of cells can be given at once as an array, and the
+
+        calculations are done with numpy for all of them together
+
+        Each different cell is only calculated once, even between calls
+        """
+
+        self.cell_columns = [
+            "_cell_length_a",
+            "_cell_length_b",
+            "_cell_length_c",
+            "_cell_angle_alpha",
+            "_cell_angle_beta",
+            "_cell_angle_gamma",
+        ]
+
+        self.results = ["G", "G_recip", "volume", "reciprocal", "M", "M_inv"]
+
+    def cell_array(self, cells) -> "np.array":
+        """Converts unit cells into an (M,6) array
+
+        Args:
+            cells: a single cell [a, b, c, alpha, beta, gamma],
+
+                    a list or array of them, or a table with the _cell_* columns
+
+        Returns:
+            cells (np.array): (M,6) array of a, b, c (A) and alpha, beta, gamma (degrees)
+        """
+
+        if hasattr(cells, "columns"):
+            cells = cells[self.cell_columns].to_numpy()
+
+        return np.asarray(cells, dtype=float).reshape(-1, 6)
+
+    def calculate(self, cells) -> dict:
+        """Calculates the geometry of many unit cells
+
+        Args:
+            cells: a single cell [a, b, c, alpha, beta, gamma],
+
+                    a list or array of them, or a table with the _cell_* columns
+
+        Returns:
+            geometry (dict): arrays with one entry for each cell -
+
+                            "G" (M,3,3) metric matrix,
+
+                            "G_recip" (M,3,3) reciprocal metric matrix,
+
+                            "volume" (M) cell volume,
+
+                            "reciprocal" (M,6) a*, b*, c*, alpha*, beta*, gamma* (degrees),
+
+                            "M" (M,3,3) orthogonalisation matrix (a along x),
+
+                            "M_inv" (M,3,3) inverse of the orthogonalisation matrix
+        """
+
+        cells = self.cell_array(cells)
+
+        if len(cells) == 0:
+            return self.compute(cells)
+
+        unique_cells, inverse = np.unique(cells, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        keys = [tuple(cell) for cell in unique_cells.tolist()]
+
+        # Only cells which have not been seen before are calculated
+
+        missing = [index for index, key in enumerate(keys) if key not in _geometry_cache]
+
+        if len(missing) != 0:
+            new = self.compute(unique_cells[missing])
+
+            for position, index in enumerate(missing):
+                geometry = {item: new[item][position] for item in self.results}
+
+                # Cells with missing values are not kept (NaN never matches itself)
+
+                if np.isfinite(unique_cells[index]).all():
+                    _geometry_cache[keys[index]] = geometry
+                else:
+                    keys[index] = geometry
+
+        found = [
+            key if isinstance(key, dict) else _geometry_cache[key] for key in keys
+        ]
+
+        return {
+            item: np.stack([geometry[item] for geometry in found])[inverse]
+            for item in self.results
+        }
+
+    def compute(self, cells: "np.array") -> dict:
+        """Does the calculations for calculate (without the cache)
+
+        Args:
+            cells (np.array): (M,6) array of unit cells
+
+        Returns:
+            geometry (dict): see calculate
+        """
+
+        a, b, c = cells[:, 0], cells[:, 1], cells[:, 2]
+        alpha, beta, gamma = np.radians(cells[:, 3:6]).T
+
+        cos_alpha, cos_beta, cos_gamma = np.cos(alpha), np.cos(beta), np.cos(gamma)
+        sin_alpha, sin_beta, sin_gamma = np.sin(alpha), np.sin(beta), np.sin(gamma)
+
+        # Metric matrix
+
+        G = np.empty((len(cells), 3, 3))
+
+        G[:, 0, 0] = a * a
+        G[:, 1, 1] = b * b
+        G[:, 2, 2] = c * c
+        G[:, 0, 1] = G[:, 1, 0] = a * b * cos_gamma
+        G[:, 0, 2] = G[:, 2, 0] = a * c * cos_beta
+        G[:, 1, 2] = G[:, 2, 1] = b * c * cos_alpha
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            volume = (
+                a
+                * b
+                * c
+                * np.sqrt(
+                    1
+                    - cos_alpha**2
+                    - cos_beta**2
+                    - cos_gamma**2
+                    + 2 * cos_alpha * cos_beta * cos_gamma
+                )
+            )
+
+            # Reciprocal cell
+
+            cos_alpha_star = (cos_beta * cos_gamma - cos_alpha) / (sin_beta * sin_gamma)
+            cos_beta_star = (cos_alpha * cos_gamma - cos_beta) / (sin_alpha * sin_gamma)
+            cos_gamma_star = (cos_alpha * cos_beta - cos_gamma) / (sin_alpha * sin_beta)
+
+            reciprocal = np.stack(
+                [
+                    b * c * sin_alpha / volume,
+                    a * c * sin_beta / volume,
+                    a * b * sin_gamma / volume,
+                    np.degrees(np.arccos(cos_alpha_star)),
+                    np.degrees(np.arccos(cos_beta_star)),
+                    np.degrees(np.arccos(cos_gamma_star)),
+                ],
+                axis=1,
+            )
+
+        # Orthogonalisation matrix
+
+        M = np.zeros((len(cells), 3, 3))
+
+        M[:, 0, 0] = a
+        M[:, 0, 1] = b * cos_gamma
+        M[:, 0, 2] = c * cos_beta
+        M[:, 1, 1] = b * sin_gamma
+        M[:, 1, 2] = -c * sin_beta * cos_alpha_star
+        M[:, 2, 2] = c * sin_beta * np.sqrt(1 - cos_alpha_star**2)
+
+        # Cells with missing values are inverted as a cube and then set to NaN
+
+        bad = ~np.isfinite(G).all(axis=(1, 2)) | ~np.isfinite(M).all(axis=(1, 2))
+
+        G_recip = np.linalg.inv(np.where(bad[:, None, None], np.eye(3), G))
+        M_inv = np.linalg.inv(np.where(bad[:, None, None], np.eye(3), M))
+
+        G_recip[bad] = np.nan
+        M_inv[bad] = np.nan
+
+        return {
+            "G": G,
+            "G_recip": G_recip,
+            "volume": volume,
+            "reciprocal": reciprocal,
+            "M": M,
+            "M_inv": M_inv,
+        }
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+
+###################################################################################################
+# ------------------------------------CX-ASAP: compact_tables--------------------------------------#
+# ---Authors: Amy J. Thompson, Kate M. Smith, Daniel J. Eriksson, Jack K. Clegg & Jason R. Price---#
+# -----------------------------------Python Implementation by AJT----------------------------------#
+# -----------------------------------Project Design by JRP and JKC---------------------------------#
+# --------------------------------Valuable Coding Support by KMS & DJE-----------------------------#
+###################################################################################################
+
+# ----------Required Modules----------#
+
+import pandas as pd
+import numpy as np
+import logging
+
+# ----------Class Definition----------#
+
+
+class Table_Compactor:
+    def __init__(self, float32_errors: bool = False, category_ratio: float = 0.5) -> None:
+        """Initialises the class
+
+        Makes the tables of bonds, angles, torsions, hbonds and ADPs use less memory
+
+        Atom labels, CIF names and data block names repeat for every structure,
+
+        so are stored once each as categories rather than once per row
+
+        The error (esd) columns can also be stored as float32, which is
+
+        more than enough for the number of figures an esd has
+
+        None of this changes the values written out to .csv files (unless float32 is used)
+
+        Args:
+            float32_errors (bool): if true, the _error columns are stored as float32
+            category_ratio (float): text columns with fewer unique values than
+
+                                    this fraction of the rows become categories
+        """
+
+        self.float32_errors = float32_errors
+        self.category_ratio = category_ratio
+
+        # Memory of the tables added with append, before and after compacting
+
+        self.appended = {}
+
+    def memory(self, df: "pd.DataFrame") -> int:
+        """Calculates how much memory a table uses
+
+        Args:
+            df (pd.DataFrame): the table
+
+        Returns:
+            memory (int): memory in bytes, including the text itself
+        """
+
+        return int(df.memory_usage(deep=True).sum())
+
+    def compact(self, df: "pd.DataFrame", name: str = "table") -> "pd.DataFrame":
+        """Converts the columns of a table to smaller types
+
+        Args:
+            df (pd.DataFrame): the table to compact
+            name (str): name of the table for the log
+
+        Returns:
+            df (pd.DataFrame): the compacted table
+        """
+
+        if df.empty:
+            return df
+
+        before = self.memory(df)
+
+        df = self.compact_columns(df.copy())
+
+        after = self.memory(df)
+
+        logging.info(
+            __name__
+            + " : "
+            + name
+            + " memory reduced from "
+            + str(round(before / 1e6, 3))
+            + " MB to "
+            + str(round(after / 1e6, 3))
+            + " MB"
+        )
+
+        return df
+
+    def compact_columns(self, df: "pd.DataFrame") -> "pd.DataFrame":
+        """Converts the columns of a table to smaller types, without copying it first
+
+        Args:
+            df (pd.DataFrame): the table to compact, which is changed
+
+        Returns:
+            df (pd.DataFrame): the compacted table
+        """
+
+        for column in df.columns:
+            if isinstance(df[column].dtype, pd.CategoricalDtype):
+                continue
+
+            if pd.api.types.infer_dtype(df[column], skipna=True) == "string":
+                if df[column].nunique() <= self.category_ratio * len(df):
+                    df[column] = df[column].astype("category")
+
+            elif str(column).endswith("_error") and pd.api.types.is_numeric_dtype(
+                df[column]
+            ):
+                if pd.api.types.is_integer_dtype(df[column]):
+                    df[column] = pd.to_numeric(df[column], downcast="integer")
+                elif self.float32_errors == True:
+                    df[column] = df[column].astype(np.float32)
+
+        return df
+
+    def append(
+        self, df: "pd.DataFrame", new_df: "pd.DataFrame", name: str = "table"
+    ) -> "pd.DataFrame":
+        """Adds rows to a compacted table, compacting them first
+
+        This means the table is never held in full size while it is being built
+
+        Columns which are categories in either table are combined with the
+
+        categories of both, so they stay as categories after concatenating
+
+        Args:
+            df (pd.DataFrame): the compacted table so far
+            new_df (pd.DataFrame): the rows to add (ie from one CIF)
+            name (str): name of the table for the log (see log_appended)
+
+        Returns:
+            df (pd.DataFrame): the compacted table with the new rows
+        """
+
+        if new_df.empty:
+            return df
+
+        memory = self.memory(new_df)
+
+        sizes = self.appended.setdefault(name, {"rows": 0, "largest": 0})
+        sizes["rows"] += memory
+        sizes["largest"] = max(sizes["largest"], memory)
+
+        new_df = self.compact_columns(new_df.copy(deep=False))
+
+        if df.empty:
+            return new_df
+
+        df = df.copy(deep=False)
+
+        for column in df.columns.intersection(new_df.columns):
+            if isinstance(df[column].dtype, pd.CategoricalDtype) or isinstance(
+                new_df[column].dtype, pd.CategoricalDtype
+            ):
+                categories = (
+                    pd.Index(df[column].astype("category").cat.categories)
+                    .append(pd.Index(new_df[column].astype("category").cat.categories))
+                    .unique()
+                )
+                dtype = pd.CategoricalDtype(categories)
+                df[column] = df[column].astype(dtype)
+                new_df[column] = new_df[column].astype(dtype)
+
+        # Text columns may only repeat enough to become categories once there are more rows
+
+        return self.compact_columns(pd.concat([df, new_df]))
+
+    def log_appended(self, tables: dict) -> None:
+        """Logs the memory used by tables built with append
+
+        The largest single set of rows added is also given, as that is the
+
+        most extra memory needed at any time while the tables are built
+
+        Args:
+            tables (dict): each table built with append, with its name as the key
+        """
+
+        largest = 0
+
+        for name in tables:
+            if name not in self.appended:
+                continue
+
+            largest = max(largest, self.appended[name]["largest"])
+
+            logging.info(
+                __name__
+                + " : "
+                + name
+                + " read as "
+                + str(round(self.memory(tables[name]) / 1e6, 3))
+                + " MB (it would be "
+                + str(round(self.appended[name]["rows"] / 1e6, 3))
+                + " MB without compacting)"
+            )
+
+        logging.info(
+            __name__
+            + " : Peak table memory while reading about "
+            + str(
+                round(
+                    (sum(self.memory(tables[name]) for name in tables) + largest)
+                    / 1e6,
+                    3,
+                )
+            )
+            + " MB"
+        )
@@ -0,0 +1,833 @@
+#!/usr/bin/env python3
+
+###################################################################################################
+# ----------------------------------CX-ASAP: figure_rendering--------------------------------------#
+# ---Authors: Amy J. Thompson, Kate M. Smith, Daniel J. Eriksson, Jack K. Clegg & Jason R. Price---#
+# -----------------------------------Python Implementation by AJT----------------------------------#
+# -----------------------------------Project Design by JRP and JKC---------------------------------#
+# --------------------------------Valuable Coding Support by KMS & DJE-----------------------------#
+###################################################################################################
+
+# ----------Required Modules----------#
+
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PIL import Image
+import matplotlib
+import matplotlib.ticker as ticker
+import numpy as np
+import pathlib
+import json
+import hashlib
+import shutil
+import logging
+
+# ----------Class Definition----------#
+
+# The render service that Grapher sends figures to (None means figures are drawn straight away)
+
+_active_renderer = None
+
+# Changes to how the figures are drawn should change this, so old figures are redrawn
+
+_drawing_version = 1
+
+
+def plain_data(value):
+    """Converts the data for a figure into plain lists, numbers and strings
+
+    This means figure specs can be sent to other processes (and saved) cheaply
+
+    Args:
+        value: numbers, lists, dictionaries, numpy arrays or pandas series
+
+    Returns:
+        value: the same data using only python types
+    """
+
+    if isinstance(value, dict):
+        return {str(key): plain_data(item) for key, item in value.items()}
+    elif isinstance(value, (list, tuple)):
+        return [plain_data(item) for item in value]
+    elif isinstance(value, np.generic):
+        return value.item()
+    elif hasattr(value, "tolist"):
+        return plain_data(value.tolist())
+    elif isinstance(value, pathlib.PurePath):
+        return str(value)
+    else:
+        return value
+
+
+def render_figure(spec: dict) -> str:
+    """Draws and saves one figure
+
+    This is the function run by the worker processes of Figure_Renderer
+
+    Args:
+        spec (dict): the figure spec made by Grapher
+
+    Returns:
+        figure_name (str): full path to the saved figure
+    """
+
+    Figure_Drawer().save(spec)
+
+    return spec["figure_name"]
+
+
+def fingerprint(spec: dict) -> str:
+    """Makes a fingerprint of the data and styling of a figure
+
+    Args:
+        spec (dict): the figure spec made by Grapher
+
+    Returns:
+        fingerprint (str): sha256 hash of the kind of figure, its data and labels,
+
+                            and the versions used to draw it
+    """
+
+    text = json.dumps(
+        {
+            "kind": spec["kind"],
+            "arguments": spec["arguments"],
+            "version": _drawing_version,
+            "matplotlib": matplotlib.__version__,
+        },
+        sort_keys=True,
+    )
+
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def figure_is_current(spec: dict) -> bool:
+    """Checks if the figure already saved at figure_name was drawn from the same spec
+
+    The fingerprint of each .png figure is saved in the image (as PNG text),
+
+    so rerunning an analysis only redraws the figures whose data has changed
+
+    Args:
+        spec (dict): the figure spec made by Grapher
+
+    Returns:
+        current (bool): true if the saved figure does not need to be redrawn
+    """
+
+    figure_name = pathlib.Path(spec["figure_name"])
+
+    if figure_name.suffix.lower() != ".png" or not figure_name.exists():
+        return False
+
+    try:
+        with Image.open(figure_name) as image:
+            saved = image.info.get("CX-ASAP Fingerprint")
+    except OSError:
+        return False
+
+    return saved == fingerprint(spec)
+
+
+def manifest_path(figure_name: str) -> pathlib.Path:
+    """Gets the name of the plot spec saved instead of a figure
+
+    Args:
+        figure_name (str): full path to the figure (ie cell_parameters.png)
+
+    Returns:
+        manifest (pathlib.Path): full path to the plot spec (ie cell_parameters.plot.json)
+    """
+
+    figure_name = pathlib.Path(figure_name)
+
+    return figure_name.with_name(figure_name.stem + ".plot.json")
+
+
+def write_manifest(spec: dict) -> pathlib.Path:
+    """Saves a figure spec as a .plot.json file next to where the figure would be
+
+    The figure is saved by name only, so the folder can be moved before rendering
+
+    Args:
+        spec (dict): the figure spec made by Grapher
+
+    Returns:
+        manifest (pathlib.Path): full path to the plot spec
+    """
+
+    manifest = manifest_path(spec["figure_name"])
+
+    saved = {
+        "kind": spec["kind"],
+        "figure_name": pathlib.Path(spec["figure_name"]).name,
+        "arguments": spec["arguments"],
+    }
+
+    with open(manifest, "w") as f:
+        json.dump(saved, f, separators=(",", ":"))
+
+    return manifest
+
+
+def read_manifest(manifest: str) -> dict:
+    """Reads a .plot.json file back into a figure spec
+
+    Args:
+        manifest (str): full path to the plot spec
+
+    Returns:
+        spec (dict): the figure spec, with the full path to the figure
+    """
+
+    manifest = pathlib.Path(manifest).absolute()
+
+    with open(manifest, "rt") as f:
+        spec = json.load(f)
+
+    spec["figure_name"] = str(manifest.parent / spec["figure_name"])
+
+    return spec
+
+
+def find_manifests(paths: list) -> list:
+    """Finds the .plot.json files to render
+
+    Args:
+        paths (list): .plot.json files, or folders to search (including subfolders)
+
+    Returns:
+        manifests (list): full paths to each .plot.json file
+    """
+
+    manifests = []
+
+    for item in paths:
+        item = pathlib.Path(item).absolute()
+        if item.is_dir():
+            manifests += sorted(item.rglob("*.plot.json"))
+        else:
+            manifests.append(item)
+
+    return manifests
+
+
+def copy_figure(figure_name: str, destination: str) -> None:
+    """Copies a figure, waiting for it to be rendered if it is in the render service
+
+    Args:
+        figure_name (str): full path to the figure
+        destination (str): full path to the folder to copy it to
+    """
+
+    if _active_renderer is not None:
+        _active_renderer.copy_when_rendered(figure_name, destination)
+    else:
+        shutil.copy(figure_name, destination)
+
+
+class Figure_Drawer:
+    def __init__(self) -> None:
+        """Initialises the class
+
+        Draws the figures described by figure specs from Grapher
+
+        Everything is drawn onto its own matplotlib Figure and saved with
+
+        the Agg backend, so nothing uses the global pyplot state
+
+        and figures can be drawn in any process
+        """
+
+        # Font size used for each kind of figure (None is the matplotlib default)
+
+        self.font_sizes = {
+            "single_scatter_graph": None,
+            "multi_scatter_graph": 25,
+            "multi_multi_scatter_graph": 12,
+            "four_line_graph": 20,
+            "graph_multi_series": None,
+        }
+
+        self.figure_sizes = {
+            "single_scatter_graph": (16, 12),
+            "multi_scatter_graph": (35, 35),
+            "multi_multi_scatter_graph": (12, 20),
+            "four_line_graph": (25, 17),
+            "graph_multi_series": (16, 12),
+        }
+
+    def save(self, spec: dict) -> None:
+        """Draws a figure and saves it as an image
+
+        Args:
+            spec (dict): "kind" - the name of the Grapher function,
+
+                        "figure_name" - full path to the output file,
+
+                        "arguments" - the data and labels for that function
+        """
+
+        rc = {}
+
+        if self.font_sizes[spec["kind"]] is not None:
+            rc["font.size"] = self.font_sizes[spec["kind"]]
+
+        metadata = None
+
+        if pathlib.Path(spec["figure_name"]).suffix.lower() == ".png":
+            metadata = {"CX-ASAP Fingerprint": fingerprint(spec)}
+
+        with matplotlib.rc_context(rc):
+            figure = Figure(figsize=self.figure_sizes[spec["kind"]])
+            FigureCanvasAgg(figure)
+
+            getattr(self, spec["kind"])(figure, **spec["arguments"])
+
+            figure.savefig(
+                spec["figure_name"], bbox_inches="tight", dpi=100, metadata=metadata
+            )
+
+    def scatter(
+        self, ax: "Axes", x: list, y: list, max_points: int = None, **style
+    ) -> None:
+        """Draws one series of a scatter graph as a single PathCollection
+
+        Series with more than max_points points are decimated (see decimate)
+
+        and rasterised, so very long series (ie in-situ data) stay quick
+
+        to draw and small to save
+
+        Args:
+            ax (Axes): the graph to draw on
+            x (list): x-data
+            y (list): y-data
+            max_points (int): most points to draw, if not given every point is drawn
+            style: colours, markers, labels etc for ax.scatter
+        """
+
+        if max_points is not None and np.size(y) > max_points:
+            x, y = self.decimate(x, y, max_points)
+            style["rasterized"] = True
+
+        ax.scatter(x, y, **style)
+
+    def decimate(self, x: list, y: list, max_points: int) -> tuple:
+        """Reduces a series to at most max_points points, keeping its shape
+
+        The x range is split into max_points / 2 bins, and the points with
+
+        the smallest and largest y in each bin are kept (in their original order),
+
+        so peaks and troughs are never lost
+
+        Args:
+            x (list): x-data
+            y (list): y-data
+            max_points (int): most points to keep
+
+        Returns:
+            x (np.array): x-data of the points kept
+            y (np.array): y-data of the points kept
+        """
+
+        x = np.asarray(x)
+        y = np.asarray(y, dtype=float)
+
+        # Points are binned by x, or by their position if x is not numbers
+
+        try:
+            position = x.astype(float)
+        except (TypeError, ValueError):
+            position = np.arange(len(y), dtype=float)
+
+        keep = np.isfinite(position) & np.isfinite(y)
+        x, y, position = x[keep], y[keep], position[keep]
+
+        if len(y) <= max_points:
+            return x, y
+
+        if position.max() == position.min():
+            position = np.arange(len(y), dtype=float)
+
+        number_of_bins = max(max_points // 2, 1)
+
+        bins = (
+            (position - position.min())
+            / (position.max() - position.min())
+            * number_of_bins
+        ).astype(int)
+        bins = np.minimum(bins, number_of_bins - 1)
+
+        # Sorted by bin and then y, the first and last point of each bin are its min and max
+
+        order = np.lexsort((y, bins))
+        starts = np.flatnonzero(np.diff(bins[order], prepend=-1) != 0)
+        ends = np.append(starts[1:], len(order)) - 1
+
+        chosen = np.unique(np.concatenate([order[starts], order[ends]]))
+
+        return x[chosen], y[chosen]
+
+    def single_scatter_graph(
+        self,
+        figure: "Figure",
+        x: list,
+        y: list,
+        x_title: str,
+        y_title: str,
+        graph_title: str,
+        y_series_title: list = None,
+        colour: list = None,
+        marker: list = None,
+        linewidth: list = None,
+        s: list = None,
+        max_points: int = None,
+    ) -> None:
+        """Draws a single scatter graph (see Grapher.single_scatter_graph)
+
+        Args:
+            figure (Figure): the figure to draw on
+            x (list): x-data
+            y (list): y-data
+            x_title (str): label for x-axis
+            y_title (str): label for y-axis
+            graph_title (str): title for graph
+            y_series_title (list): names of y-series if multiple plots to go in legend
+            colour (list): colours for multiple series
+            marker (list): markers for multiple series
+            linewidth (list): line widths for multiple series
+            s (list): marker sizes for multiple series
+            max_points (int): series with more points than this are decimated (see scatter)
+        """
+
+        ax = figure.add_subplot()
+
+        for index, item in enumerate(y):
+            if type(item) != float and type(item) != int:
+                if len(x) != len(item):
+                    logging.info(
+                        __name__
+                        + " : Possible error with plotting structural changes. Check the structures in the output CIF for unreasonable structures."
+                    )
+
+                    # This will manually make x the correct length by repeating value
+
+                    # Often just an artefact of weird things going on
+
+                    # Also stops the pipeline-variable-analysis throwing error in test
+
+                    # Was because when this pipeline is run individually on test data,
+
+                    # all the temperatures hadn't been edited yet
+
+                    to_repeat = x[0]
+
+                    x = [to_repeat] * len(item)
+
+                if colour == None and y_series_title != None:
+                    self.scatter(ax, x, item, max_points, label=y_series_title[index])
+                elif y_series_title == None:
+                    self.scatter(ax, x, item, max_points)
+                else:
+                    self.scatter(
+                        ax,
+                        x,
+                        item,
+                        max_points,
+                        c=colour[index],
+                        marker=marker[index],
+                        linewidth=linewidth[index],
+                        s=s[index],
+                        label=y_series_title[index],
+                    )
+
+            else:
+                # y is a single series, so it only needs to be drawn once
+
+                self.scatter(ax, x, y, max_points)
+                break
+
+        ax.set_xlabel(x_title, fontsize=12)
+        ax.set_ylabel(y_title, fontsize=12)
+
+        ax.set_title(graph_title)
+        if y_series_title != None:
+            ax.legend(fontsize=12)
+
+    def multi_scatter_graph(
+        self,
+        figure: "Figure",
+        x: list,
+        y: list,
+        title: list,
+        rows: int,
+        columns: int,
+        subplots: list,
+        y_series_title: str,
+        x_title: str,
+        y_title: str,
+        max_points: int = None,
+    ) -> None:
+        """Draws multiple separate scatter graphs (see Grapher.multi_scatter_graph)
+
+        Args:
+            figure (Figure): the figure to draw on
+            x (list): x-data
+            y (list): y-data
+            title (str): title for graph
+            rows (int): number of rows of graphs in figure
+            columns (int): number of columns of graphs in figure
+            subplots (list): list of graphs ie for 4 graphs it should be [1,2,3,4]
+            y_series_title (list): names of y-series if multiple plots to go in legend
+            x_title (str): label for x-axis
+            y_title (str): label for y-axis
+            max_points (int): series with more points than this are decimated (see scatter)
+        """
+
+        colours = ["red", "green", "blue", "red", "green", "blue"]
+        backgrounds = ["wheat"] * 3 + ["lavender"] * 3 + ["silver"]
+        titles = {1: title[0], 4: title[1], 6: title[2]}
+
+        for index, item in enumerate(subplots):
+            ax = figure.add_subplot(rows, columns, item)
+            ax.xaxis.set_major_locator(ticker.MaxNLocator(10))
+            ax.yaxis.set_major_locator(ticker.MaxNLocator(10))
+            ax.yaxis.set_major_formatter(ticker.FormatStrFormatter("%.2f"))
+
+            self.scatter(
+                ax,
+                x,
+                y[index],
+                max_points,
+                label=y_series_title[index],
+                s=100,
+                color=colours[index] if index < len(colours) else "black",
+            )
+
+            if index < len(backgrounds):
+                ax.set_facecolor(backgrounds[index])
+                ax.patch.set_alpha(0.3)
+
+            if index in titles:
+                ax.set_title(titles[index], fontsize=30, fontweight="bold")
+
+            ax.set_xlabel(x_title)
+            ax.set_ylabel(y_title[index])
+
+            ax.legend(fontsize=30)
+
+    def multi_multi_scatter_graph(
+        self,
+        figure: "Figure",
+        x: list,
+        y: dict,
+        title: str,
+        rows: int,
+        columns: int,
+        subplots: list,
+        x_title: str,
+        y_title: str,
+    ) -> None:
+        """Draws multiple scatter graphs with multiple series on each
+
+        (see Grapher.multi_multi_scatter_graph)
+
+        Args:
+            figure (Figure): the figure to draw on
+            x (list): x-data
+            y (dict): y-data
+            title (str): title for graph
+            rows (int): number of rows of graphs in figure
+            columns (int): number of columns of graphs in figure
+            subplots (list): list of graphs ie for 4 graphs it should be [1,2,3,4]
+            x_title (str): label for x-axis
+            y_title (str): label for y-axis
+        """
+
+        for index, i in enumerate(y):
+            ax = figure.add_subplot(rows, columns, subplots[index])
+            ax.xaxis.set_major_locator(ticker.MaxNLocator(10))
+            ax.yaxis.set_major_locator(ticker.MaxNLocator(10))
+            ax.yaxis.set_major_formatter(ticker.FormatStrFormatter("%.3f"))
+            for j in y[i]:
+                if type(j) == list:
+                    ax.scatter(x, j, label=i)
+                else:
+                    ax.scatter(x, y[i], label=i)
+                    break
+            ax.set_xlabel(x_title)
+            if type(y_title) == str:
+                ax.set_ylabel(y_title)
+            else:
+                ax.set_ylabel(y_title[index])
+            ax.set_title(title)
+            ax.legend()
+
+    def four_line_graph(
+        self,
+        figure: "Figure",
+        x: list,
+        y: list,
+        x_title: list,
+        y_title: list,
+        full_title: str,
+        mini_titles: list,
+    ) -> None:
+        """Draws a 2 x 2 grid of line graphs (see Grapher.four_line_graph)
+
+        Args:
+            figure (Figure): the figure to draw on
+            x (list): x-data (list of list data - ie lists within a list, one for each subplot)
+            y (list): y-data (list of list data - ie lists within a list, one for each subplot)
+            x_title (list): list of labels for x-axis
+            y_title (list: list of labels for y-axis
+            full_title (str): title for graph
+            mini_titles (list): titles for each of the 4 graphs
+        """
+
+        axes = figure.subplots(2, 2).flatten()
+        colours = ["r", "b", "g", "tab:orange"]
+
+        figure.suptitle(full_title)
+
+        for index, ax in enumerate(axes):
+            ax.yaxis.set_major_formatter(ticker.FormatStrFormatter("%.3f"))
+
+            if len(x[index]) == 1:
+                ax.scatter(x[index], y[index], color=colours[index])
+            else:
+                ax.plot(x[index], y[index], colours[index])
+
+            ax.set_xlabel(x_title[index])
+            ax.set_ylabel(y_title[index])
+            ax.set_title(mini_titles[index])
+
+    def graph_multi_series(self, figure: "Figure", series: list, y_title: list) -> None:
+        """Draws one graph for each parameter, with a series for each behaviour
+
+        (see Grapher.graph_multi_series)
+
+        Args:
+            figure (Figure): the figure to draw on
+            series (list): "x" data, "y" data for each parameter and
+
+                            "behaviour" label of each separated dataframe
+            y_title (list): list of dataframe labels for y-axis
+        """
+
+        axes = {}
+
+        for item in series:
+            for index, param in enumerate(y_title):
+                if index not in axes:
+                    axes[index] = figure.add_subplot(2, 4, index + 1)
+                self.mini_graph(
+                    axes[index], item["x"], item["y"][param], param, item["behaviour"]
+                )
+
+    def mini_graph(
+        self, ax: "Axes", x: list, y: list, title: str, behaviour: str
+    ) -> None:
+        """Pretty standard graphing function with nothing special
+
+        Args:
+            ax (Axes): the graph to draw on
+            x (list): x-data
+            y (list): y-data
+            title (str): title for graph
+            behaviour (str): label for scatter plot
+        """
+
+        ax.xaxis.set_major_locator(ticker.MaxNLocator(10))
+        ax.yaxis.set_major_locator(ticker.MaxNLocator(10))
+        ax.scatter(x, y, label=behaviour)
+        ax.set_xlabel("Temperature(K)")
+        if any(item in title.lower() for item in ["alpha", "beta", "gamma"]):
+            ax.set_ylabel("Angle(" + chr(176) + ")")
+        elif "vol" in title.lower():
+            ax.set_ylabel("Volume (\u212B\u00B3)")
+        else:
+            ax.set_ylabel(r"Distance ($\AA$)")
+        ax.set_title(title)
+        ax.legend()
+
+
+class Figure_Renderer:
+    def __init__(self, max_workers: int = None, render_later: bool = False) -> None:
+        """Initialises the class
+
+        A rendering service which draws figures in a pool of processes
+
+        While it is being used (with Figure_Renderer() as renderer:),
+
+        every Grapher function sends its figure here and returns straight away,
+
+        so the pipeline carries on while the figures are drawn
+
+        All of the figures are finished when the with block ends
+
+        If render_later is true, nothing is drawn - a small .plot.json file
+
+        is saved instead of each figure, which can be drawn later with
+
+        "cxasap render" (or the render function)
+
+        Args:
+            max_workers (int): number of processes drawing figures,
+
+                                if not given, this is the number of CPUs
+            render_later (bool): if true, plot specs are saved instead of figures
+        """
+
+        self.max_workers = max_workers
+        self.render_later = render_later
+        self.pool = None
+        self.pending = []
+        self.unchanged = 0
+        self.previous = None
+
+    def __enter__(self) -> "Figure_Renderer":
+        global _active_renderer
+
+        self.previous = _active_renderer
+        _active_renderer = self
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        global _active_renderer
+
+        _active_renderer = self.previous
+
+        self.close()
+
+    def submit(self, spec: dict) -> None:
+        """Adds a figure to the queue to be drawn
+
+        Args:
+            spec (dict): the figure spec made by Grapher
+        """
+
+        if self.render_later == True:
+            write_manifest(spec)
+        else:
+            self.draw(spec)
+
+    def draw(self, spec: dict) -> None:
+        """Adds a figure to the queue of the process pool
+
+        Figures which are already saved with the same fingerprint are skipped
+
+        Args:
+            spec (dict): the figure spec made by Grapher
+        """
+
+        if figure_is_current(spec):
+            self.unchanged += 1
+            return
+
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.max_workers)
+
+        self.pending.append(
+            (spec["figure_name"], self.pool.submit(render_figure, spec))
+        )
+
+    def copy_when_rendered(self, figure_name: str, destination: str) -> None:
+        """Copies a figure once it has been drawn
+
+        Args:
+            figure_name (str): full path to the figure
+            destination (str): full path to the folder to copy it to
+        """
+
+        figure_name = str(pathlib.Path(figure_name).absolute())
+
+        # The plot spec is copied instead, and will draw the figure wherever it is
+
+        if self.render_later == True:
+            figure_name = str(manifest_path(figure_name))
+
+        future = None
+
+        for name, item in self.pending:
+            if name == figure_name:
+                future = item
+
+        if future is None:
+            shutil.copy(figure_name, destination)
+            return
+
+        def copy(finished) -> None:
+            try:
+                shutil.copy(finished.result(), destination)
+            except Exception as error:
+                logging.info(
+                    __name__ + " : Could not copy " + figure_name + " - " + str(error)
+                )
+
+        future.add_done_callback(copy)
+
+    def wait(self) -> list:
+        """Waits for every figure in the queue to be drawn
+
+        Returns:
+            failed (list): full paths to any figures that could not be drawn
+        """
+
+        failed = []
+
+        for figure_name, future in self.pending:
+            try:
+                future.result()
+            except Exception as error:
+                failed.append(figure_name)
+                logging.info(
+                    __name__ + " : Could not draw " + figure_name + " - " + str(error)
+                )
+
+        logging.info(
+            __name__
+            + " : Drew "
+            + str(len(self.pending) - len(failed))
+            + " of "
+            + str(len(self.pending))
+            + " changed figures (unchanged figures were not redrawn - cache hits: "
+            + str(self.unchanged)
+            + ", misses: "
+            + str(len(self.pending))
+            + ")"
+        )
+
+        self.pending = []
+        self.unchanged = 0
+
+        return failed
+
+    def close(self) -> None:
+        """Waits for every figure to be drawn and stops the processes"""
+
+        if len(self.pending) != 0 or self.unchanged != 0:
+            self.wait()
+
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def render(self, manifests: list) -> list:
+        """Draws the figures for saved plot specs
+
+        Args:
+            manifests (list): full paths to each .plot.json file
+
+        Returns:
+            failed (list): full paths to any figures that could not be drawn
+        """
+
+        for item in manifests:
+            self.draw(read_manifest(item))
+
+        return self.wait()
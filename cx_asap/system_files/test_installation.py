@@ -116,14 +116,7 @@ class Test:
                 os.chdir("..")
                 os.rmdir(item)
 
-        with open(self.sys_path, "w") as f:
-            yaml.dump(
-                self.sys,
-                f,
-                default_flow_style=False,
-                Dumper=Nice_YAML_Dumper,
-                sort_keys=False,
-            )
+        Config.write_sys(self.sys_path, self.sys)
 
         shelxl = Structure_Refinement(test_mode=True)
 
@@ -174,14 +167,7 @@ class Test:
             ).absolute()
         )
 
-        with open(self.sys_path, "w") as f:
-            yaml.dump(
-                self.sys,
-                f,
-                default_flow_style=False,
-                Dumper=Nice_YAML_Dumper,
-                sort_keys=False,
-            )
+        Config.write_sys(self.sys_path, self.sys)
 
         shelxl = Refinement_Pipeline(test_mode=True)
 
@@ -226,14 +212,7 @@ class Test:
             ).absolute()
         )
 
-        with open(self.sys_path, "w") as f:
-            yaml.dump(
-                self.sys,
-                f,
-                default_flow_style=False,
-                Dumper=Nice_YAML_Dumper,
-                sort_keys=False,
-            )
+        Config.write_sys(self.sys_path, self.sys)
 
         instrument_cif = Instrument_CIF(test_mode=True)
 
@@ -281,14 +260,7 @@ class Test:
             ).absolute()
         )
 
-        with open(self.sys_path, "w") as f:
-            yaml.dump(
-                self.sys,
-                f,
-                default_flow_style=False,
-                Dumper=Nice_YAML_Dumper,
-                sort_keys=False,
-            )
+        Config.write_sys(self.sys_path, self.sys)
 
         finalise_cifs = Cif_Merge(test_mode=True)
 
@@ -343,14 +315,7 @@ class Test:
             ).absolute()
         )
 
-        with open(self.sys_path, "w") as f:
-            yaml.dump(
-                self.sys,
-                f,
-                default_flow_style=False,
-                Dumper=Nice_YAML_Dumper,
-                sort_keys=False,
-            )
+        Config.write_sys(self.sys_path, self.sys)
 
         current_dir = os.getcwd()
         os.chdir(self.sys["pipeline-cif"]["experiment_location"])
@@ -414,14 +379,7 @@ class Test:
             ).absolute()
         )
 
-        with open(self.sys_path, "w") as f:
-            yaml.dump(
-                self.sys,
-                f,
-                default_flow_style=False,
-                Dumper=Nice_YAML_Dumper,
-                sort_keys=False,
-            )
+        Config.write_sys(self.sys_path, self.sys)
 
         analysis = CIF_Read(test_mode=True)
 
@@ -475,14 +433,7 @@ class Test:
             ).absolute()
         )
 
-        with open(self.sys_path, "w") as f:
-            yaml.dump(
-                self.sys,
-                f,
-                default_flow_style=False,
-                Dumper=Nice_YAML_Dumper,
-                sort_keys=False,
-            )
+        Config.write_sys(self.sys_path, self.sys)
 
         analysis = Cell_Deformation(test_mode=True)
 
@@ -569,14 +520,7 @@ class Test:
             ).absolute()
         )
 
-        with open(self.sys_path, "w") as f:
-            yaml.dump(
-                self.sys,
-                f,
-                default_flow_style=False,
-                Dumper=Nice_YAML_Dumper,
-                sort_keys=False,
-            )
+        Config.write_sys(self.sys_path, self.sys)
 
         geometry = Structural_Analysis(test_mode=True)
 
@@ -628,14 +572,7 @@ class Test:
             ).absolute()
         )
 
-        with open(self.sys_path, "w") as f:
-            yaml.dump(
-                self.sys,
-                f,
-                default_flow_style=False,
-                Dumper=Nice_YAML_Dumper,
-                sort_keys=False,
-            )
+        Config.write_sys(self.sys_path, self.sys)
 
         vt_analysis = Variable_Analysis_Pipeline(test_mode=True)
 
@@ -710,14 +647,7 @@ class Test:
             ).absolute()
         )
 
-        with open(self.sys_path, "w") as f:
-            yaml.dump(
-                self.sys,
-                f,
-                default_flow_style=False,
-                Dumper=Nice_YAML_Dumper,
-                sort_keys=False,
-            )
+        Config.write_sys(self.sys_path, self.sys)
 
         full = General_Pipeline(test_mode=True)
 
@@ -10,18 +10,30 @@
 
 # ----------Required Modules----------#
 
+from system_files.cell_geometry import Cell_Geometry
+from system_files import figure_rendering
 import pathlib
 import yaml
+import copy
+import atexit
 import os
 import shutil
 import logging
-import matplotlib.pyplot as plt
-import matplotlib.ticker as ticker
 import math
 import re
 import fileinput
+import time
 from typing import Tuple
 
+# libyaml makes reading and writing the yaml files much faster, but it is not
+
+# always installed with pyyaml, so the pure python versions are used without it
+
+try:
+    from yaml import CSafeLoader as YAML_Loader, CSafeDumper as YAML_Dumper
+except ImportError:
+    from yaml import SafeLoader as YAML_Loader, SafeDumper as YAML_Dumper
+
 # ----------Class Definition----------#
 
 
@@ -169,14 +181,7 @@ class Configure_Flexible:
             self.sys["XDS_inp_organised"], "DATA_RANGE"
         )[1:]
 
-        with open(self.sys_path, "w") as f:
-            yaml.dump(
-                self.sys,
-                f,
-                default_flow_style=False,
-                Dumper=Nice_YAML_Dumper,
-                sort_keys=False,
-            )
+        Config.write_sys(self.sys_path, self.sys)
 
         self.cfg, self.sys = self.config.yaml_reload()
 
@@ -292,14 +297,7 @@ class Configure_Flexible:
             self.sys["XDS_inp_organised"], "X-RAY_WAVELENGTH"
         )
 
-        with open(self.sys_path, "w") as f:
-            yaml.dump(
-                self.sys,
-                f,
-                default_flow_style=False,
-                Dumper=Nice_YAML_Dumper,
-                sort_keys=False,
-            )
+        Config.write_sys(self.sys_path, self.sys)
 
         self.cell.cell_import(self.sys["ref_path_organised"])
 
@@ -337,6 +335,183 @@ class Configure_Flexible:
 # ----------Class Definition----------#
 
 
+# Listings of every folder indexed so far, shared by every Tree_Index in this process
+
+_folder_listings = {}
+
+
+class Tree_Index:
+    def __init__(self, location) -> None:
+        """Initialises the class
+
+        Indexes the files in an experiment folder and its subfolders so that
+
+        browsing them does not list and stat the same folders over and over
+
+        Each folder is read once with os.scandir, the first time it is needed,
+
+        and its files are recorded by suffix (with their size and modification time)
+
+        Afterwards only the folder itself is checked - if anything has been added,
+
+        removed or renamed since, its modification time changes and it is read again
+
+        Args:
+            location (str): full path to the experiment folder
+        """
+
+        self.location = pathlib.Path(location).absolute()
+
+    def scan(self, folder: str) -> dict:
+        """Reads one folder and records its contents
+
+        Args:
+            folder (str): full path to the folder
+
+        Returns:
+            listing (dict): "folders" - names of the subfolders,
+
+                            "files" - the os.DirEntry of each file by name,
+
+                            "suffixes" - names of the files with each suffix
+        """
+
+        start = time.time_ns()
+
+        listing = {
+            "mtime": os.stat(folder).st_mtime_ns,
+            "scanned": start,
+            "folders": [],
+            "files": {},
+            "suffixes": {},
+        }
+
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    listing["folders"].append(entry.name)
+                else:
+                    listing["files"][entry.name] = entry
+                    listing["suffixes"].setdefault(self.suffix(entry.name), []).append(
+                        entry.name
+                    )
+
+        _folder_listings[folder] = listing
+
+        return listing
+
+    def listing(self, folder: str = None) -> dict:
+        """Gets the contents of a folder, only reading it again if it has changed
+
+        A folder changed within 2 s of being read is always read again, as
+
+        some file systems only record modification times to the nearest second
+
+        Args:
+            folder (str): full path to the folder, if not given the experiment folder
+
+        Returns:
+            listing (dict): the contents of the folder (see scan)
+        """
+
+        if folder is None:
+            folder = self.location
+
+        folder = str(pathlib.Path(folder).absolute())
+
+        listing = _folder_listings.get(folder)
+
+        if (
+            listing is not None
+            and os.stat(folder).st_mtime_ns == listing["mtime"]
+            and listing["scanned"] - listing["mtime"] > 2e9
+        ):
+            return listing
+
+        return self.scan(folder)
+
+    def suffix(self, name: str) -> str:
+        """Gets the part of a file name from its last full stop
+
+        Args:
+            name (str): file name or file ending (ie .ins)
+
+        Returns:
+            suffix (str): the suffix, or an empty string if there is no full stop
+        """
+
+        if "." not in name:
+            return ""
+
+        return name[name.rindex(".") :]
+
+    def directories(self, folder: str = None) -> list:
+        """Lists the subfolders of a folder
+
+        Args:
+            folder (str): full path to the folder, if not given the experiment folder
+
+        Returns:
+            directories (list): full paths to each subfolder
+        """
+
+        if folder is None:
+            folder = self.location
+
+        return [
+            pathlib.Path(folder).absolute() / item
+            for item in self.listing(folder)["folders"]
+        ]
+
+    def files(
+        self, file_suffix: str, ignored_files: list = False, folder: str = None
+    ) -> list:
+        """Lists the files in a folder with a particular ending
+
+        Args:
+            file_suffix (str): file ending to search for
+            ignored_files (list): any files to ignore
+            folder (str): full path to the folder, if not given the experiment folder
+
+        Returns:
+            files (list): names of the matching files, in the order they were found
+        """
+
+        listing = self.listing(folder)
+
+        # Every file ending in .ins has the suffix .ins, so only those need checking
+
+        if "." in file_suffix:
+            names = listing["suffixes"].get(self.suffix(file_suffix), [])
+        else:
+            names = listing["files"]
+
+        return [
+            item
+            for item in names
+            if item.endswith(file_suffix) and item != ignored_files
+        ]
+
+    def file_details(self, name: str, folder: str = None) -> Tuple[int, int]:
+        """Gets the size and modification time of a file when its folder was read
+
+        Args:
+            name (str): name of the file
+            folder (str): full path to the folder, if not given the experiment folder
+
+        Returns:
+            size (int): size of the file in bytes
+            mtime (int): modification time of the file in nanoseconds
+        """
+
+        details = self.listing(folder)["files"][name].stat()
+
+        return details.st_size, details.st_mtime_ns
+
+
+# ----------Class Definition----------#
+
+
 class Directory_Browse:
     def __init__(self, location, error_mode: bool = False) -> None:
         """Initialises the class
@@ -369,15 +544,16 @@ class Directory_Browse:
 
         # Finds all of the directories in the desired location
 
+        # The folders are listed by the index, which later browsing also uses
+
         self.home_directory = location
-        current_directory = os.getcwd()
-        os.chdir(self.home_directory)
-        self.directories = []
+        self.index = Tree_Index(self.home_directory)
+        self.check = File_Check(self.error_mode)
         self.sort = File_Sorter()
-        for item in self.sort.sorted_properly(os.listdir(self.home_directory)):
-            if os.path.isdir(item):
-                self.directories.append(pathlib.Path(item).absolute())
-        os.chdir(current_directory)
+        self.directories = [
+            self.index.location / item
+            for item in self.sort.sorted_properly(self.index.listing()["folders"])
+        ]
 
     def enter_directory(
         self,
@@ -429,9 +605,7 @@ class Directory_Browse:
             self.item_name = ""
 
             if ignore_check == False:
-                check = File_Check(self.error_mode)
-
-                file_list = check.duplicate_check(file_suffix, ignored_files)
+                file_list = self.check.duplicate_check(file_suffix, ignored_files)
 
                 if len(file_list) >= 2:
                     logging.info(
@@ -454,13 +628,12 @@ class Directory_Browse:
 
                     exit()
 
-            for item in os.listdir():
-                if item.endswith(file_suffix) and item != ignored_files:
-                    self.item_file = pathlib.Path(pathlib.Path(os.getcwd()) / item)
-                    self.item_name = self.item_file.stem
-                    logging.info(
-                        __name__ + " : File name for analysis: " + str(self.item_file)
-                    )
+            for item in self.index.files(file_suffix, ignored_files, os.getcwd()):
+                self.item_file = pathlib.Path(pathlib.Path(os.getcwd()) / item)
+                self.item_name = self.item_file.stem
+                logging.info(
+                    __name__ + " : File name for analysis: " + str(self.item_file)
+                )
 
     def enter_directory_multiple(
         self, folder: str, file_suffix: str, ignored_files: list = False
@@ -482,11 +655,12 @@ class Directory_Browse:
 
         os.chdir(folder)
         logging.info(__name__ + " : Performing tasks in folder: " + folder.name)
-        for item in self.sort.sorted_properly(os.listdir()):
-            if item.endswith(file_suffix) and item != ignored_files:
-                self.item_files.append(pathlib.Path(item))
-                self.item_names.append(pathlib.Path(item).stem)
-                logging.info(__name__ + " : File name for analysis: " + str(item))
+        for item in self.sort.sorted_properly(
+            self.index.files(file_suffix, ignored_files, os.getcwd())
+        ):
+            self.item_files.append(pathlib.Path(item))
+            self.item_names.append(pathlib.Path(item).stem)
+            logging.info(__name__ + " : File name for analysis: " + str(item))
 
     def exit_directory(self) -> None:
         """Exits back to the home directory"""
@@ -580,11 +754,9 @@ class File_Check:
             files_with_suffix (list): list of files with a common ending
         """
 
-        files_with_suffix = []
+        # The folder is only listed again if it has changed since it was indexed
 
-        for item in os.listdir():
-            if item.endswith(file_suffix) and item != ignored_files:
-                files_with_suffix.append(item)
+        files_with_suffix = Tree_Index(os.getcwd()).files(file_suffix, ignored_files)
 
         return files_with_suffix
 
@@ -645,14 +817,7 @@ class Autoprocess_Setup:
         self.sys["results_path"] = str(self.results_path.absolute())
         self.sys["failed_path"] = str(self.failed_path.absolute())
 
-        with open(self.sys_path, "w") as f:
-            yaml.dump(
-                self.sys,
-                f,
-                default_flow_style=False,
-                Dumper=Nice_YAML_Dumper,
-                sort_keys=False,
-            )
+        Config.write_sys(self.sys_path, self.sys)
 
     def File_Rename_AS(self) -> None:
         """This next part adds numbers so folders are correctly ordered
@@ -788,14 +953,7 @@ class Autoprocess_Setup:
             ).absolute()
         )
 
-        with open(self.sys_path, "w") as f:
-            yaml.dump(
-                self.sys,
-                f,
-                default_flow_style=False,
-                Dumper=Nice_YAML_Dumper,
-                sort_keys=False,
-            )
+        Config.write_sys(self.sys_path, self.sys)
 
         # Gets rid of all previously made .ins files from the analysis folders to make sure that the code runs ok later
 
@@ -868,14 +1026,7 @@ class Reprocess_Setup:
         self.sys["results_path"] = str(self.results_path.absolute())
         self.sys["frames_path"] = str(self.frames_path.absolute())
 
-        with open(self.sys_path, "w") as f:
-            yaml.dump(
-                self.sys,
-                f,
-                default_flow_style=False,
-                Dumper=Nice_YAML_Dumper,
-                sort_keys=False,
-            )
+        Config.write_sys(self.sys_path, self.sys)
 
     def Organise_Directory_Tree(
         self, reference_location: str, xds_inp_location: str
@@ -986,14 +1137,7 @@ class Reprocess_Setup:
             ).absolute()
         )
 
-        with open(self.sys_path, "w") as f:
-            yaml.dump(
-                self.sys,
-                f,
-                default_flow_style=False,
-                Dumper=Nice_YAML_Dumper,
-                sort_keys=False,
-            )
+        Config.write_sys(self.sys_path, self.sys)
 
         # Gets rid of all previously made .ins files from the analysis folders to make sure that the code runs ok later
 
@@ -1004,7 +1148,7 @@ class Reprocess_Setup:
 
 
 class Grapher:
-    def __init__(self, test_mode: bool = False) -> None:
+    def __init__(self, test_mode: bool = False, max_points: int = 10000) -> None:
         """Initialises the class
 
         Sets up the yaml parameters input by the user
@@ -1019,6 +1163,9 @@ class Grapher:
             test_mode (bool): Automatically false, if true it will
 
                             make the functions compatible with the testing script
+            max_points (int): scatter series with more points than this are
+
+                            decimated and rasterised (None to always draw every point)
         """
 
         # Setup yaml files and logger
@@ -1030,6 +1177,50 @@ class Grapher:
         self.conf_path = config.conf_path
         self.sys_path = config.sys_path
 
+        self.max_points = max_points
+
+        # Counts of figures skipped because they had not changed, and figures drawn
+
+        self.unchanged_figures = 0
+        self.drawn_figures = 0
+
+    def output_figure(self, kind: str, figure_name: str, arguments: dict) -> None:
+        """Draws a figure, or sends it to the render service if one is running
+
+        If the figure is already saved and its data and styling have not changed,
+
+        it is not drawn again
+
+        Args:
+            kind (str): name of the graphing function
+            figure_name (str): name for the output file
+            arguments (dict): the data and labels for the graphing function
+        """
+
+        spec = {
+            "kind": kind,
+            "figure_name": str(pathlib.Path(figure_name).absolute()),
+            "arguments": figure_rendering.plain_data(arguments),
+        }
+
+        if figure_rendering._active_renderer is not None:
+            figure_rendering._active_renderer.submit(spec)
+        elif figure_rendering.figure_is_current(spec):
+            self.unchanged_figures += 1
+            logging.info(
+                __name__
+                + " : "
+                + spec["figure_name"]
+                + " is unchanged, so was not redrawn (cache hits: "
+                + str(self.unchanged_figures)
+                + ", misses: "
+                + str(self.drawn_figures)
+                + ")"
+            )
+        else:
+            self.drawn_figures += 1
+            figure_rendering.render_figure(spec)
+
     def single_scatter_graph(
         self,
         x: list,
@@ -1062,59 +1253,23 @@ class Grapher:
             s (list): marker sizes for multiple series
         """
 
-        for index, item in enumerate(y):
-            if type(item) != float and type(item) != int:
-                if len(x) != len(item):
-                    logging.info(
-                        __name__
-                        + " : Possible error with plotting structural changes. Check the structures in the output CIF for unreasonable structures."
-                    )
-
-                    # This will manually make x the correct length by repeating value
-
-                    # Often just an artefact of weird things going on
-
-                    # Also stops the pipeline-variable-analysis throwing error in test
-
-                    # Was because when this pipeline is run individually on test data,
-
-                    # all the temperatures hadn't been edited yet
-
-                    to_repeat = x[0]
-
-                    x = [to_repeat] * len(item)
-
-                if colour == None and y_series_title != None:
-                    plt.scatter(x, item, label=y_series_title[index])
-                elif y_series_title == None:
-                    plt.scatter(x, y)
-                else:
-                    plt.scatter(
-                        x,
-                        item,
-                        c=colour[index],
-                        marker=marker[index],
-                        linewidth=linewidth[index],
-                        s=s[index],
-                        label=y_series_title[index],
-                    )
-
-            else:
-                plt.scatter(x, y)
-
-        plt.xlabel(x_title, fontsize=12)
-        plt.ylabel(y_title, fontsize=12)
-
-        plt.title(graph_title)
-        if y_series_title != None:
-            plt.legend(fontsize=12)
-
-        figure = plt.gcf()
-        figure.set_size_inches(16, 12)
-
-        plt.savefig(figure_name, bbox_inches="tight", dpi=100)
-        plt.clf()
-        plt.close("all")
+        self.output_figure(
+            "single_scatter_graph",
+            figure_name,
+            {
+                "x": x,
+                "y": y,
+                "x_title": x_title,
+                "y_title": y_title,
+                "graph_title": graph_title,
+                "y_series_title": y_series_title,
+                "colour": colour,
+                "marker": marker,
+                "linewidth": linewidth,
+                "s": s,
+                "max_points": self.max_points,
+            },
+        )
 
     def multi_scatter_graph(
         self,
@@ -1146,59 +1301,22 @@ class Grapher:
             figure_name (str): name for the output file
         """
 
-        for index, item in enumerate(subplots):
-            plt.rc("font", size=25)
-
-            ax = plt.subplot(rows, columns, item)
-            ax.xaxis.set_major_locator(ticker.MaxNLocator(10))
-            ax.yaxis.set_major_locator(ticker.MaxNLocator(10))
-            ax.yaxis.set_major_formatter(ticker.FormatStrFormatter("%.2f"))
-
-            if index == 0 or index == 3:
-                plt.scatter(
-                    x, y[index], label=y_series_title[index], s=100, color="red"
-                )
-            elif index == 1 or index == 4:
-                plt.scatter(
-                    x, y[index], label=y_series_title[index], s=100, color="green"
-                )
-            elif index == 2 or index == 5:
-                plt.scatter(
-                    x, y[index], label=y_series_title[index], s=100, color="blue"
-                )
-            else:
-                plt.scatter(
-                    x, y[index], label=y_series_title[index], s=100, color="black"
-                )
-
-            if index >= 0 and index <= 2:
-                ax.set_facecolor("wheat")
-                ax.patch.set_alpha(0.3)
-            elif index >= 3 and index <= 5:
-                ax.set_facecolor("lavender")
-                ax.patch.set_alpha(0.3)
-            elif index == 6:
-                ax.set_facecolor("silver")
-                ax.patch.set_alpha(0.3)
-
-            if index == 1:
-                plt.title(title[0], fontsize=30, fontweight="bold")
-            elif index == 4:
-                plt.title(title[1], fontsize=30, fontweight="bold")
-            elif index == 6:
-                plt.title(title[2], fontsize=30, fontweight="bold")
-
-            plt.xlabel(x_title)
-            plt.ylabel(y_title[index])
-
-            plt.legend(fontsize=30)
-
-        figure = plt.gcf()
-        figure.set_size_inches(35, 35)
-
-        plt.savefig(figure_name, bbox_inches="tight", dpi=100)
-        plt.clf()
-        plt.close("all")
+        self.output_figure(
+            "multi_scatter_graph",
+            figure_name,
+            {
+                "x": x,
+                "y": y,
+                "title": title,
+                "rows": rows,
+                "columns": columns,
+                "subplots": subplots,
+                "y_series_title": y_series_title,
+                "x_title": x_title,
+                "y_title": y_title,
+                "max_points": self.max_points,
+            },
+        )
 
     def multi_multi_scatter_graph(
         self,
@@ -1237,32 +1355,20 @@ class Grapher:
             figure_name (str): name for the output file
         """
 
-        for index, i in enumerate(y):
-            plt.rc("font", size=12)
-            ax = plt.subplot(rows, columns, subplots[index])
-            ax.xaxis.set_major_locator(ticker.MaxNLocator(10))
-            ax.yaxis.set_major_locator(ticker.MaxNLocator(10))
-            ax.yaxis.set_major_formatter(ticker.FormatStrFormatter("%.3f"))
-            for j in y[i]:
-                if type(j) == list:
-                    plt.scatter(x, j, label=i)
-                else:
-                    plt.scatter(x, y[i], label=i)
-                    break
-            plt.xlabel(x_title)
-            if type(y_title) == str:
-                plt.ylabel(y_title)
-            else:
-                plt.ylabel(y_title[index])
-            plt.title(title)
-            plt.legend()
-
-        figure = plt.gcf()
-        figure.set_size_inches(12, 20)
-
-        plt.savefig(figure_name, bbox_inches="tight", dpi=100)
-        plt.clf()
-        plt.close("all")
+        self.output_figure(
+            "multi_multi_scatter_graph",
+            figure_name,
+            {
+                "x": x,
+                "y": y,
+                "title": title,
+                "rows": rows,
+                "columns": columns,
+                "subplots": subplots,
+                "x_title": x_title,
+                "y_title": y_title,
+            },
+        )
 
     def four_line_graph(
         self,
@@ -1287,50 +1393,18 @@ class Grapher:
 
         """
 
-        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2)
-        plt.rc("font", size=20)
-        ax1.yaxis.set_major_formatter(ticker.FormatStrFormatter("%.3f"))
-        ax2.yaxis.set_major_formatter(ticker.FormatStrFormatter("%.3f"))
-        ax3.yaxis.set_major_formatter(ticker.FormatStrFormatter("%.3f"))
-        ax4.yaxis.set_major_formatter(ticker.FormatStrFormatter("%.3f"))
-        fig.suptitle(full_title)
-        if len(x[0]) == 1:
-            ax1.scatter(x[0], y[0], color="r")
-        else:
-            ax1.plot(x[0], y[0], "r")
-        ax1.set_xlabel(x_title[0])
-        ax1.set_ylabel(y_title[0])
-        ax1.set_title(mini_titles[0])
-
-        if len(x[1]) == 1:
-            ax2.scatter(x[1], y[1], color="b")
-        else:
-            ax2.plot(x[1], y[1], "b")
-        ax2.set_xlabel(x_title[1])
-        ax2.set_ylabel(y_title[1])
-        ax2.set_title(mini_titles[1])
-
-        if len(x[2]) == 1:
-            ax3.scatter(x[2], y[2], color="g")
-        else:
-            ax3.plot(x[2], y[2], "g")
-        ax3.set_xlabel(x_title[2])
-        ax3.set_ylabel(y_title[2])
-        ax3.set_title(mini_titles[2])
-
-        if len(x[3]) == 1:
-            ax4.scatter(x[3], y[3], color="tab:orange")
-        else:
-            ax4.plot(x[3], y[3], "tab:orange")
-        ax4.set_xlabel(x_title[3])
-        ax4.set_ylabel(y_title[3])
-        ax4.set_title(mini_titles[3])
-
-        figure = plt.gcf()
-        figure.set_size_inches(25, 17)
-        plt.savefig(figure_name, bbox_inches="tight", dpi=100)
-        plt.clf()
-        plt.close("all")
+        self.output_figure(
+            "four_line_graph",
+            figure_name,
+            {
+                "x": x,
+                "y": y,
+                "x_title": x_title,
+                "y_title": y_title,
+                "full_title": full_title,
+                "mini_titles": mini_titles,
+            },
+        )
 
     def graph_multi_series(
         self, separated_dfs: list, x_title: str, y_title: list, figure_name: str
@@ -1346,46 +1420,18 @@ class Grapher:
 
         """
 
-        for index, item in enumerate(separated_dfs):
-            x = item[x_title]
-            for index, param in enumerate(y_title):
-                y = item[param]
-                self.mini_graph(x, y, param, (index + 1), item["behaviour"][0])
-
-        figure = plt.gcf()
-        figure.set_size_inches(16, 12)
-        plt.savefig(figure_name, bbox_inches="tight", dpi=100)
-        plt.clf()
-        plt.close("all")
-
-    def mini_graph(
-        self, x: list, y: list, title: str, subplot: int, behaviour: str
-    ) -> None:
-        """Pretty standard graphing function with nothing special
-
-        Args:
-            x (list): x-data
-            y (list): y-data
-            title (str): title for graph
-            subplot (int): for defining subplot
-            behaviour (str): label for scatter plot
-
-        """
+        series = [
+            {
+                "x": item[x_title],
+                "y": {param: item[param] for param in y_title},
+                "behaviour": item["behaviour"].iloc[0],
+            }
+            for item in separated_dfs
+        ]
 
-        ax = plt.subplot(2, 4, subplot)
-        ax.xaxis.set_major_locator(ticker.MaxNLocator(10))
-        ax.yaxis.set_major_locator(ticker.MaxNLocator(10))
-        plt.scatter(x, y, label=behaviour)
-        plt.xlabel("Temperature(K)")
-        if "alpha" or "beta" or "gamma" in title.lower():
-            plt.ylabel("Angle(" + chr(176) + ")")
-        elif "vol" in title.lower():
-            plt.ylabel("Volume (\u212B\u00B3)")
-        else:
-            plt.ylabel(r"Distance ($\AA$)")
-        plt.title(title)
-        plt.legend()
-        plt.close("all")
+        self.output_figure(
+            "graph_multi_series", figure_name, {"series": series, "y_title": y_title}
+        )
 
 
 # ----------Class Definition----------#
@@ -1455,32 +1501,13 @@ class Cell_Import:
 
         # Calculates the volume because it's not actually written anywhere
 
-        self.sys["ref_volume"] = (
-            self.sys["ref_a"]
-            * self.sys["ref_b"]
-            * self.sys["ref_c"]
-            * math.sqrt(
-                1
-                - (math.cos(self.sys["ref_alpha"] * (math.pi / 180)) ** 2)
-                - (math.cos(self.sys["ref_beta"] * (math.pi / 180)) ** 2)
-                - (math.cos(self.sys["ref_gamma"] * (math.pi / 180)) ** 2)
-                + (
-                    2
-                    * math.cos(self.sys["ref_alpha"] * (math.pi / 180))
-                    * math.cos(self.sys["ref_beta"] * (math.pi / 180))
-                    * math.cos(self.sys["ref_gamma"] * (math.pi / 180))
-                )
-            )
+        self.sys["ref_volume"] = float(
+            Cell_Geometry().calculate(
+                [self.sys[item] for item in ref_parameters]
+            )["volume"][0]
         )
 
-        with open(self.sys_path, "w") as f:
-            yaml.dump(
-                self.sys,
-                f,
-                default_flow_style=False,
-                Dumper=Nice_YAML_Dumper,
-                sort_keys=False,
-            )
+        Config.write_sys(self.sys_path, self.sys)
 
         self.cfg, self.sys = self.config.yaml_reload(self.test_mode)
 
@@ -1710,12 +1737,31 @@ class Nice_YAML_Dumper(yaml.SafeDumper):
 # ----------Class Definition----------#
 
 
+# Parsed conf.yaml and sys.yaml files shared by every Config in this process
+
+# Each is kept with the modification time and size of the file when it was read,
+
+# so it is only read again when the file has changed
+
+_yaml_cache = {}
+
+# Changes to sys.yaml that have not been written to the file yet
+
+_unwritten_sys = {}
+
+
 class Config:
     def __init__(self, test_mode: bool = False) -> None:
         """Initialises the class
 
         Sets up the logbook and config file
 
+        The files are only read from disk the first time, or when they have
+
+        changed since they were last read - otherwise a copy of the cached
+
+        contents is used
+
         Args:
             test_mode (bool): Automatically false, if true it will
 
@@ -1728,25 +1774,117 @@ class Config:
         self.sys_path = pathlib.Path(os.path.abspath(__file__)).parent / "sys.yaml"
 
         if test_mode == False:
-            with open(self.conf_path, "r") as f:
-                try:
-                    self.cfg = yaml.load(f, yaml.FullLoader)
-                except:
-                    logging.critical(__name__ + " : Failed to open config file")
-                    print("Error - See Log")
-                    exit()
-
-        if test_mode == True:
-            self.cfg = "no conf.yaml file loaded"
-
-        with open(self.sys_path, "r") as f:
             try:
-                self.sys = yaml.load(f, yaml.FullLoader)
+                self.cfg = self.load(self.conf_path)
             except:
-                logging.critical(__name__ + " : Failed to open system file")
+                logging.critical(__name__ + " : Failed to open config file")
                 print("Error - See Log")
                 exit()
 
+        if test_mode == True:
+            self.cfg = "no conf.yaml file loaded"
+
+        try:
+            self.sys = self.load(self.sys_path)
+        except:
+            logging.critical(__name__ + " : Failed to open system file")
+            print("Error - See Log")
+            exit()
+
+    @staticmethod
+    def load(path: str) -> dict:
+        """Gets the contents of a yaml file, reading it only if it has changed
+
+        Changes to sys.yaml waiting to be written are included
+
+        Args:
+            path (str): full path to the yaml file
+
+        Returns:
+            contents (dict): a copy of the contents, so it can be edited freely
+        """
+
+        path = str(path)
+
+        if path in _unwritten_sys:
+            return copy.deepcopy(_unwritten_sys[path])
+
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+
+        if path not in _yaml_cache or _yaml_cache[path]["key"] != key:
+            with open(path, "r") as f:
+                _yaml_cache[path] = {"key": key, "data": yaml.load(f, YAML_Loader)}
+
+        return copy.deepcopy(_yaml_cache[path]["data"])
+
+    @staticmethod
+    def write_sys(sys_path: str, sys: dict) -> None:
+        """Saves changes to sys.yaml
+
+        Every Config made afterwards sees the changes straight away, but they
+
+        are only written to the file by flush (once per stage, and when the
+
+        program finishes) rather than every time something changes
+
+        Args:
+            sys_path (str): full path to sys.yaml
+            sys (dict): the new contents of sys.yaml
+        """
+
+        _unwritten_sys[str(sys_path)] = copy.deepcopy(sys)
+
+    @staticmethod
+    def flush() -> None:
+        """Writes any saved changes to sys.yaml"""
+
+        for path in list(_unwritten_sys):
+            sys = _unwritten_sys[path]
+
+            with open(path, "w") as f:
+                Config.dump(sys, f)
+
+            stat = os.stat(path)
+            _yaml_cache[path] = {
+                "key": (stat.st_mtime_ns, stat.st_size),
+                "data": sys,
+            }
+
+            del _unwritten_sys[path]
+
+    @staticmethod
+    def dump(data, f) -> None:
+        """Writes out a yaml file with a blank line after each top level entry
+
+        This is the same layout as Nice_YAML_Dumper, but each entry is written
+
+        separately so that libyaml can be used when it is installed
+
+        Args:
+            data: the contents of the yaml file
+            f: the open file to write to
+        """
+
+        if isinstance(data, dict) and len(data) != 0:
+            entries = [{key: value} for key, value in data.items()]
+        elif isinstance(data, list) and len(data) != 0:
+            entries = [[item] for item in data]
+        else:
+            entries = [data]
+
+        f.write(
+            "\n".join(
+                yaml.dump(
+                    entry,
+                    default_flow_style=False,
+                    Dumper=YAML_Dumper,
+                    sort_keys=False,
+                )
+                for entry in entries
+            )
+        )
+
     def yaml_reload(self, test_mode=False) -> Tuple[dict, dict]:
         """Reloads the yaml files
 
@@ -1761,15 +1899,18 @@ class Config:
         """
 
         if test_mode == False:
-            with open(self.conf_path, "r") as f:
-                self.cfg = yaml.load(f, yaml.FullLoader)
+            self.cfg = self.load(self.conf_path)
 
-        with open(self.sys_path, "r") as f:
-            self.sys = yaml.load(f, yaml.FullLoader)
+        self.sys = self.load(self.sys_path)
 
         return self.cfg, self.sys
 
 
+# Any changes to sys.yaml still waiting are written when the program finishes
+
+atexit.register(Config.flush)
+
+
 # ----------Class Definition----------#
 
 
@@ -1795,7 +1936,7 @@ class Generate:
 
         with open(self.parameter_conf, "r") as f:
             try:
-                self.param = yaml.load(f, yaml.FullLoader)
+                self.param = yaml.load(f, YAML_Loader)
             except:
                 logging.critical(__name__ + " : Failed to open parameter dictionary")
                 print("Error - See Log")
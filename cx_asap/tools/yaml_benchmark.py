@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+###################################################################################################
+# -------------------------------------CX-ASAP: yaml_benchmark-------------------------------------#
+# ---Authors: Amy J. Thompson, Kate M. Smith, Daniel J. Eriksson, Jack K. Clegg & Jason R. Price---#
+# -----------------------------------Python Implementation by AJT----------------------------------#
+# -----------------------------------Project Design by JRP and JKC---------------------------------#
+# --------------------------------Valuable Coding Support by KMS & DJE-----------------------------#
+###################################################################################################
+
+# Times reading and writing the conf.yaml and sys.yaml files, using the pure python
+
+# FullLoader/Nice_YAML_Dumper (before) and YAML_Loader/Config.dump (after, libyaml if installed)
+
+# Run from the cx_asap folder: python tools/yaml_benchmark.py --structures 100
+
+# ----------Required Modules----------#
+
+import pathlib
+import sys
+import io
+import timeit
+import yaml
+import click
+
+sys.path.insert(0, str(pathlib.Path(__file__).absolute().parent.parent))
+
+from system_files.utils import (
+    Config,
+    Nice_YAML_Dumper,
+    YAML_Loader,
+    YAML_Dumper,
+)
+
+# ----------Benchmark----------#
+
+
+def load_before(text: str) -> dict:
+    return yaml.load(text, yaml.FullLoader)
+
+
+def load_after(text: str) -> dict:
+    return yaml.load(text, YAML_Loader)
+
+
+def dump_before(data: dict) -> str:
+    f = io.StringIO()
+    yaml.dump(
+        data,
+        f,
+        default_flow_style=False,
+        Dumper=Nice_YAML_Dumper,
+        sort_keys=False,
+    )
+    return f.getvalue()
+
+
+def dump_after(data: dict) -> str:
+    f = io.StringIO()
+    Config.dump(data, f)
+    return f.getvalue()
+
+
+def per_call(function, argument, repeats: int) -> float:
+    """Gets the best time for one call of a function in seconds"""
+
+    times = timeit.repeat(lambda: function(argument), number=repeats, repeat=5)
+
+    return min(times) / repeats
+
+
+@click.command()
+@click.option("--structures", default=100, help="number of structures in the run")
+@click.option("--loads", default=6, help="Config objects made for each structure")
+@click.option("--writes", default=2, help="sys.yaml writes for each structure")
+@click.option("--repeats", default=20, help="calls timed for each measurement")
+def benchmark(structures: int, loads: int, writes: int, repeats: int) -> None:
+    """Estimates the yaml load/dump cost of one pipeline run before and after"""
+
+    config = Config(test_mode=True)
+
+    text = pathlib.Path(config.sys_path).read_text()
+    data = config.sys
+
+    if pathlib.Path(config.conf_path).exists():
+        text += "\n" + pathlib.Path(config.conf_path).read_text()
+
+    if dump_before(data) != dump_after(data):
+        click.echo("Warning: Config.dump does not match Nice_YAML_Dumper")
+
+    click.echo("libyaml in use: " + str(YAML_Dumper is not yaml.SafeDumper))
+
+    results = {}
+
+    for name, load, dump in [
+        ("before", load_before, dump_before),
+        ("after", load_after, dump_after),
+    ]:
+        load_time = per_call(load, text, repeats)
+        dump_time = per_call(dump, data, repeats)
+        run_time = structures * (loads * load_time + writes * dump_time)
+
+        results[name] = run_time
+
+        click.echo(
+            f"{name:>6}: load {load_time * 1e3:8.3f} ms, dump {dump_time * 1e3:8.3f} ms,"
+            f" per run {run_time:8.3f} s"
+        )
+
+    click.echo(f"speed up: {results['before'] / results['after']:.1f}x")
+
+
+if __name__ == "__main__":
+    benchmark()
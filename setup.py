@@ -25,6 +25,11 @@ setup(
     package_dir={"": "cx_asap"},
     packages=find_packages(where="cx_asap"),
     install_requires=requirements,
+    extras_require={
+        "parquet": ["pyarrow>=7.0"],
+        "hdf5": ["tables>=3.6"],
+        "all": ["pyarrow>=7.0", "tables>=3.6"],
+    },
     package_data={
         "": ["*.yaml", "*.ipynb", "*.md", "*.jpg", "*.ins", "*.cif", "*.hkl"],
     },
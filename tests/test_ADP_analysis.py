@@ -3,6 +3,7 @@
 import unittest
 from post_refinement_analysis.modules.ADP_analysis import ADP_analysis
 import numpy as np
+import pandas as pd
 
 
 class testADPanalysis(unittest.TestCase):
@@ -50,3 +51,60 @@ class testADPanalysis(unittest.TestCase):
 
         self.assertEqual(round(output_angle, 1), expected_angle)
         self.assertEqual(round(output_supplementary, 1), expected_supplementary_angle)
+
+    def test_principal_axes(self):
+        """
+        The batched engine should give the same vectors and angles as the single atom functions
+        """
+
+        U = np.array(
+            [
+                [0.031, 0.002, 0.004, 0.022, -0.003, 0.027],
+                [0.02, 0.0, 0.0, 0.02, 0.0, 0.02],
+                [np.nan, 0.0, 0.0, 0.02, 0.0, 0.02],
+            ]
+        )
+
+        results = self.test.principal_axes(U, self.G)
+
+        self.assertTrue(np.all(np.diff(results["values"][0]) <= 0))
+        self.assertTrue(np.isnan(results["values"][2]).all())
+
+        for i in range(3):
+            vector = results["vectors"][0, i].reshape(1, 3)
+
+            np.testing.assert_allclose(
+                self.test.scale_vector(vector, self.G), vector, rtol=1e-6
+            )
+
+            angle, supplementary = self.test.calculate_angle(
+                vector, self.cell_axis, self.cell_length, self.G
+            )
+
+            self.assertAlmostEqual(results["angles"][0, i, 0], round(angle, 1), 1)
+
+    def test_match_cells(self):
+        """
+        Cells are matched to atoms by data block, not by the order of the tables
+        """
+
+        adp_df = pd.DataFrame(
+            {
+                "CIF_File": ["x", "x", "y", "x"],
+                "Data_Block": ["b2", "b1", "b3", "b2"],
+            }
+        )
+        cell_df = pd.DataFrame(
+            {"CIF_File": ["y", "x", "x"], "Data_Block": ["b3", "b1", "b2"]}
+        )
+
+        np.testing.assert_array_equal(
+            self.test.match_cells(adp_df, cell_df), [2, 1, 0, 2]
+        )
+
+        # Without data blocks, the blocks of each CIF are matched in order
+
+        np.testing.assert_array_equal(
+            self.test.match_cells(adp_df, cell_df.drop(columns="Data_Block")),
+            [1, 2, 0, 1],
+        )
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+
+import unittest
+from overall_pipelines.async_pipeline import Async_Tool_Runner, Async_Series_Pipeline
+from cif_validation.modules.checkcif_cache import CheckCIF_Cache
+from data_refinement.pipelines.refine_pipeline import Refinement_Pipeline
+import asyncio
+import tempfile
+import pathlib
+import sys
+import os
+import time
+
+# Stands in for SHELXL: converges after one run, taking half of the number in the
+
+# structure name in seconds (ie "5" takes 2.5 s), and writes an unreadable R1 for "bad"
+
+fake_shelxl = """#!{python}
+import sys, time, pathlib
+stem = sys.argv[1]
+folder = pathlib.Path.cwd()
+log = pathlib.Path({log!r})
+with open(log, "a") as f:
+    f.write("shelxl " + stem + " start " + repr(time.time()) + "\\n")
+time.sleep(0.5 * int("0" + "".join(i for i in stem if i.isdigit())))
+ins = (folder / (stem + ".ins")).read_text()
+(folder / (stem + ".res")).write_text(ins + "\\nWGHT    0.035500    0.272400\\n")
+(folder / (stem + ".cif")).write_text("data_" + stem + "\\n_cell_length_a 10.27\\n")
+r1 = "   " if "bad" in stem else " 0.0324 "
+(folder / (stem + ".lst")).write_text(
+    "REM R1 =" + r1 + "for 1197 Fo > 4sig(Fo)\\n Mean shift/esd =   0.000\\n"
+)
+with open(log, "a") as f:
+    f.write("shelxl " + stem + " stop " + repr(time.time()) + "\\n")
+"""
+
+# Stands in for platon -u, taking 0.2 s and writing a short report
+
+fake_platon = """#!{python}
+import sys, time, pathlib
+stem = pathlib.Path(sys.argv[2]).stem
+log = pathlib.Path({log!r})
+with open(log, "a") as f:
+    f.write("platon " + stem + " start " + repr(time.time()) + "\\n")
+time.sleep(0.2)
+pathlib.Path(stem + ".chk").write_text("Report for " + stem + "\\nNo alerts\\n")
+with open(log, "a") as f:
+    f.write("platon " + stem + " stop " + repr(time.time()) + "\\n")
+"""
+
+new_ins = """TITL {name} in P2(1)/n
+CELL 0.71073  10.277258   4.686109  11.333463  90.0000  92.0179  90.0000
+ZERR    2.00   0.000809   0.000459   0.001020   0.0000   0.0084   0.0000
+LATT  1
+SYMM -x+1/2, y+1/2,-z+1/2
+SFAC C H O Cu
+UNIT 20.00 28.00 8.00 2.00
+TREF
+HKLF 4
+END
+"""
+
+reference_ins = """TITL reference in P2(1)/n
+CELL 0.71073  10.272757   4.673770  11.309690  90.0000  92.1849  90.0000
+LATT  1
+SYMM 1/2-X, 1/2+Y, 1/2-Z
+SFAC C H O CU
+UNIT 20 28 8 2
+L.S. 10
+ACTA
+WGHT    0.035500    0.272400
+FVAR       8.16324
+CU1   4    0.500000    0.000000    0.500000    10.50000    0.02009
+HKLF 4
+END
+"""
+
+
+class testAsyncToolRunner(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.location = pathlib.Path(self.folder.name)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_budget(self):
+        """
+        Programs run at the same time, but never more than the budget
+        """
+
+        test = Async_Tool_Runner(max_processes=2, use_cache=False)
+        command = [sys.executable, "-c", "import time; time.sleep(0.5)"]
+
+        async def run_four():
+            return await asyncio.gather(
+                *[test.run_tool(command, self.location) for i in range(4)]
+            )
+
+        start = time.perf_counter()
+        return_codes = asyncio.run(run_four())
+        duration = time.perf_counter() - start
+
+        self.assertEqual(return_codes, [0, 0, 0, 0])
+        self.assertGreater(duration, 0.9)
+        self.assertLess(duration, 1.9)
+
+    def test_two_series(self):
+        """
+        One runner can be used for more than one series (ie two asyncio.run calls)
+        """
+
+        test = Async_Tool_Runner(max_processes=1, use_cache=False)
+        command = [sys.executable, "-c", "pass"]
+
+        async def series():
+            return await asyncio.gather(
+                *[test.run_tool(command, self.location) for i in range(3)]
+            )
+
+        self.assertEqual(asyncio.run(series()), [0, 0, 0])
+        self.assertEqual(asyncio.run(series()), [0, 0, 0])
+
+    def test_timeout_and_folder(self):
+        """
+        Programs run in the given folder, and are stopped after the timeout
+        """
+
+        test = Async_Tool_Runner(max_processes=1, use_cache=False)
+
+        write = [sys.executable, "-c", "open('made_here.txt', 'w')"]
+        wait = [sys.executable, "-c", "import time; time.sleep(10)"]
+
+        self.assertEqual(asyncio.run(test.run_tool(write, self.location)), 0)
+        self.assertTrue((self.location / "made_here.txt").exists())
+
+        self.assertEqual(asyncio.run(test.run_tool(wait, self.location, 0.2)), None)
+        self.assertEqual(
+            asyncio.run(test.run_tool(["not_a_real_program"], self.location)), None
+        )
+
+
+
+class testAsyncSeriesPipeline(unittest.TestCase):
+    def setUp(self):
+        """
+        Puts fake shelxl and platon programs on the path, and makes a folder
+
+        with a .ins file for each structure
+        """
+
+        self.folder = tempfile.TemporaryDirectory()
+        self.location = pathlib.Path(self.folder.name)
+        self.log = self.location / "programs.log"
+        self.log.write_text("")
+
+        bin_folder = self.location / "bin"
+        bin_folder.mkdir()
+
+        for name, script in [("shelxl", fake_shelxl), ("platon", fake_platon)]:
+            path = bin_folder / name
+            path.write_text(script.format(python=sys.executable, log=str(self.log)))
+            path.chmod(0o755)
+
+        # The checkCIF cache also goes in the temporary folder
+
+        self.old_environ = dict(os.environ)
+        os.environ["PATH"] = str(bin_folder) + os.pathsep + os.environ["PATH"]
+        os.environ["XDG_CACHE_HOME"] = str(self.location / "cache")
+
+        self.reference = self.location / "reference.ins"
+        self.reference.write_text(reference_ins)
+
+        self.ins_files = {}
+
+        for name in ["1", "5", "bad"]:
+            (self.location / name).mkdir()
+            self.ins_files[name] = self.location / name / (name + ".ins")
+            self.ins_files[name].write_text(new_ins.format(name=name))
+
+        self.home = os.getcwd()
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.old_environ)
+        os.chdir(self.home)
+        self.folder.cleanup()
+
+    def program_log(self) -> list:
+        return [line.split() for line in self.log.read_text().splitlines()]
+
+    def times(self, program: str, name: str) -> tuple:
+        found = {
+            line[2]: float(line[3])
+            for line in self.program_log()
+            if line[0] == program and line[1] == name
+        }
+        return found["start"], found["stop"]
+
+    def test_refine(self):
+        """
+        The result of the refinement (StopIteration.value) is returned, and
+
+        a bad .lst fails only that structure rather than stopping the program
+        """
+
+        test = Async_Tool_Runner(max_processes=2, use_cache=False)
+
+        async def refine_both():
+            return await asyncio.gather(
+                *[
+                    test.refine(self.ins_files[name], self.reference, 3, 0.01, 5, True)
+                    for name in ["1", "bad"]
+                ]
+            )
+
+        self.assertEqual(asyncio.run(refine_both()), [True, False])
+        self.assertIn("WGHT", self.ins_files["1"].read_text())
+        self.assertIn("ACTA", self.ins_files["1"].read_text())
+
+    def test_platon_cache(self):
+        """
+        platon only runs the first time a CIF is checked, after that the report
+
+        comes from the cache
+        """
+
+        test = Async_Tool_Runner(max_processes=1)
+        test.cache = CheckCIF_Cache(self.location / "cache")
+
+        cif_file = self.location / "1" / "1.cif"
+        cif_file.write_text("data_1\n_cell_length_a 10.27\n")
+
+        first = asyncio.run(test.platon(cif_file))
+        (self.location / "1" / "check_CIF.chk").unlink()
+        second = asyncio.run(test.platon(cif_file))
+
+        self.assertEqual(first, ["Report for 1\n", "No alerts\n"])
+        self.assertEqual(second, first)
+        self.assertTrue((self.location / "1" / "check_CIF.chk").exists())
+        self.assertEqual(len([i for i in self.program_log() if i[0] == "platon"]), 2)
+
+        cif_file.write_text("data_1\n_cell_length_a 10.30\n")
+        asyncio.run(test.platon(cif_file))
+
+        self.assertEqual(len([i for i in self.program_log() if i[0] == "platon"]), 4)
+
+    def test_series(self):
+        """
+        Results come back in the order of the .ins files, and the next structure
+
+        is still refining while the first one is being validated
+        """
+
+        test = Async_Series_Pipeline(max_processes=2, test_mode=True)
+
+        ins_files = [self.ins_files[name] for name in ["5", "bad", "1"]]
+
+        results = test.run_series(ins_files, self.reference, 3, 0.01, 5)
+
+        self.assertEqual([i["ins_file"] for i in results], ins_files)
+        self.assertEqual([i["refined"] for i in results], [True, False, True])
+        self.assertEqual(results[1]["validation"], [])
+        self.assertEqual(results[2]["validation"], ["Report for 1\n", "No alerts\n"])
+
+        platon_start, platon_stop = self.times("platon", "1")
+        shelxl_start, shelxl_stop = self.times("shelxl", "5")
+
+        self.assertLess(shelxl_start, platon_stop)
+        self.assertLess(platon_start, shelxl_stop)
+
+    def test_refinement_pipeline(self):
+        """
+        The refinement pipeline uses the series pipeline when max_processes is given
+        """
+
+        (self.location / "5" / "5.ins").unlink()
+
+        test = Refinement_Pipeline(test_mode=True)
+        test.multiple_refinement(
+            self.location, self.reference, self.location, 3, 0.01, 5, max_processes=2
+        )
+
+        summary = (self.location / "refinement_summary.txt").read_text()
+
+        self.assertIn("Successful refinements: 1 of 2", summary)
+        self.assertIn("Failed refinements:\nbad.ins", summary)
+        self.assertTrue((self.location / "1" / "check_CIF.chk").exists())
+        self.assertTrue((self.location / "bad" / "bad.cif_old").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,7 @@
 import unittest
 from post_refinement_analysis.modules.cell_analysis import Cell_Deformation
 import pandas as pd
+import numpy as np
 
 
 class testCellDeformation(unittest.TestCase):
@@ -75,3 +76,87 @@ class testCellDeformation(unittest.TestCase):
         self.assertEqual(output_beta, expected_beta)
         self.assertEqual(output_gamma, expected_gamma)
         self.assertEqual(output_vol, expected_volume)
+
+    def test_strain(self):
+        """
+        Checks the strain tensor and principal strains of the sample cells,
+
+        and that a linear expansion gives back its expansion coefficient
+        """
+
+        strain = self.test.strain_tensors(self.df, self.ref_cell)
+        principal = self.test.principal_strains(strain)
+
+        self.assertEqual(strain.shape, (5, 3, 3))
+        self.assertTrue(np.allclose(strain, np.swapaxes(strain, 1, 2)))
+        self.assertEqual(round(strain[4, 1, 1], 6), round((1.0026381**2 - 1) / 2, 6))
+        self.assertTrue(
+            np.allclose(principal["values"], np.linalg.eigvalsh(strain)[:, ::-1])
+        )
+
+        temperature = np.array([100, 150, 200, 250, 300])
+        lengths = 10 * (1 + 2e-5 * (temperature - 100))
+
+        results = self.test.expansion_coefficients(temperature, lengths)
+
+        self.assertEqual(round(results["coefficients"][0, 1], 9), 2e-4)
+        self.assertEqual(round(results["alpha"][0, 0] * 1e5, 6), 2)
+
+    def test_strain_analysis(self):
+        """
+        Checks the principal axes follow the same direction when their strains cross
+        """
+
+        temperature = np.arange(115, 290, 30)
+        change = temperature - 100
+
+        self.test.sys = {
+            "ref_a": 10.0,
+            "ref_b": 10.0,
+            "ref_c": 10.0,
+            "ref_alpha": 90.0,
+            "ref_beta": 90.0,
+            "ref_gamma": 90.0,
+        }
+
+        # b starts as the largest strain, but a has overtaken it by 175 K
+
+        self.test.df = pd.DataFrame(
+            {
+                "temperature": temperature,
+                "_cell_length_a": 10 * (1 + 2e-5 * change),
+                "_cell_length_b": 10 * (1 + 2e-3 - 2e-5 * change),
+                "_cell_length_c": 10 * (1 - 1e-5 * change),
+                "_cell_angle_alpha": 90.0,
+                "_cell_angle_beta": 90.0,
+                "_cell_angle_gamma": 90.0,
+            }
+        )
+
+        fits = self.test.strain_analysis("temperature").set_index("Series")
+
+        # Each principal axis stays along one cell axis, and so has its expansion
+
+        slopes = {0: 2e-5, 1: -2e-5, 2: -1e-5}
+        directions = []
+
+        for n in ["1", "2", "3"]:
+            vectors = self.test.df[
+                ["principal_axis_" + n + "_" + axis for axis in ["x", "y", "z"]]
+            ].to_numpy()
+            direction = int(np.abs(vectors[0]).argmax())
+            directions.append(direction)
+
+            self.assertTrue(np.allclose(np.abs(vectors[:, direction]), 1))
+            self.assertAlmostEqual(
+                fits.loc["principal_axis_" + n, "coefficient_1"], slopes[direction]
+            )
+
+        self.assertEqual(sorted(directions), [0, 1, 2])
+        self.assertTrue(
+            np.allclose(
+                self.test.df["strain_e11"],
+                ((1 + 2e-5 * change) ** 2 - 1) / 2,
+            )
+        )
+        self.assertAlmostEqual(fits.loc["b_axis", "coefficient_1"], -2e-4)
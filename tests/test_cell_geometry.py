@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+import unittest
+from system_files.cell_geometry import Cell_Geometry
+import numpy as np
+import pandas as pd
+
+
+class testCellGeometry(unittest.TestCase):
+    def setUp(self):
+        self.test = Cell_Geometry()
+
+        self.cells = np.array(
+            [
+                [10.2728, 4.6, 11.3, 90, 92.185, 90],
+                [7.1, 8.2, 9.3, 81.5, 77.2, 68.9],
+            ]
+        )
+
+    def test_geometry(self):
+        """
+        Checks the volume, reciprocal cell and orthogonalisation matrix against the metric matrix
+        """
+
+        geometry = self.test.calculate(self.cells)
+
+        for index in range(len(self.cells)):
+            G = geometry["G"][index]
+            M = geometry["M"][index]
+
+            self.assertAlmostEqual(
+                geometry["volume"][index], np.sqrt(np.linalg.det(G)), 6
+            )
+            np.testing.assert_allclose(M.T @ M, G, atol=1e-9)
+            np.testing.assert_allclose(geometry["G_recip"][index], np.linalg.inv(G))
+            np.testing.assert_allclose(
+                geometry["reciprocal"][index][:3],
+                np.sqrt(np.diagonal(np.linalg.inv(G))),
+            )
+
+        self.assertAlmostEqual(geometry["reciprocal"][0][4], 180 - 92.185, 6)
+
+    def test_table(self):
+        """
+        Cells can be given as a table, and repeated cells give the same answer
+        """
+
+        df = pd.DataFrame(self.cells[[0, 1, 0]], columns=self.test.cell_columns)
+
+        volumes = self.test.calculate(df)["volume"]
+
+        self.assertEqual(len(volumes), 3)
+        self.assertEqual(volumes[0], volumes[2])
+        self.assertAlmostEqual(
+            volumes[1], self.test.calculate(self.cells[1])["volume"][0]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
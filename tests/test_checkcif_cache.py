@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+import unittest
+from cif_validation.modules.checkcif_cache import CheckCIF_Cache
+import tempfile
+import pathlib
+import os
+
+
+class testCheckCIFCache(unittest.TestCase):
+    def setUp(self):
+        """
+        Defines a small CIF and a temporary folder for the cache
+        """
+
+        self.folder = tempfile.TemporaryDirectory()
+        self.location = pathlib.Path(self.folder.name)
+
+        self.test = CheckCIF_Cache(self.location / "cache")
+
+        self.sample_cif = """data_200
+_exptl_crystal_colour                   blue
+_exptl_crystal_description
+;
+long needle
+;
+_cell_length_a                          10.2728(6)
+loop_
+  _atom_type_symbol
+  _exptl_crystal_colour
+         C         C
+_shelx_res_file
+;
+TITL 200 in P2(1)/n
+END
+;
+"""
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def write_cif(self, name, contents):
+        path = self.location / name
+        with open(path, "w") as f:
+            f.write(contents)
+        return path
+
+    def test_irrelevant_entries_ignored(self):
+        """
+        Changing only the crystal description should give the same key
+        """
+
+        original = self.write_cif("a.cif", self.sample_cif)
+        edited = self.write_cif(
+            "b.cif",
+            self.sample_cif.replace("blue", "green").replace("long needle", "plate"),
+        )
+
+        self.assertEqual(self.test.cif_key(original), self.test.cif_key(edited))
+
+    def test_relevant_entries_change_key(self):
+        """
+        Changing the cell, a loop value or filling in a placeholder should give a new key
+        """
+
+        original = self.write_cif("a.cif", self.sample_cif)
+        cell = self.write_cif("b.cif", self.sample_cif.replace("10.2728", "10.2729"))
+        loop = self.write_cif("c.cif", self.sample_cif.replace("C         C", "C         H"))
+        placeholder = self.write_cif("d.cif", self.sample_cif.replace("blue", "?"))
+
+        key = self.test.cif_key(original)
+
+        self.assertNotEqual(key, self.test.cif_key(cell))
+        self.assertNotEqual(key, self.test.cif_key(loop))
+        self.assertNotEqual(key, self.test.cif_key(placeholder))
+
+    def test_platon_version_changes_key(self):
+        """
+        A different platon should not reuse the reports from the old one
+        """
+
+        cif = self.write_cif("a.cif", self.sample_cif)
+        key = self.test.cif_key(cif)
+
+        platon = self.write_cif("platon", "#!/bin/sh\n")
+        os.chmod(platon, 0o755)
+
+        self.test.platon_version = self.test.find_platon_version(str(platon))
+
+        self.assertNotEqual(self.test.platon_version, "not found")
+        self.assertNotEqual(key, self.test.cif_key(cif))
+
+    def test_default_location(self):
+        """
+        The cache is kept in the user's cache folder, not in the package
+        """
+
+        self.assertNotIn("system_files", CheckCIF_Cache().cache_path.parts)
+
+    def test_store_lookup_purge(self):
+        """
+        Checks reports can be saved, found, listed and deleted
+        """
+
+        cif = self.write_cif("a.cif", self.sample_cif)
+        key = self.test.cif_key(cif)
+        report = ["# checkCIF report\n", "PLAT123_ALERT_1_A Something\n"]
+
+        self.assertEqual(self.test.lookup(key), None)
+
+        self.test.store(key, cif, report)
+
+        self.assertEqual(self.test.lookup(key), report)
+        self.assertEqual([item["cif"] for item in self.test.list_entries()], ["a.cif"])
+
+        self.assertEqual(self.test.purge(), 1)
+        self.assertEqual(self.test.lookup(key), None)
+        self.assertEqual(self.test.list_entries(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
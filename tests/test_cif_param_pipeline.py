@@ -63,3 +63,24 @@ class testBehaviour(unittest.TestCase):
         )
 
         self.assertEqual(output_behaviour, self.expected_behaviour)
+
+    def test_behaviour_columns(self):
+        """
+        Checks that several columns are classified at once, the same as one at a time
+        """
+
+        self.sample_dataframe["Reversed"] = list(
+            self.sample_dataframe["Temperature"][::-1]
+        )
+
+        output_behaviour = self.test.determine_behaviour(
+            self.sample_dataframe, ["Temperature", "Reversed"]
+        )
+
+        self.assertEqual(
+            list(output_behaviour["Temperature"]), self.expected_behaviour
+        )
+        self.assertEqual(
+            list(output_behaviour["Reversed"]),
+            self.test.determine_behaviour(self.sample_dataframe, "Reversed"),
+        )
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+import unittest
+from cif_validation.modules.cif_precheck import CIF_Precheck
+from CifFile import ReadCif
+import pathlib
+import os
+
+
+class testCIFPrecheck(unittest.TestCase):
+    def setUp(self):
+        """
+        Imports the reference CIF, which should pass the pre-check
+        """
+
+        self.test = CIF_Precheck()
+
+        cif_path = (
+            pathlib.Path(os.path.abspath(__file__)).parent.parent
+            / "cx_asap"
+            / "test_data"
+            / "ref"
+            / "ref.cif"
+        )
+
+        self.block = ReadCif(str(cif_path)).first_block()
+
+    def levels(self, alerts):
+        return sorted(set(item["Level"] for item in alerts))
+
+    def test_reference_cif(self):
+        """
+        The reference CIF is complete, so should have no alerts
+        """
+
+        alerts = self.test.check_block(self.block, "ref.cif")
+
+        self.assertFalse(self.test.failed(alerts))
+        self.assertEqual(alerts, [])
+
+        self.block["_exptl_crystal_colour"] = "?"
+
+        alerts = self.test.check_block(self.block, "ref.cif")
+
+        self.assertFalse(self.test.failed(alerts))
+        self.assertEqual(self.levels(alerts), ["C"])
+
+    def test_missing_entries(self):
+        """
+        Placeholders and missing entries are level A alerts
+        """
+
+        self.block["_exptl_crystal_size_max"] = "?"
+        self.block.RemoveItem("_diffrn_ambient_temperature")
+
+        alerts = self.test.check_block(self.block, "ref.cif")
+        items = [item["Item"] for item in alerts if item["Level"] == "A"]
+
+        self.assertTrue(self.test.failed(alerts))
+        self.assertEqual(
+            items, ["_diffrn_ambient_temperature", "_exptl_crystal_size_max"]
+        )
+        self.assertEqual(len(self.test.report(alerts)), len(alerts) + 2)
+
+    def test_consistency(self):
+        """
+        Checks the crystal size order and cell volume
+        """
+
+        self.block["_exptl_crystal_size_min"] = "0.3"
+        self.block["_cell_volume"] = "600.0(7)"
+
+        alerts = self.test.check_block(self.block, "ref.cif")
+        items = [item["Item"] for item in alerts if item["Level"] == "B"]
+
+        self.assertFalse(self.test.failed(alerts))
+        self.assertEqual(items, ["_exptl_crystal_size", "_cell_volume"])
+
+
+if __name__ == "__main__":
+    unittest.main()
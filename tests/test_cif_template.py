@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+import unittest
+from cif_validation.modules.cif_template import CIF_Template
+from CifFile import ReadCif, CifFile, CifBlock
+import tempfile
+import pathlib
+import os
+
+
+class testCIFTemplate(unittest.TestCase):
+    def setUp(self):
+        """
+        Makes a small instrument CIF with PyCifRW, and copies the reference CIF
+        """
+
+        self.folder = tempfile.TemporaryDirectory()
+        self.location = pathlib.Path(self.folder.name)
+
+        ref_path = (
+            pathlib.Path(os.path.abspath(__file__)).parent.parent
+            / "cx_asap"
+            / "test_data"
+            / "ref"
+            / "ref.cif"
+        )
+
+        with open(ref_path, "r") as f:
+            self.ref = f.read()
+
+        with open(self.location / "structure.cif", "w") as f:
+            f.write(self.ref)
+
+        instrument = CifFile()
+        block = CifBlock()
+        instrument["instrument_information"] = block
+        block["_diffrn_measurement_method"] = "omega scans"
+        block["_diffrn_ambient_temperature"] = "100(2)"
+        block["_cell_length_a"] = "1.0"
+        block["_space_group_symop_operation_xyz"] = ["x, y, z"]
+        block.CreateLoop(["_space_group_symop_operation_xyz"])
+
+        with open(self.location / "instrument.cif", "w") as f:
+            f.write(instrument.WriteOut())
+
+        self.test = CIF_Template(
+            self.location / "instrument.cif", ignored_entries=["_cell_length_a"]
+        )
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_merge(self):
+        """
+        Checks parameters are replaced or added, and the rest of the CIF is unchanged
+        """
+
+        structure = self.test.read_structure(self.location / "structure.cif")
+        text = self.test.merge(
+            structure, {"_exptl_crystal_colour": self.test.format_value("pale blue")}
+        )
+
+        with open(self.location / "merged.cif", "w") as f:
+            f.write(text)
+
+        block = ReadCif(str(self.location / "merged.cif")).first_block()
+
+        self.assertEqual(block["_diffrn_measurement_method"], "omega scans")
+        self.assertEqual(block["_diffrn_ambient_temperature"], "100(2)")
+        self.assertEqual(block["_exptl_crystal_colour"], "pale blue")
+        self.assertEqual(block["_cell_length_a"], "10.2728(6)")
+
+        # The same number of lines, and the embedded hkl is untouched
+
+        self.assertEqual(len(text.splitlines()), len(self.ref.splitlines()))
+        self.assertEqual(
+            self.ref[self.ref.index("_shelx_hkl_file") :].strip(),
+            text[text.index("_shelx_hkl_file") :].strip(),
+        )
+
+    def test_structure_loops_kept(self):
+        """
+        Checks a loop in the instrument CIF does not replace the structure's loop
+        """
+
+        structure = self.test.read_structure(self.location / "structure.cif")
+        text = self.test.merge(structure)
+
+        with open(self.location / "merged.cif", "w") as f:
+            f.write(text)
+
+        block = ReadCif(str(self.location / "merged.cif")).first_block()
+        reference = ReadCif(str(self.location / "structure.cif")).first_block()
+
+        self.assertEqual(len(reference["_space_group_symop_operation_xyz"]), 4)
+        self.assertEqual(
+            block["_space_group_symop_operation_xyz"],
+            reference["_space_group_symop_operation_xyz"],
+        )
+
+    def test_render(self):
+        """
+        Checks new parameters are added to the instrument CIF
+        """
+
+        text = self.test.render({"_diffrn_reflns_number": "2609"})
+
+        with open(self.location / "rendered.cif", "w") as f:
+            f.write(text)
+
+        block = ReadCif(str(self.location / "rendered.cif")).first_block()
+
+        self.assertEqual(block["_diffrn_reflns_number"], "2609")
+        self.assertEqual(block["_diffrn_measurement_method"], "omega scans")
+
+
+if __name__ == "__main__":
+    unittest.main()
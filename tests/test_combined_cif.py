@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+
+import unittest
+from cif_validation.modules.combined_writer import Combined_CIF_Writer
+from cif_validation.modules.combined_index import Combined_CIF_Index
+import tempfile
+import pathlib
+import os
+
+
+class testCombinedCIFWriter(unittest.TestCase):
+    def setUp(self):
+        """
+        Makes a temporary folder with an existing combined CIF
+        """
+
+        self.folder = tempfile.TemporaryDirectory()
+        self.location = pathlib.Path(self.folder.name)
+
+        with open(self.location / "combined.cif", "w") as f:
+            f.write("data_old\n")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def read(self, name):
+        with open(self.location / name, "r") as f:
+            return f.read()
+
+    def test_out_of_order(self):
+        """
+        Blocks added out of order are written in order, after the existing contents
+        """
+
+        with Combined_CIF_Writer(self.location) as writer:
+            writer.write_block("data_2\n", ["report 2\n"], 2)
+            writer.write_block("data_0\n", ["report 0\n"], 0)
+
+            # Nothing is replaced until the end of the run
+
+            self.assertEqual(self.read("combined.cif"), "data_old\n")
+
+            writer.write_block("data_1\n", ["report 1\n"], 1)
+
+        self.assertEqual(self.read("combined.cif"), "data_old\ndata_0\ndata_1\ndata_2\n")
+        self.assertEqual(
+            self.read("check_CIF.chk"), "report 0\nreport 1\nreport 2\n"
+        )
+        self.assertFalse(os.path.exists(self.location / ".combined.cif.tmp"))
+
+    def test_crash(self):
+        """
+        If the run crashes, the combined CIF is not changed
+        """
+
+        with self.assertRaises(RuntimeError):
+            with Combined_CIF_Writer(self.location) as writer:
+                writer.write_block("data_0\n")
+                raise RuntimeError
+
+        self.assertEqual(self.read("combined.cif"), "data_old\n")
+        self.assertFalse(os.path.exists(self.location / "check_CIF.chk"))
+        self.assertFalse(os.path.exists(self.location / ".combined.cif.tmp"))
+
+
+class testCombinedCIFIndex(unittest.TestCase):
+    def setUp(self):
+        """
+        Writes the reference CIF into a combined CIF three times
+        """
+
+        self.folder = tempfile.TemporaryDirectory()
+        self.location = pathlib.Path(self.folder.name)
+
+        cif_path = (
+            pathlib.Path(os.path.abspath(__file__)).parent.parent
+            / "cx_asap"
+            / "test_data"
+            / "ref"
+            / "ref.cif"
+        )
+
+        with open(cif_path, "r") as f:
+            self.ref = f.read()
+
+        with Combined_CIF_Writer(self.location) as writer:
+            for item in ["100", "200", "300"]:
+                writer.write_block(
+                    self.ref.replace("data_200", "data_" + item).replace(
+                        "293(2)", item + "(2)"
+                    )
+                )
+
+        self.test = Combined_CIF_Index(self.location / "combined.cif")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_index(self):
+        """
+        The index should have each block with its temperature and cell
+        """
+
+        df = self.test.read()
+
+        self.assertEqual(list(df["Data_Block"]), ["100", "200", "300"])
+        self.assertEqual(
+            list(df["_diffrn_ambient_temperature"]), ["100(2)", "200(2)", "300(2)"]
+        )
+        self.assertEqual(list(df["_cell_length_a"]), ["10.2728(6)"] * 3)
+
+    def test_read_blocks(self):
+        """
+        Reading one block should give the same text as was written
+        """
+
+        text = self.test.read_block_text(["200"])
+
+        self.assertEqual(list(text.keys()), ["200"])
+        self.assertTrue(text["200"].startswith("data_200"))
+        self.assertIn(text["200"].strip(), self.ref.replace("293(2)", "200(2)"))
+
+        cif = self.test.read_blocks(["300", "100"])
+
+        self.assertEqual(sorted(cif.keys()), ["100", "300"])
+        self.assertEqual(cif["300"]["_diffrn_ambient_temperature"], "300(2)")
+
+    def test_out_of_date(self):
+        """
+        Blocks added without the writer should be found by remaking the index
+        """
+
+        with open(self.location / "combined.cif", "a") as f:
+            f.write("data_400\n_diffrn_ambient_temperature 400(2)\n")
+
+        df = self.test.read()
+
+        self.assertEqual(list(df["Data_Block"]), ["100", "200", "300", "400"])
+        self.assertEqual(df["_diffrn_ambient_temperature"].iloc[-1], "400(2)")
+
+    def test_edited_same_size(self):
+        """
+        An edit that keeps the size of the combined CIF should still remake the index
+        """
+
+        self.test.read()
+
+        path = self.location / "combined.cif"
+        modified = os.stat(path).st_mtime_ns
+
+        with open(path, "r") as f:
+            text = f.read()
+
+        with open(path, "w") as f:
+            f.write(text.replace("100(2)", "900(2)"))
+
+        os.utime(path, ns=(modified + 10**9, modified + 10**9))
+
+        df = self.test.read()
+
+        self.assertEqual(
+            list(df["_diffrn_ambient_temperature"]), ["900(2)", "200(2)", "300(2)"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
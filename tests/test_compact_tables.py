@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+import unittest
+from system_files.compact_tables import Table_Compactor
+import pandas as pd
+import numpy as np
+
+
+class testTableCompactor(unittest.TestCase):
+    def setUp(self):
+        """
+        Makes a bond table with the same bonds repeated over several structures
+        """
+
+        rows = 50
+
+        self.df = pd.DataFrame(
+            {
+                "_geom_bond_atom_site_label_1": ["C1", "C2"] * rows,
+                "_geom_bond_atom_site_label_1_error": [0] * (2 * rows),
+                "_geom_bond_distance": np.linspace(1.3, 1.6, 2 * rows),
+                "_geom_bond_distance_error": [0.002] * (2 * rows),
+                "CIF_File": ["series"] * (2 * rows),
+                "Data_Block": np.repeat(["b" + str(i) for i in range(rows)], 2),
+            }
+        )
+
+    def test_compact(self):
+        """
+        Checks the table is smaller, but writes out the same .csv file
+        """
+
+        test = Table_Compactor()
+        compact_df = test.compact(self.df)
+
+        self.assertIsInstance(
+            compact_df["_geom_bond_atom_site_label_1"].dtype, pd.CategoricalDtype
+        )
+        self.assertIsInstance(compact_df["CIF_File"].dtype, pd.CategoricalDtype)
+        self.assertEqual(compact_df["_geom_bond_distance_error"].dtype, np.float64)
+        self.assertLess(test.memory(compact_df), test.memory(self.df))
+        self.assertEqual(compact_df.to_csv(index=None), self.df.to_csv(index=None))
+
+    def test_append(self):
+        """
+        Checks rows compacted as they are added give the same table, with categories kept
+        """
+
+        test = Table_Compactor()
+        compact_df = pd.DataFrame()
+
+        for block, rows in self.df.groupby("Data_Block", sort=False):
+            compact_df = test.append(compact_df, rows, "Bond_Lengths")
+
+        self.assertIsInstance(
+            compact_df["_geom_bond_atom_site_label_1"].dtype, pd.CategoricalDtype
+        )
+        self.assertIsInstance(compact_df["CIF_File"].dtype, pd.CategoricalDtype)
+        self.assertEqual(compact_df.to_csv(index=None), self.df.to_csv(index=None))
+        self.assertGreaterEqual(
+            test.appended["Bond_Lengths"]["rows"], test.memory(self.df)
+        )
+        self.assertLess(test.memory(compact_df), test.memory(self.df))
+
+    def test_float32(self):
+        """
+        Checks the errors can be stored as float32
+        """
+
+        compact_df = Table_Compactor(float32_errors=True).compact(self.df)
+
+        self.assertEqual(compact_df["_geom_bond_distance_error"].dtype, np.float32)
+        self.assertEqual(compact_df["_geom_bond_distance"].dtype, np.float64)
+
+
+if __name__ == "__main__":
+    unittest.main()
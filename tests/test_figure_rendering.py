@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+import unittest
+from system_files.utils import Grapher
+from system_files.figure_rendering import (
+    Figure_Drawer,
+    Figure_Renderer,
+    copy_figure,
+    find_manifests,
+    plain_data,
+)
+from matplotlib.figure import Figure
+import pandas as pd
+import numpy as np
+import tempfile
+import pathlib
+
+
+class testFigureRendering(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.location = pathlib.Path(self.folder.name)
+        self.graph = Grapher(test_mode=True)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_plain_data(self):
+        """
+        Figure data is converted to python types so it can be sent to other processes
+        """
+
+        data = plain_data(
+            {"x": pd.Series([1, 2]), "y": [np.array([0.5, 1.5]), np.float64(2)]}
+        )
+
+        self.assertEqual(data, {"x": [1, 2], "y": [[0.5, 1.5], 2.0]})
+        self.assertEqual(type(data["y"][1]), float)
+
+    def test_render_now_and_later(self):
+        """
+        Figures are drawn straight away, or by the render service once it finishes
+        """
+
+        x = pd.Series([100, 150, 200])
+
+        self.graph.single_scatter_graph(
+            x, [x * 2], "x", "y", "Now", self.location / "now.png", ["series"]
+        )
+
+        self.assertTrue((self.location / "now.png").exists())
+
+        copies = self.location / "copies"
+        copies.mkdir()
+
+        with Figure_Renderer(max_workers=2):
+            self.graph.single_scatter_graph(
+                x, [x * 2], "x", "y", "Later", self.location / "later.png", ["series"]
+            )
+            self.graph.four_line_graph(
+                self.location / "four.png",
+                [[1, 2], [1, 2], [1], [1, 2]],
+                [[1, 2], [2, 1], [3], [1, 1]],
+                ["x"] * 4,
+                ["y"] * 4,
+                "Four",
+                ["1", "2", "3", "4"],
+            )
+            copy_figure(self.location / "four.png", copies)
+
+        self.assertTrue((self.location / "later.png").exists())
+        self.assertTrue((self.location / "four.png").exists())
+        self.assertTrue((copies / "four.png").exists())
+
+    def test_render_later(self):
+        """
+        A plot spec is saved instead of the figure, and drawn from it later
+        """
+
+        with Figure_Renderer(render_later=True):
+            self.graph.multi_multi_scatter_graph(
+                [1, 2, 3],
+                {"R1": pd.Series([0.1, 0.2, 0.3])},
+                "Quality",
+                1,
+                1,
+                [1],
+                "x",
+                "Statistic",
+                self.location / "quality.png",
+            )
+
+        self.assertFalse((self.location / "quality.png").exists())
+        self.assertEqual(
+            find_manifests([self.location]), [self.location / "quality.plot.json"]
+        )
+
+        with Figure_Renderer(max_workers=1) as renderer:
+            failed = renderer.render(find_manifests([self.location]))
+
+        self.assertEqual(failed, [])
+        self.assertTrue((self.location / "quality.png").exists())
+
+    def test_unchanged_figures(self):
+        """
+        A figure is only redrawn when its data changes
+        """
+
+        figure = self.location / "cached.png"
+
+        self.graph.single_scatter_graph([1, 2], [[1, 2]], "x", "y", "t", figure, ["a"])
+        first = figure.stat().st_mtime_ns
+
+        self.graph.single_scatter_graph([1, 2], [[1, 2]], "x", "y", "t", figure, ["a"])
+
+        self.assertEqual(figure.stat().st_mtime_ns, first)
+        self.assertEqual(self.graph.unchanged_figures, 1)
+
+        with Figure_Renderer(max_workers=1) as renderer:
+            self.graph.single_scatter_graph(
+                [1, 2], [[1, 3]], "x", "y", "t", figure, ["a"]
+            )
+            self.assertEqual(renderer.unchanged, 0)
+
+        self.assertNotEqual(figure.stat().st_mtime_ns, first)
+        self.assertEqual(self.graph.drawn_figures, 1)
+
+    def test_decimation(self):
+        """
+        Long series are drawn as one rasterised layer, keeping their peaks
+        """
+
+        x = np.arange(50000)
+        y = np.sin(x / 1000)
+        y[1234] = 5
+        y[40000] = -5
+
+        drawer = Figure_Drawer()
+        figure = Figure()
+        ax = figure.add_subplot()
+
+        drawer.scatter(ax, x, y, 1000, label="long")
+        drawer.scatter(ax, x[:100], y[:100], 1000, label="short")
+
+        self.assertEqual(len(ax.collections), 2)
+        self.assertLessEqual(len(ax.collections[0].get_offsets()), 1000)
+        self.assertTrue(ax.collections[0].get_rasterized())
+        self.assertEqual(ax.collections[0].get_offsets()[:, 1].max(), 5)
+        self.assertEqual(ax.collections[0].get_offsets()[:, 1].min(), -5)
+        self.assertEqual(len(ax.collections[1].get_offsets()), 100)
+        self.assertFalse(ax.collections[1].get_rasterized())
+
+    def test_unlabelled_series_decimated(self):
+        """
+        Series without names in a single scatter graph are also decimated
+        """
+
+        x = list(range(5000))
+        y = [list(np.sin(np.arange(5000) / 100)), list(np.cos(np.arange(5000) / 100))]
+
+        drawer = Figure_Drawer()
+        figure = Figure()
+
+        drawer.single_scatter_graph(figure, x, y, "x", "y", "t", max_points=1000)
+
+        ax = figure.axes[0]
+
+        self.assertEqual(len(ax.collections), 2)
+
+        for collection in ax.collections:
+            self.assertLessEqual(len(collection.get_offsets()), 1000)
+            self.assertTrue(collection.get_rasterized())
+
+
+if __name__ == "__main__":
+    unittest.main()
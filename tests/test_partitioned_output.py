@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+import unittest
+from post_refinement_analysis.modules.partitioned_output import Partitioned_Output
+import importlib.util
+import pandas as pd
+import tempfile
+import pathlib
+import os
+
+has_parquet = importlib.util.find_spec("pyarrow") is not None
+has_hdf5 = importlib.util.find_spec("tables") is not None
+
+
+class testPartitionedOutput(unittest.TestCase):
+    def setUp(self):
+        """
+        Makes a table of bonds, with the rows for each bond mixed together
+        """
+
+        self.folder = tempfile.TemporaryDirectory()
+        self.location = pathlib.Path(self.folder.name)
+
+        self.df = pd.DataFrame(
+            {
+                "Joined": ["C1C2", "C2C3", "C1C2", "O1C1", "C2C3", "C1C2"],
+                "Distance": [1.51, 1.39, 1.52, 1.21, 1.38, 1.53],
+                "RMS": [0.1, "NPD", 0.2, 0.3, 0.4, 0.5],
+            }
+        )
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def read_folder(self, folder):
+        return {
+            item: pd.read_csv(folder / item).to_csv(index=None)
+            for item in sorted(os.listdir(folder))
+        }
+
+    def check_round_trip(self, output_format):
+        """
+        The exported .csv files should be the same as writing them directly
+        """
+
+        Partitioned_Output(
+            self.location / "direct", "Joined", "csv", "Bonds_"
+        ).write(self.df)
+
+        output = Partitioned_Output(
+            self.location / "dataset", "Joined", output_format, "Bonds_"
+        )
+        output.write(self.df)
+
+        self.assertEqual(output.output_format, output_format)
+        self.assertTrue(output.dataset_path().exists())
+        self.assertEqual(list(output.read(["C2C3"])["Distance"]), [1.39, 1.38])
+
+        reopened = Partitioned_Output(self.location / "dataset", output_format=None)
+        reopened.export_csv()
+
+        self.assertEqual(
+            self.read_folder(self.location / "direct"),
+            self.read_folder(self.location / "dataset"),
+        )
+
+    def test_csv(self):
+        """
+        Checks one .csv file is written for each bond
+        """
+
+        Partitioned_Output(self.location / "bonds", "Joined", "csv", "Bonds_").write(
+            self.df
+        )
+
+        files = self.read_folder(self.location / "bonds")
+
+        self.assertEqual(
+            list(files.keys()), ["Bonds_C1C2.csv", "Bonds_C2C3.csv", "Bonds_O1C1.csv"]
+        )
+        self.assertEqual(
+            list(pd.read_csv(self.location / "bonds" / "Bonds_C1C2.csv")["Distance"]),
+            [1.51, 1.52, 1.53],
+        )
+
+    @unittest.skipIf(has_parquet or has_hdf5, "parquet/hdf5 libraries are installed")
+    def test_fallback(self):
+        """
+        Without pyarrow or pytables, individual .csv files are written instead
+        """
+
+        output = Partitioned_Output(self.location / "bonds", "Joined", "parquet")
+
+        self.assertEqual(output.output_format, "csv")
+
+    @unittest.skipUnless(has_parquet, "pyarrow is not installed")
+    def test_parquet(self):
+        self.check_round_trip("parquet")
+
+    @unittest.skipUnless(has_hdf5, "pytables is not installed")
+    def test_hdf5(self):
+        self.check_round_trip("hdf5")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 
 import unittest
-from post_refinement_analysis.modules.rotation_planes import Rotation
+from post_refinement_analysis.modules.rotation_planes import Rotation, Rotation_Results
+import pandas as pd
+import numpy as np
+import tempfile
+import pathlib
 
 
 class testRotation(unittest.TestCase):
@@ -735,4 +739,91 @@ class testRotation(unittest.TestCase):
             self.sample_lst_file, ref_plane, ref_values
         )
 
-        self.assertEqual(round(output_angle, 2), 64.75)
\ No newline at end of file
+        self.assertEqual(round(output_angle, 2), 64.75)
+
+    def test_scan_lst(self):
+        """
+        Makes sure the cell and plane are found in one pass of the .lst file
+        """
+
+        with tempfile.TemporaryDirectory() as folder:
+            lst_path = pathlib.Path(folder) / "200.lst"
+
+            with open(lst_path, "w") as f:
+                f.writelines(self.sample_lst_file)
+
+            lst_data = self.test.scan_lst(lst_path)
+
+            self.test.configure([1, 0, 0])
+            self.test.analysis(lst_path, 200, folder)
+
+            angles = pd.read_csv(pathlib.Path(folder) / "rotation_angles.csv")
+
+        self.assertEqual(
+            lst_data["cell"], [10.272757, 4.673770, 11.309690, 90.0, 92.1849, 90.0]
+        )
+        self.assertEqual(len(lst_data["planes"]), 1)
+        self.assertTrue(lst_data["planes"][0].startswith("  4.1289 (0.0066) x"))
+        self.assertEqual(round(angles["Rotation Angle"][0], 2), 64.75)
+
+    def test_plane_angles(self):
+        """
+        Makes sure every plane is compared to every reference plane at once
+        """
+
+        ref_values = [10.272757, 4.673770, 11.309690, 90.0000, 92.1849, 90.0000]
+        plane = [4.1289, -3.0053, 7.1941]
+
+        normals = [[plane, [0, 0, 1]], [[0, 0, 1], [np.nan] * 3]]
+        cells = [ref_values, [5, 5, 5, 90, 90, 90]]
+
+        angles = self.test.plane_angles(normals, cells, [[1, 0, 0], [0, 0, 1]])
+
+        self.assertEqual(angles.shape, (2, 2, 2))
+        self.assertEqual(round(angles[0, 0, 0], 2), 64.75)
+        self.assertEqual(round(angles[0, 1, 1], 2), 0)
+        self.assertEqual(round(angles[1, 0, 0], 2), 90)
+        self.assertEqual(round(angles[1, 0, 1], 2), 0)
+        self.assertTrue(np.isnan(angles[1, 1]).all())
+
+
+class testRotationResults(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.location = pathlib.Path(self.folder.name)
+        self.csv = self.location / "rotation_angles.csv"
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_accumulate(self):
+        """
+        Angles are written once at the end, after any rows from an earlier run
+        """
+
+        with Rotation_Results(self.location) as results:
+            results.add(1, 64.75)
+
+        with Rotation_Results(self.location) as results:
+            results.add(2, 65.5)
+            results.add(3, 66.25)
+
+            self.assertEqual(len(pd.read_csv(self.csv)), 1)
+
+        df = pd.read_csv(self.csv)
+
+        self.assertEqual(list(df["Structure"]), [1, 2, 3])
+        self.assertEqual(list(df["Rotation Angle"]), [64.75, 65.5, 66.25])
+
+    def test_flush_interval(self):
+        """
+        With a flush interval, angles are saved during the run
+        """
+
+        with Rotation_Results(self.location, flush_interval=2) as results:
+            for structure in range(1, 6):
+                results.add(structure, 60.0 + structure)
+
+            self.assertEqual(len(pd.read_csv(self.csv)), 4)
+
+        self.assertEqual(list(pd.read_csv(self.csv)["Structure"]), [1, 2, 3, 4, 5])
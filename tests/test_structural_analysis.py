@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+import unittest
+from post_refinement_analysis.modules.structural_analysis import Structural_Analysis
+import pandas as pd
+import tempfile
+import pathlib
+import os
+
+
+class testStructuralAnalysis(unittest.TestCase):
+    def setUp(self):
+        """
+        Defines bond data at two temperatures, with a symmetry equivalent C1-C2 bond
+        """
+
+        self.folder = tempfile.TemporaryDirectory()
+        self.location = pathlib.Path(self.folder.name)
+        self.cwd = os.getcwd()
+
+        self.test = Structural_Analysis(test_mode=True)
+        self.test.location = self.location
+
+        bonds = [("C1", "C2"), ("C2", "C3"), ("C3", "C4"), ("C1", "C2")]
+
+        data = {
+            "_geom_bond_atom_site_label_1": [],
+            "_geom_bond_atom_site_label_1_error": [],
+            "_geom_bond_atom_site_label_2": [],
+            "_geom_bond_atom_site_label_2_error": [],
+            "_geom_bond_distance": [],
+            "_geom_bond_distance_error": [],
+            "_diffrn_ambient_temperature": [],
+            "_diffrn_ambient_temperature_error": [],
+        }
+
+        for temperature in [100, 200]:
+            for atom_1, atom_2 in bonds:
+                data["_geom_bond_atom_site_label_1"].append(atom_1)
+                data["_geom_bond_atom_site_label_1_error"].append(0)
+                data["_geom_bond_atom_site_label_2"].append(atom_2)
+                data["_geom_bond_atom_site_label_2_error"].append(0)
+                data["_geom_bond_distance"].append(1.5)
+                data["_geom_bond_distance_error"].append(0.001)
+                data["_diffrn_ambient_temperature"].append(temperature)
+                data["_diffrn_ambient_temperature_error"].append(0)
+
+        self.df = pd.DataFrame(data)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.folder.cleanup()
+
+    def test_important_bonds(self):
+        """
+        Checks important bonds are ordered by atom, and equivalent bonds are numbered per temperature
+        """
+
+        self.test.structural_analysis(
+            self.df,
+            self.test.bond_paras,
+            "Bonds",
+            "Bond_Lengths.csv",
+            "Individual_Bond_Length_Data",
+            "Length (Angstroms)",
+            ["C3", "C1"],
+            "test",
+            False,
+            "_diffrn_ambient_temperature",
+        )
+
+        important_df = pd.read_csv(self.location / "test_Important_Bond_Lengths.csv")
+
+        self.assertEqual(
+            list(important_df["Joined"]),
+            ["C2C3", "C3C4", "C2C3", "C3C4"]
+            + ["C1C2_0", "C1C2_1", "C1C2_0", "C1C2_1"],
+        )
+
+        self.assertEqual(
+            sorted(os.listdir(self.location / "test_Individual_Bond_Length_Data")),
+            ["Bonds_C1C2.csv", "Bonds_C2C3.csv", "Bonds_C3C4.csv"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
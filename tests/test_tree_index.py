@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import unittest
+from system_files.utils import Directory_Browse, Tree_Index
+import tempfile
+import pathlib
+import os
+
+
+class testTreeIndex(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.location = pathlib.Path(self.folder.name)
+        self.home = os.getcwd()
+
+        for name in ["10", "2", "1"]:
+            (self.location / name).mkdir()
+            (self.location / name / (name + ".ins")).write_text("TITL")
+            (self.location / name / (name + ".hkl")).write_text("")
+
+        (self.location / "2" / "2_a.cif").write_text("")
+        (self.location / "2" / "2_b.cif").write_text("")
+
+        # Makes the folders look older than the 2 s window for re-reading them
+
+        for folder in [self.location] + list(self.location.iterdir()):
+            os.utime(folder, ns=(0, 0))
+
+    def tearDown(self):
+        os.chdir(self.home)
+        self.folder.cleanup()
+
+    def test_browse(self):
+        """
+        Folders are listed in order and files are found from the index
+        """
+
+        tree = Directory_Browse(self.location, True)
+
+        self.assertEqual(
+            tree.directories, [self.location.absolute() / i for i in ["1", "2", "10"]]
+        )
+
+        tree.enter_directory(tree.directories[0], ".ins")
+        self.assertEqual(tree.item_name, "1")
+
+        tree.enter_directory_multiple(tree.directories[1], ".cif")
+        self.assertEqual(tree.item_names, ["2_a", "2_b"])
+
+        tree.exit_directory()
+
+    def test_changed_folder(self):
+        """
+        A folder is only read again once something in it has changed
+        """
+
+        index = Tree_Index(self.location)
+        folder = self.location / "1"
+
+        first = index.listing(folder)
+        self.assertIs(index.listing(folder), first)
+        self.assertEqual(index.files(".ins", False, folder), ["1.ins"])
+        self.assertEqual(index.file_details("1.ins", folder)[0], 4)
+
+        (folder / "1.res").write_text("")
+
+        self.assertIsNot(index.listing(folder), first)
+        self.assertEqual(index.files(".res", False, folder), ["1.res"])
+        self.assertEqual(index.files(".ins", "1.ins", folder), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,9 +4,13 @@ import unittest
 
 # import sys
 # sys.path.insert(0,'./cx_asap/')
-from system_files.utils import Config, Generate
+from system_files.utils import Config, Generate, Nice_YAML_Dumper
+import yaml
+import io
 import os
 import re
+import tempfile
+import pathlib
 
 
 class testGenerate(unittest.TestCase):
@@ -1135,6 +1139,42 @@ class testConfig(unittest.TestCase):
         correct = "no conf.yaml file loaded"
         self.assertEqual(self.test.cfg, correct)
 
+    def test_cached_files(self):
+        """test yaml files are only re-read when changed and sys.yaml writes wait for a flush"""
+
+        with tempfile.TemporaryDirectory() as folder:
+            path = pathlib.Path(folder) / "sys.yaml"
+            path.write_text("counter: 1\n")
+
+            first = Config.load(path)
+            first["counter"] = 5
+            self.assertEqual(Config.load(path), {"counter": 1})
+
+            path.write_text("counter: 22\n")
+            self.assertEqual(Config.load(path), {"counter": 22})
+
+            Config.write_sys(path, {"counter": 3})
+            self.assertEqual(Config.load(path), {"counter": 3})
+            self.assertEqual(path.read_text(), "counter: 22\n")
+
+            Config.flush()
+            self.assertEqual(path.read_text(), "counter: 3\n")
+            self.assertEqual(Config.load(path), {"counter": 3})
+
+    def test_dump_layout(self):
+        """test the yaml files keep the blank line layout of Nice_YAML_Dumper"""
+
+        data = {"a": 1, "b": {"c": [1, 2]}, "d": [[1], {"e": None}], "f": {}}
+
+        f = io.StringIO()
+        Config.dump(data, f)
+
+        expected = yaml.dump(
+            data, default_flow_style=False, Dumper=Nice_YAML_Dumper, sort_keys=False
+        )
+
+        self.assertEqual(f.getvalue(), expected)
+
     def test_sys_true(self):
         """test contents of self.sys"""
 